@@ -0,0 +1,248 @@
+import argparse
+import gc
+import json
+import logging
+import math
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from benchmarks.servers import stub_servers
+from benchmarks.synthetic import DEFAULT_DAYS, DEFAULT_TOKENS, iter_wallet, to_report_rows
+from src import taxbot
+from src.utils.cache_manager import CacheManager
+from src.utils.circuit_breaker import reset_breakers
+from src.utils.metrics import metrics
+from src.utils.price_provider import CoinGeckoProvider
+from src.utils.rate_limiter import AdaptiveRateLimiter
+from src.utils.tax_report import generate_tax_report
+from src.utils.tax_rules import calculate_tax_data
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_REPEAT = 3
+SHORT_TERM_RATE = 0.25
+LONG_TERM_RATE = 0.15
+
+def percentile(values, q):
+    """
+    Nearest-rank percentile of a list of values.
+
+    Args:
+        values (list): Observed values.
+        q (float): Percentile between 0 and 100.
+
+    Returns:
+        float or None: The percentile, or None for an empty list.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+def _reset_price_state():
+    # Every run starts cold: empty price cache, no range data, no metrics, closed circuits
+    taxbot.price_fetcher.cache_manager = CacheManager()
+    taxbot.price_fetcher.price_series.clear()
+    metrics.reset()
+    reset_breakers()
+
+def _latency_summary(histogram_name, label, values):
+    histogram = metrics.histogram(histogram_name)
+    return {
+        value: {
+            "count": histogram.count(**{label: value}),
+            "p50": histogram.quantile(0.5, **{label: value}),
+            "p95": histogram.quantile(0.95, **{label: value}),
+            "p99": histogram.quantile(0.99, **{label: value}),
+        }
+        for value in values if histogram.count(**{label: value})
+    }
+
+def measure(workload, transactions, func, repeat):
+    """
+    Times a workload over several runs, then measures its peak traced memory in one extra run.
+
+    Args:
+        workload (str): Workload name.
+        transactions (int): Transactions processed per run.
+        func (callable): Runs the workload once.
+        repeat (int): Number of timed runs.
+
+    Returns:
+        dict: Timings, throughput, percentiles and peak memory.
+    """
+    runs = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    extra = {"provider_latency": _latency_summary("vertax_provider_latency_seconds", "provider",
+                                                  ("coingecko", "coingecko_range", "coinmarketcap")),
+             "rpc_latency": _latency_summary("vertax_rpc_latency_seconds", "method",
+                                             ("getConfirmedSignaturesForAddress2", "getTransaction"))}
+
+    # Tracing slows allocation down, so memory is measured separately from the timed runs
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    median = percentile(runs, 50)
+    return {
+        "workload": workload,
+        "transactions": transactions,
+        "runs_seconds": runs,
+        "throughput_tps": transactions / median if median else 0.0,
+        "p50_seconds": median,
+        "p95_seconds": percentile(runs, 95),
+        "p99_seconds": percentile(runs, 99),
+        "peak_memory_mb": peak / (1024 * 1024),
+        **{key: value for key, value in extra.items() if value},
+    }
+
+def run_size(size, args):
+    """
+    Runs every selected workload against one synthetic wallet size.
+
+    Args:
+        size (int): Transactions in the synthetic wallet.
+        args (argparse.Namespace): Benchmark options.
+
+    Returns:
+        list: One result dict per workload.
+    """
+    wallet_address = f"BenchWallet{size}"
+    wallet_options = {"num_transactions": size, "tokens": tuple(args.tokens), "weights": args.weights,
+                      "days": args.days, "seed": args.seed}
+    results = []
+
+    if "process_wallet" in args.workloads:
+        with stub_servers({wallet_address: wallet_options}, args.rpc_latency, args.price_latency) as (rpc_url, price_url):
+            original_base_url = CoinGeckoProvider.BASE_URL
+            original_rate_limiter = CoinGeckoProvider.rate_limiter
+            CoinGeckoProvider.BASE_URL = price_url
+            # The stand-in server has no quota; only schedule requests when a rate is asked for
+            CoinGeckoProvider.rate_limiter = (AdaptiveRateLimiter("coingecko", args.provider_rate)
+                                              if args.provider_rate else None)
+            try:
+                def run_wallet():
+                    _reset_price_state()
+                    summary = taxbot.process_wallet(wallet_address, rpc_url, price_url, SHORT_TERM_RATE,
+                                                    LONG_TERM_RATE, prefetch_workers=args.prefetch_workers,
+                                                    range_mode=args.range_mode, vectorized=args.vectorized)
+                    if summary["total_profit"] == 0 and summary["total_tax"] == 0:
+                        raise RuntimeError(f"process_wallet returned an empty summary for {size} transactions.")
+
+                results.append(measure("process_wallet", size, run_wallet, args.repeat))
+            finally:
+                CoinGeckoProvider.BASE_URL = original_base_url
+                CoinGeckoProvider.rate_limiter = original_rate_limiter
+
+    if "calculate_tax_data" in args.workloads or "generate_tax_report" in args.workloads:
+        rows = list(to_report_rows(iter_wallet(**wallet_options)))
+        sell_dates = [row["sell_date"] for row in rows]
+        date_range = (min(sell_dates), max(sell_dates))
+        del sell_dates
+
+        if "calculate_tax_data" in args.workloads:
+            results.append(measure("calculate_tax_data", size, lambda: calculate_tax_data(rows), args.repeat))
+        if "generate_tax_report" in args.workloads:
+            results.append(measure("generate_tax_report", size,
+                                   lambda: generate_tax_report(rows, date_range), args.repeat))
+
+    return results
+
+def find_regressions(results, baseline, tolerance):
+    """
+    Compares throughput against a previous results file.
+
+    Args:
+        results (list): Results of this run.
+        baseline (list): Results loaded from a previous run.
+        tolerance (float): Allowed relative throughput drop (0.2 = 20%).
+
+    Returns:
+        list: Human-readable regression descriptions.
+    """
+    previous = {(result["workload"], result["transactions"]): result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result["workload"], result["transactions"]))
+        if before is None or not before["throughput_tps"]:
+            continue
+        change = result["throughput_tps"] / before["throughput_tps"] - 1
+        if change < -tolerance:
+            regressions.append(f"{result['workload']} @ {result['transactions']} tx: "
+                               f"{before['throughput_tps']:.0f} -> {result['throughput_tps']:.0f} tx/s ({change:+.1%})")
+    return regressions
+
+def format_results(results):
+    """
+    Renders results as a fixed-width table.
+    """
+    lines = [f"{'workload':<22}{'tx':>10}{'tx/s':>12}{'p50 s':>10}{'p95 s':>10}{'p99 s':>10}{'peak MB':>10}"]
+    for result in results:
+        lines.append(f"{result['workload']:<22}{result['transactions']:>10}{result['throughput_tps']:>12.0f}"
+                     f"{result['p50_seconds']:>10.3f}{result['p95_seconds']:>10.3f}{result['p99_seconds']:>10.3f}"
+                     f"{result['peak_memory_mb']:>10.2f}")
+    return "\n".join(lines)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Vertax synthetic-load benchmarks.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="Transactions per synthetic wallet (e.g. 1000 10000 1000000).")
+    parser.add_argument("--workloads", nargs="+", default=["process_wallet", "calculate_tax_data", "generate_tax_report"],
+                        choices=["process_wallet", "calculate_tax_data", "generate_tax_report"])
+    parser.add_argument("--tokens", nargs="+", default=list(DEFAULT_TOKENS), help="Token mix.")
+    parser.add_argument("--weights", type=float, nargs="+", default=None, help="Relative frequency of each token.")
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS, help="Date spread of the synthetic trades.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Timed runs per workload.")
+    parser.add_argument("--rpc-latency", type=float, default=0.0, help="Seconds added to every stub RPC response.")
+    parser.add_argument("--price-latency", type=float, default=0.0, help="Seconds added to every stub price response.")
+    parser.add_argument("--provider-rate", type=float, default=None,
+                        help="Schedule price requests at this many per second (default is unlimited).")
+    parser.add_argument("--prefetch-workers", type=int, default=taxbot.DEFAULT_PREFETCH_WORKERS)
+    parser.add_argument("--range-mode", action="store_true", help="Run process_wallet with range price downloads.")
+    parser.add_argument("--vectorized", action="store_true", help="Run process_wallet with the columnar tax engine.")
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    parser.add_argument("--baseline", help="Previous results file to check for throughput regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative throughput drop.")
+    parser.add_argument("--log-level", default="WARNING", help="Log level while the benchmarks run.")
+    args = parser.parse_args(argv)
+    if args.weights is not None and len(args.weights) != len(args.tokens):
+        parser.error("--weights needs one value per token.")
+    return args
+
+def main(argv=None):
+    """
+    Runs the benchmarks and returns the process exit code (1 on a regression).
+    """
+    args = parse_args(argv)
+    logging.getLogger().setLevel(args.log_level)
+
+    results = []
+    for size in args.sizes:
+        results.extend(run_size(size, args))
+    print(format_results(results))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"created_at": datetime.now().isoformat(), "args": vars(args), "results": results}, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(results, json.load(f)["results"], args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
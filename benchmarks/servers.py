@@ -0,0 +1,170 @@
+import itertools
+import json
+import multiprocessing
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from benchmarks.synthetic import SECONDS_PER_DAY, iter_wallet, synthetic_price
+
+class _JsonHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without this each response waits on a delayed ACK
+    disable_nagle_algorithm = True
+    latency = 0.0
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class _WalletCursor:
+    """
+    Serves one wallet's signature pages without holding the whole history in
+    memory. Sequential `before` paging continues the same generator; any other
+    cursor restarts it.
+    """
+    def __init__(self, wallet_options):
+        self.wallet_options = wallet_options
+        self.entries = None
+        self.last_signature = None
+        self.lock = threading.Lock()
+
+    def page(self, limit, before=None, until=None):
+        with self.lock:
+            if before is None or before != self.last_signature:
+                self.entries = iter_wallet(**self.wallet_options)
+                if before is not None:
+                    for entry in self.entries:
+                        if entry["signature"] == before:
+                            break
+
+            page = []
+            for entry in itertools.islice(self.entries, limit):
+                if entry["signature"] == until:
+                    self.entries = iter(())
+                    break
+                page.append(entry)
+            self.last_signature = page[-1]["signature"] if page else None
+            return page
+
+class StubRpcHandler(_JsonHandler):
+    """
+    Answers getConfirmedSignaturesForAddress2 from synthetic wallets.
+    """
+    cursors = {}
+
+    def do_GET(self):
+        self._send_json({"jsonrpc": "2.0", "result": "ok", "id": 1})
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        if self.latency:
+            time.sleep(self.latency)
+
+        if isinstance(request, list) or request.get("method") != "getConfirmedSignaturesForAddress2":
+            self._send_json({"jsonrpc": "2.0", "error": {"code": -32601, "message": "Method not found"}, "id": None})
+            return
+
+        wallet_address, options = request["params"]
+        cursor = self.cursors.get(wallet_address)
+        page = cursor.page(options.get("limit", 1000), options.get("before"), options.get("until")) if cursor else []
+        self._send_json({"jsonrpc": "2.0", "result": page, "id": request.get("id")})
+
+class StubPriceHandler(_JsonHandler):
+    """
+    Answers CoinGecko history and market-chart-range requests with synthetic prices.
+    """
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        parts = url.path.strip("/").split("/")
+        if self.latency:
+            time.sleep(self.latency)
+
+        if len(parts) == 3 and parts[0] == "coins" and parts[2] == "history":
+            date = datetime.strptime(query["date"][0], "%Y-%m-%d").replace(tzinfo=timezone.utc)
+            price = synthetic_price(parts[1], int(date.timestamp()))
+            self._send_json({"market_data": {"current_price": {"usd": price}}})
+        elif len(parts) == 4 and parts[0] == "coins" and parts[2:] == ["market_chart", "range"]:
+            start = int(query["from"][0])
+            end = int(query["to"][0])
+            first_day = start - start % SECONDS_PER_DAY
+            prices = [[day * 1000, synthetic_price(parts[1], day)]
+                      for day in range(first_day, end + 1, SECONDS_PER_DAY)]
+            self._send_json({"prices": prices})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+def _start(handler):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def _start_servers(wallets, rpc_latency, price_latency):
+    rpc_handler = type("RpcHandler", (StubRpcHandler,), {
+        "latency": rpc_latency,
+        "cursors": {address: _WalletCursor(options) for address, options in wallets.items()},
+    })
+    price_handler = type("PriceHandler", (StubPriceHandler,), {"latency": price_latency})
+    return [_start(rpc_handler), _start(price_handler)]
+
+def _serve(wallets, rpc_latency, price_latency, conn):
+    """
+    Child process entry point: runs both servers until the parent asks it to stop.
+    """
+    servers = _start_servers(wallets, rpc_latency, price_latency)
+    conn.send([server.server_address[1] for server in servers])
+    conn.recv()
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+@contextmanager
+def stub_servers(wallets, rpc_latency=0.0, price_latency=0.0, separate_process=True):
+    """
+    Runs local stand-ins for the Solana RPC and the CoinGecko price API.
+
+    By default the servers run in a child process, so they do not compete for
+    the GIL with the code being measured and their memory is not traced.
+
+    Args:
+        wallets (dict): Wallet address -> iter_wallet keyword arguments.
+        rpc_latency (float): Seconds added to every RPC response.
+        price_latency (float): Seconds added to every price response.
+        separate_process (bool): Run the servers in a child process instead of threads.
+
+    Yields:
+        tuple: (rpc_url, price_base_url).
+    """
+    if separate_process:
+        parent_conn, child_conn = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=_serve, args=(wallets, rpc_latency, price_latency, child_conn),
+                                          daemon=True)
+        process.start()
+        try:
+            ports = parent_conn.recv()
+            yield tuple(f"http://127.0.0.1:{port}" for port in ports)
+        finally:
+            parent_conn.send("stop")
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        return
+
+    servers = _start_servers(wallets, rpc_latency, price_latency)
+    try:
+        yield tuple(f"http://127.0.0.1:{server.server_address[1]}" for server in servers)
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
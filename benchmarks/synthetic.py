@@ -0,0 +1,89 @@
+import hashlib
+import random
+from datetime import datetime
+
+SECONDS_PER_DAY = 86400
+
+DEFAULT_TOKENS = ("SOL", "USDC", "BONK")
+DEFAULT_START = int(datetime(2022, 1, 1).timestamp())
+DEFAULT_DAYS = 730
+
+def synthetic_price(token_symbol, day):
+    """
+    Deterministic stand-in price for a token on a UTC day, shared by the
+    generator and the stub price server so results are reproducible.
+
+    Args:
+        token_symbol (str): The token symbol.
+        day (int): Unix timestamp of the start of the UTC day.
+
+    Returns:
+        float: Price between 1 and 200.
+    """
+    digest = hashlib.blake2b(f"{token_symbol}:{int(day) // SECONDS_PER_DAY}".encode(), digest_size=4).digest()
+    return 1.0 + int.from_bytes(digest, "big") % 19900 / 100
+
+def iter_wallet(num_transactions, tokens=DEFAULT_TOKENS, weights=None, start=DEFAULT_START, days=DEFAULT_DAYS,
+                seed=0):
+    """
+    Streams synthetic signature entries for one wallet, newest first, the
+    order the RPC returns them in.
+
+    Args:
+        num_transactions (int): Number of transactions to generate.
+        tokens (tuple): Token symbols to trade.
+        weights (tuple, optional): Relative frequency of each token (default is uniform).
+        start (int): Unix timestamp of the earliest sale.
+        days (int): Number of days the sales are spread over; each purchase
+            happens up to this many days before its sale.
+        seed (int): Random seed.
+
+    Yields:
+        dict: Signature entry with signature, slot, blockTime, token_symbol,
+        amount, purchase_time and sell_time.
+    """
+    rng = random.Random(seed)
+    span = days * SECONDS_PER_DAY
+    for index in range(num_transactions):
+        # Counting down keeps signatures, slots and block times newest first
+        position = num_transactions - index
+        block_time = start + span * position // num_transactions
+        purchase_time = block_time - rng.randrange(0, span)
+        yield {
+            "signature": f"sig{seed}-{position:08d}",
+            "slot": 100000000 + position,
+            "blockTime": block_time,
+            "status": "success",
+            "token_symbol": rng.choices(tokens, weights)[0],
+            "amount": round(rng.uniform(0.1, 50.0), 4),
+            "purchase_time": purchase_time,
+            "sell_time": block_time,
+        }
+
+def generate_wallet(num_transactions, **kwargs):
+    """
+    Builds a synthetic wallet history as a list (see iter_wallet for the options).
+    """
+    return list(iter_wallet(num_transactions, **kwargs))
+
+def to_report_rows(transactions):
+    """
+    Converts synthetic transactions to the purchase_date/sell_date/profit rows
+    calculate_tax_data and generate_tax_report take.
+
+    Args:
+        transactions (iterable): Signature entries from iter_wallet.
+
+    Yields:
+        dict: Report row.
+    """
+    for tx in transactions:
+        purchase_day = tx["purchase_time"] - tx["purchase_time"] % SECONDS_PER_DAY
+        sell_day = tx["sell_time"] - tx["sell_time"] % SECONDS_PER_DAY
+        profit = (synthetic_price(tx["token_symbol"], sell_day)
+                  - synthetic_price(tx["token_symbol"], purchase_day)) * tx["amount"]
+        yield {
+            "purchase_date": datetime.fromtimestamp(tx["purchase_time"]),
+            "sell_date": datetime.fromtimestamp(tx["sell_time"]),
+            "profit": profit,
+        }
@@ -1,4 +1,5 @@
 import logging
+import os
 from src.taxbot import process_wallet
 
 logging.basicConfig(level=logging.INFO)
@@ -12,9 +13,12 @@ def main():
     price_api_url = "https://api.example.com/price"
     short_term_rate = 0.25
     long_term_rate = 0.15
+    # Set VERTAX_PROFILE=<path prefix> to write a per-stage CPU profile of the run
+    profile_output = os.getenv("VERTAX_PROFILE")
 
     try:
-        summary = process_wallet(wallet_address, rpc_url, price_api_url, short_term_rate, long_term_rate)
+        summary = process_wallet(wallet_address, rpc_url, price_api_url, short_term_rate, long_term_rate,
+                                 profile_output=profile_output)
         
         if summary["total_profit"] == 0 and summary["total_tax"] == 0:
             logging.warning(f"No transactions processed for wallet {wallet_address}.")
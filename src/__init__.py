@@ -1,4 +1,4 @@
 # Initialize the core tax calculation logic
 # Initialize the core package
-from .taxbot import process_wallet
+from .taxbot import process_wallet, process_wallets
 from .solana import connect_to_solana_rpc, parse_transaction_data
@@ -0,0 +1,303 @@
+import logging
+import queue
+import threading
+import time
+from functools import partial
+from src.solana import iter_parsed_transactions
+from src.utils.data_fetcher import iter_signatures
+from src.utils.metrics import metrics
+from src.utils.price_fetcher import prefetch_prices, price_day, DEFAULT_PREFETCH_WORKERS
+from src.utils.profiler import profiling
+from src.utils.tax_rules import calculate_trade_tax
+
+logging.basicConfig(level=logging.INFO)
+
+DEFAULT_BUFFER_SIZE = 256       # Items buffered between two stages
+DEFAULT_PRICE_BATCH_SIZE = 500  # Transactions priced together by the price stage
+
+_END = object()
+
+stage_seconds = metrics.histogram("vertax_stage_seconds", "Seconds spent working in each processing stage per run.")
+stage_items = metrics.counter("vertax_stage_items_total", "Items emitted by each pipeline stage.")
+
+class Stage:
+    """
+    A named pipeline step: a function that takes an iterator of items and
+    returns (or yields) an iterator of items.
+    """
+    def __init__(self, name, func):
+        self.name = name
+        self.func = func
+
+class _StageRunner(threading.Thread):
+    """
+    Runs one stage in its own thread, writing its output to a bounded buffer.
+    """
+    def __init__(self, stage, items, buffer_size, stop_event):
+        super().__init__(name=f"pipeline-{stage.name}", daemon=True)
+        self.stage = stage
+        self.items = items
+        self.buffer = queue.Queue(maxsize=buffer_size)
+        self.stop_event = stop_event
+        self.error = None
+        self.output_wait = 0.0
+        self.busy_seconds = 0.0
+
+    def _put(self, item):
+        while not self.stop_event.is_set():
+            try:
+                self.buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            for item in self.stage.func(self.items):
+                waited = time.perf_counter()
+                if not self._put(item):
+                    return
+                self.output_wait += time.perf_counter() - waited
+                stage_items.inc(stage=self.stage.name)
+        except Exception as e:
+            logging.error(f"Pipeline stage '{self.stage.name}' failed: {e}")
+            self.error = e
+        finally:
+            self._put(_END)
+            input_wait = self.items.wait_seconds if isinstance(self.items, _BufferReader) else 0.0
+            self.busy_seconds = time.perf_counter() - start - self.output_wait - input_wait
+            stage_seconds.observe(self.busy_seconds, stage=self.stage.name)
+
+class _BufferReader:
+    """
+    Iterates over a stage's output buffer, recording how long the reader waited.
+    """
+    def __init__(self, runner):
+        self.runner = runner
+        self.wait_seconds = 0.0
+        self.finished = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.finished:
+            raise StopIteration
+        waited = time.perf_counter()
+        while True:
+            try:
+                item = self.runner.buffer.get(timeout=0.1)
+                break
+            except queue.Empty:
+                if self.runner.stop_event.is_set():
+                    self.finished = True
+                    raise StopIteration
+        self.wait_seconds += time.perf_counter() - waited
+
+        if item is _END:
+            self.finished = True
+            if self.runner.error is not None:
+                raise self.runner.error
+            raise StopIteration
+        return item
+
+class Pipeline:
+    """
+    A chain of stages connected by bounded buffers. Each stage runs in its own
+    thread, so a slow network stage overlaps with the CPU stages after it, and
+    memory stays bounded by the buffer sizes rather than by the input size.
+    """
+    def __init__(self, stages, buffer_size=DEFAULT_BUFFER_SIZE):
+        """
+        Args:
+            stages (list): Stage objects in processing order.
+            buffer_size (int): Maximum number of items buffered between two stages.
+        """
+        self.stages = list(stages)
+        self.buffer_size = buffer_size
+        self.timings = {}
+
+    def replace(self, name, func):
+        """
+        Returns a copy of the pipeline with one stage's function swapped out.
+
+        Args:
+            name (str): Name of the stage to replace.
+            func (callable): New stage function.
+
+        Returns:
+            Pipeline: The new pipeline.
+        """
+        if name not in (stage.name for stage in self.stages):
+            raise ValueError(f"Pipeline has no stage named '{name}'.")
+        stages = [Stage(name, func) if stage.name == name else stage for stage in self.stages]
+        return Pipeline(stages, self.buffer_size)
+
+    def run(self, source):
+        """
+        Streams items from source through every stage. Once the output is fully
+        consumed, self.timings holds the seconds each stage spent working
+        (excluding time blocked on its neighbours).
+
+        Args:
+            source (iterable): Input items for the first stage.
+
+        Yields:
+            Items produced by the last stage.
+        """
+        stop_event = threading.Event()
+        runners = []
+        items = iter(source)
+        for stage in self.stages:
+            runner = _StageRunner(stage, items, self.buffer_size, stop_event)
+            runner.start()
+            runners.append(runner)
+            items = _BufferReader(runner)
+
+        completed = False
+        try:
+            yield from items
+            completed = True
+        finally:
+            stop_event.set()
+            if completed:
+                for runner in runners:
+                    runner.join()
+                self.timings = {runner.stage.name: runner.busy_seconds for runner in runners}
+                logging.info(f"Pipeline stage timings: {self.timings}")
+
+def fetch_stage(entries):
+    """
+    Passes signature entries through, so time spent pulling them from the RPC is attributed to this stage.
+    """
+    yield from entries
+
+def parse_stage(transactions):
+    """
+    Normalizes raw transactions with the transaction parser. The resulting
+    records keep only the fields the tax path needs, so sensitive fields are
+    dropped here without copying each raw transaction first.
+    """
+    yield from iter_parsed_transactions(transactions)
+
+def _price_batch(batch, prefetch_workers):
+    price_requests = []
+    for tx in batch:
+        if tx.purchase_time and tx.sell_time:
+            price_requests.append((tx.token_symbol, tx.purchase_time))
+            price_requests.append((tx.token_symbol, tx.sell_time))
+    prices = prefetch_prices(price_requests, max_workers=prefetch_workers)
+
+    for tx in batch:
+        if tx.purchase_time and tx.sell_time:
+            tx.purchase_price = prices.get((tx.token_symbol, price_day(tx.purchase_time)))
+            tx.sell_price = prices.get((tx.token_symbol, price_day(tx.sell_time)))
+        yield tx
+
+def price_stage(transactions, batch_size=DEFAULT_PRICE_BATCH_SIZE, prefetch_workers=DEFAULT_PREFETCH_WORKERS):
+    """
+    Attaches purchase and sell prices, resolving each batch of transactions
+    through the bulk prefetcher.
+    """
+    batch = []
+    for tx in transactions:
+        batch.append(tx)
+        if len(batch) >= batch_size:
+            yield from _price_batch(batch, prefetch_workers)
+            batch = []
+    if batch:
+        yield from _price_batch(batch, prefetch_workers)
+
+def tax_stage(transactions, short_term_rate, long_term_rate):
+    """
+    Computes profit and tax for every priced transaction, skipping the ones
+    that cannot be taxed.
+    """
+    for tx in transactions:
+        signature = tx.signature or 'unknown'
+        if not tx.purchase_time or not tx.sell_time:
+            logging.warning(f"Transaction {signature} missing purchase or sell timestamps.")
+            continue
+        if tx.purchase_price is None or tx.sell_price is None:
+            logging.warning(f"Skipping transaction {signature} due to missing price data.")
+            continue
+        try:
+            tx.profit, tx.tax = calculate_trade_tax(tx.purchase_time, tx.sell_time, tx.purchase_price,
+                                                    tx.sell_price, tx.amount, short_term_rate, long_term_rate)
+        except Exception as e:
+            logging.error(f"Error processing transaction {signature}: {e}")
+            continue
+        yield tx
+
+def build_wallet_pipeline(short_term_rate, long_term_rate, buffer_size=DEFAULT_BUFFER_SIZE,
+                          price_batch_size=DEFAULT_PRICE_BATCH_SIZE, prefetch_workers=DEFAULT_PREFETCH_WORKERS):
+    """
+    Builds the default fetch -> parse -> price -> tax pipeline.
+
+    Args:
+        short_term_rate (float): Tax rate for short-term holdings.
+        long_term_rate (float): Tax rate for long-term holdings.
+        buffer_size (int): Maximum number of items buffered between two stages.
+        price_batch_size (int): Transactions priced together by the price stage.
+        prefetch_workers (int): Maximum number of concurrent price lookups.
+
+    Returns:
+        Pipeline: The wallet pipeline.
+    """
+    return Pipeline([
+        Stage("fetch", fetch_stage),
+        Stage("parse", parse_stage),
+        Stage("price", partial(price_stage, batch_size=price_batch_size, prefetch_workers=prefetch_workers)),
+        Stage("tax", partial(tax_stage, short_term_rate=short_term_rate, long_term_rate=long_term_rate)),
+    ], buffer_size=buffer_size)
+
+def aggregate_totals(transactions):
+    """
+    Sums profit and tax over a stream of taxed transactions.
+
+    Args:
+        transactions (iterable): Taxed TransactionRecord objects.
+
+    Returns:
+        dict: Tax summary including total profit and tax owed.
+    """
+    total_profit = 0
+    total_tax = 0
+    for tx in transactions:
+        total_profit += tx.profit
+        total_tax += tx.tax
+    return {"total_profit": total_profit, "total_tax": total_tax}
+
+def stream_wallet(wallet_address, rpc_url, short_term_rate, long_term_rate, pipeline=None, profile_output=None,
+                  **kwargs):
+    """
+    Processes a wallet end to end as a stream, from paginated signature fetch to tax totals.
+
+    Args:
+        wallet_address (str): Solana wallet address.
+        rpc_url (str): Solana RPC endpoint URL.
+        short_term_rate (float): Tax rate for short-term holdings.
+        long_term_rate (float): Tax rate for long-term holdings.
+        pipeline (Pipeline, optional): Pipeline to run (default is build_wallet_pipeline(**kwargs)).
+        profile_output (str, optional): Path prefix that enables CPU profiling, with samples
+            attributed to the pipeline stage running them.
+        **kwargs: Options for build_wallet_pipeline.
+
+    Returns:
+        dict: Tax summary including total profit and tax owed.
+    """
+    if pipeline is None:
+        pipeline = build_wallet_pipeline(short_term_rate, long_term_rate, **kwargs)
+
+    try:
+        with profiling(profile_output):
+            summary = aggregate_totals(pipeline.run(iter_signatures(wallet_address, rpc_url)))
+    except Exception as e:
+        logging.error(f"Error processing wallet {wallet_address}: {e}")
+        return {"total_profit": 0, "total_tax": 0}
+
+    logging.info(f"Processed wallet {wallet_address} - Total Profit: {summary['total_profit']}, "
+                 f"Total Tax: {summary['total_tax']}")
+    return summary
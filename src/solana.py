@@ -1,21 +1,23 @@
 import requests
 import logging
-from utils.transaction_parser import parse_solana_tx, handle_irregular_tx
+from src.utils.http_client import get_http_client
+from src.utils.transaction_parser import parse_solana_tx, handle_irregular_tx
 
 logging.basicConfig(level=logging.INFO)
 
-def connect_to_solana_rpc(rpc_url):
+def connect_to_solana_rpc(rpc_url, http_client=None):
     """
     Connects to the Solana RPC endpoint to check connectivity.
 
     Args:
         rpc_url (str): Solana RPC endpoint URL.
+        http_client (HttpClient, optional): Transport to use (default is the shared client).
 
     Returns:
         bool: True if connection is successful, False otherwise.
     """
     try:
-        response = requests.get(rpc_url)
+        response = (http_client or get_http_client()).get(rpc_url)
         response.raise_for_status()  
         logging.info(f"Successfully connected to Solana RPC at {rpc_url}")
         return True
@@ -23,27 +25,37 @@ def connect_to_solana_rpc(rpc_url):
         logging.error(f"Error connecting to Solana RPC at {rpc_url}: {e}")
         return False
 
-def parse_transaction_data(raw_data):
+def iter_parsed_transactions(raw_data):
     """
-    Parses raw transaction data using the transaction parser module.
+    Parses raw transactions one at a time as they are consumed.
 
     Args:
-        raw_data (list): Raw transaction data fetched from Solana.
+        raw_data (iterable): Raw transaction data fetched from Solana.
 
-    Returns:
-        list: Parsed transaction data with necessary fields.
+    Yields:
+        TransactionRecord: Parsed transaction data with necessary fields.
     """
-    parsed_data = []
     for tx in raw_data:
         tx_signature = tx.get('signature', 'unknown')
         try:
             parsed_tx = parse_solana_tx(tx)
             if parsed_tx:
-                parsed_data.append(parsed_tx)
+                yield parsed_tx
             else:
                 logging.warning(f"Transaction {tx_signature} could not be parsed due to irregularities.")
         except KeyError as e:
             logging.error(f"Missing expected data field in transaction {tx_signature}: {e}")
         except Exception as e:
             logging.error(f"Failed to parse transaction {tx_signature}: {e}")
-    return parsed_data
+
+def parse_transaction_data(raw_data):
+    """
+    Parses raw transaction data using the transaction parser module.
+
+    Args:
+        raw_data (list): Raw transaction data fetched from Solana.
+
+    Returns:
+        list: Parsed transaction data with necessary fields.
+    """
+    return list(iter_parsed_transactions(raw_data))
@@ -1,65 +1,228 @@
 import logging
-from utils.data_fetcher import fetch_transactions
-from utils.price_fetcher import fetch_historical_price
-from utils.tax_rules import calculate_holding_period, apply_tax_rule
-from datetime import datetime
+import time
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+# Always imported through src.utils so the price cache and metrics are shared with the other modules
+from src.utils import price_fetcher
+from src.utils.cache_manager import CacheManager, DEFAULT_CACHE_PATH
+from src.utils.data_fetcher import fetch_transactions
+from src.utils.metrics import metrics
+from src.utils.price_fetcher import prefetch_prices, price_day, DEFAULT_PREFETCH_WORKERS
+from src.utils.tax_engine import tax_totals_from_prices
+from src.utils.tax_rules import calculate_trade_tax
+from src.utils.transaction_record import TransactionRecord
+from src.utils.profiler import profile_stage, profiling
 
 logging.basicConfig(level=logging.INFO)
 
-def process_wallet(wallet_address, rpc_url, price_api_url, short_term_rate, long_term_rate):
+DEFAULT_WALLET_WORKERS = 8
+
+stage_seconds = metrics.histogram("vertax_stage_seconds", "Seconds spent working in each processing stage per run.")
+wallet_seconds = metrics.histogram("vertax_wallet_seconds", "Seconds spent processing each wallet.")
+
+@contextmanager
+def _stage(name):
+    """
+    Times a processing stage and attributes its CPU samples when profiling.
+    """
+    with stage_seconds.time(stage=name), profile_stage(name):
+        yield
+
+def _scalar_wallet_totals(transactions, prices, short_term_rate, long_term_rate):
+    """
+    Computes profit and tax one transaction at a time.
+
+    Args:
+        transactions (list): TransactionRecord objects.
+        prices (dict): Prices keyed by (token_symbol, day start timestamp).
+        short_term_rate (float): Tax rate for short-term holdings.
+        long_term_rate (float): Tax rate for long-term holdings.
+
+    Returns:
+        tuple: Total profit and total tax.
+    """
+    total_profit = 0
+    total_tax = 0
+
+    for tx in transactions:
+        signature = tx.signature or 'unknown'
+        token_symbol = tx.token_symbol
+        amount = tx.amount
+        purchase_time = tx.purchase_time
+        sell_time = tx.sell_time
+
+        try:
+            if not purchase_time or not sell_time:
+                logging.warning(f"Transaction {signature} missing purchase or sell timestamps.")
+                continue
+
+            purchase_price = prices.get((token_symbol, price_day(purchase_time)))
+            sell_price = prices.get((token_symbol, price_day(sell_time)))
+
+            if purchase_price is None or sell_price is None:
+                logging.warning(f"Skipping transaction {signature} due to missing price data.")
+                continue
+
+            profit, tax = calculate_trade_tax(purchase_time, sell_time, purchase_price, sell_price, amount,
+                                              short_term_rate, long_term_rate)
+
+            total_profit += profit
+            total_tax += tax
+
+        except Exception as e:
+            logging.error(f"Error processing transaction {signature}: {e}")
+
+    return total_profit, total_tax
+
+def _vectorized_wallet_totals(transactions, prices, short_term_rate, long_term_rate):
+    """
+    Computes profit and tax for all transactions at once with the columnar tax engine.
+
+    Args:
+        transactions (list): TransactionRecord objects.
+        prices (dict): Prices keyed by (token_symbol, day start timestamp).
+        short_term_rate (float): Tax rate for short-term holdings.
+        long_term_rate (float): Tax rate for long-term holdings.
+
+    Returns:
+        tuple: Total profit and total tax.
+    """
+    nan = float('nan')
+    purchase_times, sell_times, purchase_prices, sell_prices, amounts = [], [], [], [], []
+    for tx in transactions:
+        token_symbol = tx.token_symbol
+        purchase_time = tx.purchase_time
+        sell_time = tx.sell_time
+        if not purchase_time or not sell_time:
+            purchase_time = sell_time = None
+        purchase_times.append(purchase_time or nan)
+        sell_times.append(sell_time or nan)
+        purchase_prices.append(prices.get((token_symbol, price_day(purchase_time)), nan) if purchase_time else nan)
+        sell_prices.append(prices.get((token_symbol, price_day(sell_time)), nan) if sell_time else nan)
+        amounts.append(tx.amount)
+
+    totals = tax_totals_from_prices(purchase_times, sell_times, purchase_prices, sell_prices, amounts,
+                                    short_term_rate, long_term_rate)
+    return totals["total_profit"], totals["total_tax"]
+
+def _unpriced_prefix(transactions, prices):
+    """
+    Returns how many of the newest transactions (signatures arrive newest
+    first) must stay after the checkpoint because they, or an older
+    transaction, were skipped for missing price data.
+    """
+    for index in range(len(transactions) - 1, -1, -1):
+        tx = transactions[index]
+        if not tx.purchase_time or not tx.sell_time:
+            continue
+        if (prices.get((tx.token_symbol, price_day(tx.purchase_time))) is None
+                or prices.get((tx.token_symbol, price_day(tx.sell_time))) is None):
+            return index + 1
+    return 0
+
+def process_wallet(wallet_address, rpc_url, price_api_url, short_term_rate, long_term_rate,
+                   prefetch_workers=DEFAULT_PREFETCH_WORKERS, range_mode=False, checkpoint_store=None,
+                   vectorized=False, metrics_format=None, metrics_path=None, profile_output=None):
     """
     Processes a wallet to fetch transactions, calculate profits, and summarize tax information.
 
+    Every distinct token and day the wallet needs a price for is resolved in a
+    prefetch stage before the tax loop runs, so the loop itself makes no
+    provider calls.
+
+    With a checkpoint store, only transactions newer than the wallet's stored
+    checkpoint are fetched and processed; their totals are added to the stored
+    running totals and the checkpoint is advanced. The checkpoint never moves
+    past a transaction that was skipped for missing price data, so the next
+    run fetches and taxes it again.
+
     Args:
         wallet_address (str): Solana wallet address.
         rpc_url (str): Solana RPC endpoint URL.
         price_api_url (str): API endpoint for price data.
         short_term_rate (float): Tax rate for short-term holdings.
         long_term_rate (float): Tax rate for long-term holdings.
+        prefetch_workers (int): Maximum number of concurrent price lookups in the prefetch stage.
+        range_mode (bool): Download each token's prices for the whole date span in one request.
+        checkpoint_store (CheckpointStore, optional): Enables incremental processing from stored checkpoints.
+        vectorized (bool): Compute profit and tax with the columnar NumPy engine instead of row by row.
+        metrics_format (str, optional): "prometheus" or "json" to dump a metrics snapshot when the wallet is done.
+        metrics_path (str, optional): File the metrics snapshot is written to (default is the log).
+        profile_output (str, optional): Path prefix that enables CPU profiling; writes
+            <prefix>.collapsed (per-stage collapsed stacks) and <prefix>.top.txt (hot functions).
 
     Returns:
         dict: Tax summary including total profit and tax owed.
     """
+    with wallet_seconds.time(), profiling(profile_output):
+        summary = _process_wallet(wallet_address, rpc_url, short_term_rate, long_term_rate, prefetch_workers,
+                                  range_mode, checkpoint_store, vectorized)
+
+    if metrics_format:
+        try:
+            output = metrics.dump(metrics_format, metrics_path)
+            if not metrics_path:
+                logging.info(f"Metrics after wallet {wallet_address}:\n{output}")
+        except ValueError as e:
+            logging.error(f"Error dumping metrics: {e}")
+    return summary
+
+def _process_wallet(wallet_address, rpc_url, short_term_rate, long_term_rate, prefetch_workers, range_mode,
+                    checkpoint_store, vectorized):
+    """
+    Runs the fetch, price and tax stages for one wallet.
+    """
     try:
-        transactions = fetch_transactions(wallet_address, rpc_url)
+        checkpoint = checkpoint_store.load(wallet_address) if checkpoint_store is not None else None
+        until = checkpoint["last_signature"] if checkpoint else None
+
+        with _stage("fetch"):
+            raw_transactions = fetch_transactions(wallet_address, rpc_url, until=until)
+        # Slotted records keep only the fields the tax path needs
+        with _stage("parse"):
+            transactions = [TransactionRecord.from_raw(tx) for tx in raw_transactions]
+            del raw_transactions
         if not transactions:
+            if checkpoint:
+                logging.info(f"No new transactions for wallet {wallet_address} since {until}.")
+                return {"total_profit": checkpoint["total_profit"], "total_tax": checkpoint["total_tax"]}
             logging.warning(f"No transactions found for wallet {wallet_address}.")
             return {"total_profit": 0, "total_tax": 0}
 
-        total_profit = 0
-        total_tax = 0
-
+        price_requests = []
         for tx in transactions:
-            signature = tx.get('signature', 'unknown')
-            token_symbol = tx.get('token_symbol', 'SOL')
-            amount = tx.get('amount', 1.0)
-            purchase_time = tx.get('purchase_time')
-            sell_time = tx.get('sell_time')
-
-            try:
-                if not purchase_time or not sell_time:
-                    logging.warning(f"Transaction {signature} missing purchase or sell timestamps.")
-                    continue
-                
-                purchase_date = datetime.fromtimestamp(purchase_time)
-                sell_date = datetime.fromtimestamp(sell_time)
-
-                purchase_price = fetch_historical_price(token_symbol, purchase_time, price_api_url)
-                sell_price = fetch_historical_price(token_symbol, sell_time, price_api_url)
-
-                if purchase_price is None or sell_price is None:
-                    logging.warning(f"Skipping transaction {signature} due to missing price data.")
-                    continue
-
-                profit = (sell_price - purchase_price) * amount
-                holding_period = calculate_holding_period(purchase_date, sell_date)
-                tax = apply_tax_rule(profit, holding_period, short_term_rate, long_term_rate)
+            if tx.purchase_time and tx.sell_time:
+                price_requests.append((tx.token_symbol, tx.purchase_time))
+                price_requests.append((tx.token_symbol, tx.sell_time))
+
+        with _stage("price"):
+            prices = prefetch_prices(price_requests, max_workers=prefetch_workers, range_mode=range_mode)
 
+        # Transactions newer than the oldest unpriced one are taxed now but stay after the checkpoint
+        pending = _unpriced_prefix(transactions, prices) if checkpoint_store is not None else 0
+        settled_profit = checkpoint["total_profit"] if checkpoint else 0
+        settled_tax = checkpoint["total_tax"] if checkpoint else 0
+
+        wallet_totals = _vectorized_wallet_totals if vectorized else _scalar_wallet_totals
+        with _stage("tax"):
+            if pending < len(transactions):
+                profit, tax = wallet_totals(transactions[pending:], prices, short_term_rate, long_term_rate)
+                settled_profit += profit
+                settled_tax += tax
+            total_profit, total_tax = settled_profit, settled_tax
+            if pending:
+                profit, tax = wallet_totals(transactions[:pending], prices, short_term_rate, long_term_rate)
                 total_profit += profit
                 total_tax += tax
 
-            except Exception as e:
-                logging.error(f"Error processing transaction {signature}: {e}")
+        if checkpoint_store is not None:
+            if pending:
+                logging.warning(f"Keeping {pending} transactions of wallet {wallet_address} after the checkpoint "
+                                f"until their price data is available.")
+            if pending < len(transactions):
+                newest_settled = transactions[pending]
+                checkpoint_store.save(wallet_address, newest_settled.signature, newest_settled.slot,
+                                      settled_profit, settled_tax)
 
         logging.info(f"Processed wallet {wallet_address} - Total Profit: {total_profit}, Total Tax: {total_tax}")
         return {"total_profit": total_profit, "total_tax": total_tax}
@@ -67,3 +230,73 @@ def process_wallet(wallet_address, rpc_url, price_api_url, short_term_rate, long
     except Exception as e:
         logging.error(f"Error processing wallet {wallet_address}: {e}")
         return {"total_profit": 0, "total_tax": 0}
+
+def _timed_process_wallet(wallet_address, args, kwargs):
+    """
+    Runs process_wallet for one wallet and reports how long it took.
+    """
+    start = time.perf_counter()
+    summary = process_wallet(wallet_address, *args, **kwargs)
+    return wallet_address, summary, time.perf_counter() - start
+
+def _init_wallet_process(cache_path):
+    """
+    Points a worker process at the shared on-disk price cache.
+    """
+    price_fetcher.cache_manager = CacheManager(backend="sqlite", db_path=cache_path, warm_start=True)
+
+def process_wallets(wallet_addresses, rpc_url, price_api_url, short_term_rate, long_term_rate,
+                    max_workers=DEFAULT_WALLET_WORKERS, use_processes=False, cache_path=DEFAULT_CACHE_PATH,
+                    **kwargs):
+    """
+    Processes many wallets in parallel and summarizes throughput.
+
+    Thread workers share the process-wide price cache and in-flight request
+    coalescing, so a price fetched for one wallet is reused by every other.
+    Process workers share prices through the SQLite cache at cache_path.
+
+    Args:
+        wallet_addresses (iterable): Solana wallet addresses.
+        rpc_url (str): Solana RPC endpoint URL.
+        price_api_url (str): API endpoint for price data.
+        short_term_rate (float): Tax rate for short-term holdings.
+        long_term_rate (float): Tax rate for long-term holdings.
+        max_workers (int): Number of wallets processed concurrently.
+        use_processes (bool): Use a process pool instead of a thread pool.
+        cache_path (str): SQLite price cache shared by process workers.
+        **kwargs: Extra keyword arguments passed to process_wallet.
+
+    Returns:
+        dict: Per-wallet summaries under "wallets" and aggregate statistics under "stats".
+    """
+    wallet_addresses = list(dict.fromkeys(wallet_addresses))
+    args = (rpc_url, price_api_url, short_term_rate, long_term_rate)
+
+    if use_processes:
+        executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_wallet_process,
+                                       initargs=(cache_path,))
+    else:
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="wallet-worker")
+
+    start = time.perf_counter()
+    summaries = {}
+    latencies = []
+    with executor:
+        futures = [executor.submit(_timed_process_wallet, address, args, kwargs) for address in wallet_addresses]
+        for future in futures:
+            wallet_address, summary, elapsed = future.result()
+            summaries[wallet_address] = summary
+            latencies.append(elapsed)
+    elapsed = time.perf_counter() - start
+
+    stats = {
+        "wallets": len(summaries),
+        "elapsed_seconds": elapsed,
+        "wallets_per_second": len(summaries) / elapsed if elapsed > 0 else 0.0,
+        "mean_wallet_seconds": sum(latencies) / len(latencies) if latencies else 0.0,
+        "max_wallet_seconds": max(latencies, default=0.0),
+        "total_profit": sum(summary["total_profit"] for summary in summaries.values()),
+        "total_tax": sum(summary["total_tax"] for summary in summaries.values()),
+    }
+    logging.info(f"Processed {stats['wallets']} wallets in {elapsed:.2f}s ({stats['wallets_per_second']:.2f} wallets/s)")
+    return {"wallets": summaries, "stats": stats}
@@ -1,36 +1,302 @@
 import logging
-from collections import defaultdict
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from src.utils.metrics import metrics
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".vertax", "price_cache.sqlite3")
+
+# Seconds a "known missing" price is remembered before the providers are asked again
+DEFAULT_NEGATIVE_TTL = 3600
+
+# Persistent stores only run the (comparatively expensive) size check every N writes
+EVICTION_CHECK_INTERVAL = 500
+
+cache_requests = metrics.counter("vertax_cache_requests_total",
+                                 "Price cache lookups by result (hit, miss or negative_hit).")
+
+
+class MemoryCacheBackend:
+    """
+    Process-local price store with least-recently-used ordering.
+    """
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, token, timestamp):
+        """
+        Returns the (price, stored_at) entry for a token/timestamp, or None.
+        """
+        with self.lock:
+            entry = self.entries.get((token, timestamp))
+            if entry is not None:
+                self.entries.move_to_end((token, timestamp))
+            return entry
+
+    def set(self, token, timestamp, price, stored_at):
+        """
+        Inserts or replaces a price entry.
+        """
+        with self.lock:
+            self.entries[(token, timestamp)] = (price, stored_at)
+            self.entries.move_to_end((token, timestamp))
+
+    def evict(self, max_entries=None, max_age=None, negative_ttl=None):
+        """
+        Drops prices older than max_age seconds and missing-price markers older
+        than negative_ttl seconds, then the least recently used entries until
+        at most max_entries remain.
+
+        Returns:
+            int: Number of evicted entries.
+        """
+        evicted = 0
+        with self.lock:
+            if max_age is not None or negative_ttl is not None:
+                now = time.time()
+                stale = []
+                for key, (price, stored_at) in self.entries.items():
+                    ttl = negative_ttl if price is None else max_age
+                    if ttl is not None and stored_at < now - ttl:
+                        stale.append(key)
+                for key in stale:
+                    del self.entries[key]
+                evicted += len(stale)
+            if max_entries is not None:
+                while len(self.entries) > max_entries:
+                    self.entries.popitem(last=False)
+                    evicted += 1
+        return evicted
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class SQLiteCacheBackend:
+    """
+    Persistent price store backed by a SQLite file.
+
+    The file can be shared by several runs and worker processes; WAL journaling
+    lets readers proceed while another process writes.
+    """
+    def __init__(self, db_path=DEFAULT_CACHE_PATH):
+        self.db_path = db_path
+        self.local = threading.local()
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS prices ("
+            "token TEXT NOT NULL, "
+            "timestamp INTEGER NOT NULL, "
+            "price REAL, "
+            "stored_at REAL NOT NULL, "
+            "PRIMARY KEY (token, timestamp))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS prices_stored_at ON prices (stored_at)")
+
+    def _connection(self):
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            self.local.conn = conn
+        return conn
+
+    def get(self, token, timestamp):
+        """
+        Returns the (price, stored_at) entry for a token/timestamp, or None.
+        """
+        row = self._connection().execute(
+            "SELECT price, stored_at FROM prices WHERE token = ? AND timestamp = ?",
+            (token, timestamp),
+        ).fetchone()
+        return tuple(row) if row is not None else None
+
+    def set(self, token, timestamp, price, stored_at):
+        """
+        Inserts or replaces a price entry.
+        """
+        self._connection().execute(
+            "INSERT OR REPLACE INTO prices (token, timestamp, price, stored_at) VALUES (?, ?, ?, ?)",
+            (token, timestamp, price, stored_at),
+        )
+
+    def load(self, tokens=None, max_age=None):
+        """
+        Yields stored (token, timestamp, price, stored_at) rows, optionally
+        restricted to some tokens and to entries younger than max_age seconds.
+        """
+        query = "SELECT token, timestamp, price, stored_at FROM prices WHERE 1 = 1"
+        params = []
+        if tokens:
+            tokens = list(tokens)
+            query += f" AND token IN ({', '.join('?' * len(tokens))})"
+            params.extend(tokens)
+        if max_age is not None:
+            query += " AND stored_at >= ?"
+            params.append(time.time() - max_age)
+        query += " ORDER BY stored_at"
+        yield from self._connection().execute(query, params)
+
+    def evict(self, max_entries=None, max_age=None, negative_ttl=None):
+        """
+        Drops prices older than max_age seconds and missing-price markers older
+        than negative_ttl seconds, then the oldest entries until at most
+        max_entries remain.
+
+        Returns:
+            int: Number of evicted entries.
+        """
+        conn = self._connection()
+        evicted = 0
+        if max_age is not None:
+            evicted += conn.execute(
+                "DELETE FROM prices WHERE price IS NOT NULL AND stored_at < ?", (time.time() - max_age,)
+            ).rowcount
+        if negative_ttl is not None:
+            evicted += conn.execute(
+                "DELETE FROM prices WHERE price IS NULL AND stored_at < ?", (time.time() - negative_ttl,)
+            ).rowcount
+        if max_entries is not None:
+            excess = len(self) - max_entries
+            if excess > 0:
+                evicted += conn.execute(
+                    "DELETE FROM prices WHERE rowid IN "
+                    "(SELECT rowid FROM prices ORDER BY stored_at LIMIT ?)",
+                    (excess,),
+                ).rowcount
+        return evicted
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM prices").fetchone()[0]
+
+
+CACHE_BACKENDS = {
+    "memory": MemoryCacheBackend,
+    "sqlite": SQLiteCacheBackend,
+}
+
 
 class CacheManager:
     """
     Handles caching of price data to reduce API calls.
+
+    Prices are always held in a process-local memory layer. With the "sqlite"
+    backend they are also written through to a file on disk, so historical
+    prices survive between runs and are shared by every worker pointing at the
+    same file.
+
+    Lookups the providers had no data for are stored as missing-price markers
+    (a NULL price) that expire after negative_ttl, independently of max_age.
     """
-    def __init__(self):
-        # Use defaultdict to simplify checking for missing data
-        self.cache = defaultdict(dict)
+    def __init__(self, backend="memory", db_path=DEFAULT_CACHE_PATH, max_entries=None, max_age=None,
+                 warm_start=False, negative_ttl=DEFAULT_NEGATIVE_TTL):
+        """
+        Args:
+            backend (str): "memory" for a process-local cache, "sqlite" for a persistent one.
+            db_path (str): Location of the SQLite file when backend is "sqlite".
+            max_entries (int, optional): Maximum number of cached prices before the oldest are evicted.
+            max_age (float, optional): Maximum age of a cached price in seconds.
+            warm_start (bool): Preload the memory layer from the persistent store.
+            negative_ttl (float): Seconds a missing-price marker is kept.
+        """
+        if backend not in CACHE_BACKENDS:
+            raise ValueError(f"Unknown cache backend '{backend}'. Choose one of: {', '.join(CACHE_BACKENDS)}.")
+
+        self.backend = backend
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.negative_ttl = negative_ttl
+        self.memory = MemoryCacheBackend()
+        self.store = SQLiteCacheBackend(db_path) if backend == "sqlite" else None
+        self.writes_since_eviction = 0
 
-    def get_cached_price(self, timestamp, token):
+        if warm_start:
+            self.warm_start()
+
+    def _is_fresh(self, price, stored_at):
+        ttl = self.negative_ttl if price is None else self.max_age
+        return ttl is None or stored_at >= time.time() - ttl
+
+    def _lookup(self, timestamp, token):
+        entry = self.memory.get(token, timestamp)
+        if entry is None and self.store is not None:
+            entry = self.store.get(token, timestamp)
+            if entry is not None:
+                self.memory.set(token, timestamp, *entry)
+        if entry is not None and self._is_fresh(*entry):
+            return entry
+        return None
+
+    def get_cached_price(self, timestamp, token, record_metrics=True):
         """
         Retrieves cached price data if available.
 
         Args:
             timestamp (int): The Unix timestamp for the price.
             token (str): The token symbol.
+            record_metrics (bool): Count the lookup as a hit, miss or negative hit.
+                Repeat checks within one request pass False so it is counted once.
 
         Returns:
-            float or None: Cached price if found, None otherwise.
+            float or None: Cached price if found, None otherwise (including known-missing prices).
         """
         try:
-            cached_price = self.cache[token].get(timestamp)
+            entry = self._lookup(timestamp, token)
+            cached_price = entry[0] if entry is not None else None
+
             if cached_price is not None:
+                result = "hit"
                 logging.info(f"Cache hit: {token} at {timestamp} => {cached_price}")
+            elif entry is not None:
+                result = "negative_hit"
+                logging.info(f"Negative cache hit: no price for {token} at {timestamp}")
             else:
+                result = "miss"
                 logging.info(f"Cache miss: {token} at {timestamp}")
+            if record_metrics:
+                cache_requests.inc(result=result)
             return cached_price
-        except KeyError as e:
+        except (KeyError, sqlite3.Error) as e:
             logging.error(f"Error retrieving cached price for token {token} at {timestamp}: {e}")
             return None
 
+    def is_price_missing(self, timestamp, token):
+        """
+        Checks whether the providers recently had no price for a token/timestamp.
+        Not counted in the cache metrics; get_cached_price already counts the
+        lookup as a negative hit.
+
+        Args:
+            timestamp (int): The Unix timestamp for the price.
+            token (str): The token symbol.
+
+        Returns:
+            bool: True if a missing-price marker younger than negative_ttl is cached.
+        """
+        try:
+            entry = self._lookup(timestamp, token)
+        except (KeyError, sqlite3.Error) as e:
+            logging.error(f"Error retrieving cached price for token {token} at {timestamp}: {e}")
+            return False
+        return entry is not None and entry[0] is None
+
+    def store_missing(self, timestamp, token):
+        """
+        Remembers that no price is available for a token/timestamp, so it is
+        not requested again until negative_ttl has passed.
+
+        Args:
+            timestamp (int): The Unix timestamp for the price.
+            token (str): The token symbol.
+        """
+        self.store_price(timestamp, token, None)
+
     def store_price(self, timestamp, token, price):
         """
         Stores price data in the cache.
@@ -41,7 +307,70 @@ class CacheManager:
             price (float): The price to cache.
         """
         try:
-            self.cache[token][timestamp] = price
-            logging.info(f"Stored price for {token} at {timestamp} => {price}")
+            stored_at = time.time()
+            self.memory.set(token, timestamp, price, stored_at)
+            if self.store is not None:
+                self.store.set(token, timestamp, price, stored_at)
+            if price is None:
+                logging.info(f"Stored missing-price marker for {token} at {timestamp}")
+            else:
+                logging.info(f"Stored price for {token} at {timestamp} => {price}")
         except Exception as e:
             logging.error(f"Error storing price for {token} at {timestamp}: {e}")
+            return
+
+        self.writes_since_eviction += 1
+        if self.max_entries is not None and len(self.memory) > self.max_entries:
+            self.memory.evict(max_entries=self.max_entries)
+        if self.store is not None and self.writes_since_eviction >= EVICTION_CHECK_INTERVAL:
+            self.evict()
+
+    def warm_start(self, tokens=None):
+        """
+        Loads prices from the persistent store into the memory layer.
+
+        Args:
+            tokens (iterable, optional): Only load prices for these token symbols.
+
+        Returns:
+            int: Number of prices loaded.
+        """
+        if self.store is None:
+            return 0
+
+        loaded = 0
+        try:
+            # Markers may outlive max_age, so the store is filtered on the longer of the two (None never expires)
+            if self.max_age is None or self.negative_ttl is None:
+                load_age = None
+            else:
+                load_age = max(self.max_age, self.negative_ttl)
+            for token, timestamp, price, stored_at in self.store.load(tokens, load_age):
+                if self._is_fresh(price, stored_at):
+                    self.memory.set(token, timestamp, price, stored_at)
+                    loaded += 1
+        except sqlite3.Error as e:
+            logging.error(f"Error warming price cache from {self.store.db_path}: {e}")
+
+        if self.max_entries is not None:
+            self.memory.evict(max_entries=self.max_entries)
+        logging.info(f"Warm-started price cache with {loaded} entries.")
+        return loaded
+
+    def evict(self):
+        """
+        Applies the size and age limits to every cache layer.
+
+        Returns:
+            int: Number of entries evicted from the persistent store (or memory if there is none).
+        """
+        self.writes_since_eviction = 0
+        evicted = self.memory.evict(self.max_entries, self.max_age, self.negative_ttl)
+        if self.store is not None:
+            try:
+                evicted = self.store.evict(self.max_entries, self.max_age, self.negative_ttl)
+            except sqlite3.Error as e:
+                logging.error(f"Error evicting entries from {self.store.db_path}: {e}")
+        if evicted:
+            logging.info(f"Evicted {evicted} cached prices.")
+        return evicted
@@ -0,0 +1,132 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from src.utils.privacy import TransactionSecurity
+
+DEFAULT_CHECKPOINT_PATH = os.path.join(os.path.expanduser("~"), ".vertax", "checkpoints.sqlite3")
+
+class CheckpointStore:
+    """
+    Persists per-wallet processing state (newest processed signature and slot,
+    plus running totals) in a SQLite file so later runs only need to process
+    transactions newer than the checkpoint.
+
+    With a tokenization key, checkpoints are keyed by each wallet's
+    pseudonym (TransactionSecurity.tokenize_value) instead of its address, so
+    the file never contains wallet addresses and lookups need no decryption.
+    """
+    def __init__(self, db_path=DEFAULT_CHECKPOINT_PATH, tokenization_key=None):
+        """
+        Args:
+            db_path (str): Location of the SQLite checkpoint file.
+            tokenization_key (bytes, optional): Key wallet addresses are pseudonymized with; must stay
+                the same between runs for checkpoints to be found.
+        """
+        self.db_path = db_path
+        self.tokenization_key = tokenization_key
+        self.local = threading.local()
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "wallet_address TEXT PRIMARY KEY, "
+            "last_signature TEXT, "
+            "last_slot INTEGER, "
+            "total_profit REAL NOT NULL, "
+            "total_tax REAL NOT NULL, "
+            "updated_at REAL NOT NULL)"
+        )
+
+    def __getstate__(self):
+        # Connections stay with the process that opened them; a copy sent to a worker opens its own
+        return {"db_path": self.db_path, "tokenization_key": self.tokenization_key}
+
+    def __setstate__(self, state):
+        self.db_path = state["db_path"]
+        self.tokenization_key = state["tokenization_key"]
+        self.local = threading.local()
+
+    def _connection(self):
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            self.local.conn = conn
+        return conn
+
+    def _wallet_key(self, wallet_address):
+        if self.tokenization_key is None:
+            return wallet_address
+        return TransactionSecurity.tokenize_value(wallet_address, self.tokenization_key)
+
+    def load(self, wallet_address):
+        """
+        Retrieves the stored checkpoint for a wallet.
+
+        Args:
+            wallet_address (str): Solana wallet address.
+
+        Returns:
+            dict or None: Checkpoint with last_signature, last_slot, total_profit,
+            total_tax and updated_at, or None if the wallet has not been processed.
+        """
+        wallet_key = self._wallet_key(wallet_address)
+        try:
+            row = self._connection().execute(
+                "SELECT last_signature, last_slot, total_profit, total_tax, updated_at "
+                "FROM checkpoints WHERE wallet_address = ?",
+                (wallet_key,),
+            ).fetchone()
+        except sqlite3.Error as e:
+            logging.error(f"Error loading checkpoint for wallet {wallet_key}: {e}")
+            return None
+
+        if row is None:
+            return None
+        return {
+            "last_signature": row[0],
+            "last_slot": row[1],
+            "total_profit": row[2],
+            "total_tax": row[3],
+            "updated_at": row[4],
+        }
+
+    def save(self, wallet_address, last_signature, last_slot, total_profit, total_tax):
+        """
+        Stores the checkpoint for a wallet, replacing any previous one.
+
+        Args:
+            wallet_address (str): Solana wallet address.
+            last_signature (str): Newest processed transaction signature.
+            last_slot (int): Slot of the newest processed transaction.
+            total_profit (float): Running total profit including this run.
+            total_tax (float): Running total tax including this run.
+        """
+        wallet_key = self._wallet_key(wallet_address)
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO checkpoints "
+                "(wallet_address, last_signature, last_slot, total_profit, total_tax, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (wallet_key, last_signature, last_slot, total_profit, total_tax, time.time()),
+            )
+            logging.info(f"Saved checkpoint for wallet {wallet_key} at {last_signature}")
+        except sqlite3.Error as e:
+            logging.error(f"Error saving checkpoint for wallet {wallet_key}: {e}")
+
+    def delete(self, wallet_address):
+        """
+        Removes a wallet's checkpoint so the next run reprocesses its full history.
+
+        Args:
+            wallet_address (str): Solana wallet address.
+        """
+        wallet_key = self._wallet_key(wallet_address)
+        try:
+            self._connection().execute("DELETE FROM checkpoints WHERE wallet_address = ?", (wallet_key,))
+        except sqlite3.Error as e:
+            logging.error(f"Error deleting checkpoint for wallet {wallet_key}: {e}")
@@ -0,0 +1,159 @@
+import logging
+import threading
+import time
+from src.utils.metrics import metrics
+
+logging.basicConfig(level=logging.INFO)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+DEFAULT_FAILURE_THRESHOLD = 5  # Consecutive failures that open the circuit
+DEFAULT_RESET_TIMEOUT = 30.0   # Seconds an open circuit waits before probing
+
+circuit_transitions = metrics.counter("vertax_circuit_transitions_total", "Circuit breaker state changes.")
+circuit_rejections = metrics.counter("vertax_circuit_rejections_total", "Calls short-circuited by an open breaker.")
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling a dependency whose circuit is open.
+    """
+
+def is_outage(error):
+    """
+    Tells whether a failed request means the dependency itself is failing:
+    no response at all (connection errors, timeouts), a 5xx or a 429. Other
+    client errors, such as an unknown token or a malformed request, mean it
+    is up and should not count towards opening the circuit.
+
+    Args:
+        error (Exception): The exception the request raised.
+
+    Returns:
+        bool: True if the error should be recorded as a failure.
+    """
+    response = getattr(error, "response", None)
+    return response is None or response.status_code >= 500 or response.status_code == 429
+
+class CircuitBreaker:
+    """
+    Stops calling a failing dependency until it has had time to recover.
+
+    The circuit starts closed. After failure_threshold consecutive failures it
+    opens, and calls are rejected straight away. Once reset_timeout has passed
+    it goes half-open and lets a single probe call through. If the probe
+    succeeds the circuit closes; if it fails the circuit opens again.
+    """
+    def __init__(self, name, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT,
+                 clock=time.monotonic):
+        """
+        Args:
+            name (str): Dependency name used in logs and metrics.
+            failure_threshold (int): Consecutive failures that open the circuit.
+            reset_timeout (float): Seconds an open circuit waits before allowing a probe.
+            clock (callable): Monotonic clock (replaceable in tests).
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started_at = None
+        self.lock = threading.Lock()
+
+    def _transition(self, state):
+        if state != self.state:
+            logging.warning(f"Circuit '{self.name}' {self.state} -> {state}")
+            circuit_transitions.inc(breaker=self.name, state=state)
+            self.state = state
+
+    def allow_request(self):
+        """
+        Decides whether a call may go through, moving an open circuit to
+        half-open once its reset timeout has passed.
+
+        Returns:
+            bool: True if the call may be made.
+        """
+        with self.lock:
+            now = self.clock()
+            if self.state == OPEN and now - self.opened_at >= self.reset_timeout:
+                self._transition(HALF_OPEN)
+                self.probe_started_at = None
+
+            if self.state == CLOSED:
+                return True
+            # A probe that never reported back is given up on after another reset timeout
+            if self.state == HALF_OPEN and (self.probe_started_at is None
+                                            or now - self.probe_started_at >= self.reset_timeout):
+                self.probe_started_at = now
+                return True
+
+        circuit_rejections.inc(breaker=self.name)
+        return False
+
+    def check(self):
+        """
+        Raises CircuitOpenError if a call may not go through.
+        """
+        if not self.allow_request():
+            raise CircuitOpenError(f"Circuit '{self.name}' is open; skipping call.")
+
+    def record_success(self):
+        """
+        Records a successful call, closing a half-open circuit.
+        """
+        with self.lock:
+            self.failures = 0
+            self._transition(CLOSED)
+
+    def record_failure(self):
+        """
+        Records a failed call, opening the circuit once the threshold is reached
+        or immediately if a half-open probe failed.
+        """
+        with self.lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+                self._transition(OPEN)
+
+    def reset(self):
+        """
+        Forces the circuit closed and forgets past failures.
+        """
+        with self.lock:
+            self.failures = 0
+            self._transition(CLOSED)
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(name, **kwargs):
+    """
+    Returns the shared breaker for a dependency, creating it on first use.
+
+    Args:
+        name (str): Dependency name (e.g. "rpc:<url>").
+        **kwargs: CircuitBreaker options used when the breaker is created.
+
+    Returns:
+        CircuitBreaker: The breaker.
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name, **kwargs)
+        return breaker
+
+def reset_breakers():
+    """
+    Closes every shared breaker.
+    """
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    for breaker in breakers:
+        breaker.reset()
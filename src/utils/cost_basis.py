@@ -0,0 +1,238 @@
+import heapq
+import itertools
+import logging
+from datetime import datetime
+from src.utils.tax_rules import apply_tax_rule, holding_period_from_timestamps
+
+logging.basicConfig(level=logging.INFO)
+
+# Amounts below this are treated as zero, so float residue does not leave dust lots behind
+AMOUNT_EPSILON = 1e-12
+
+# Heap key per matching method; the lot sequence number breaks ties in acquisition order
+LOT_ORDERS = {
+    "fifo": lambda lot: (lot.timestamp, lot.seq),
+    "lifo": lambda lot: (-lot.timestamp, -lot.seq),
+    "hifo": lambda lot: (-lot.price, lot.seq),
+}
+
+BUY_SIDES = ("buy", "acquire")
+SELL_SIDES = ("sell", "dispose")
+
+class Lot:
+    """
+    Open position from a single acquisition; amount shrinks as it is sold.
+    """
+    __slots__ = ("token_symbol", "amount", "price", "timestamp", "seq")
+
+    def __init__(self, token_symbol, amount, price, timestamp, seq):
+        self.token_symbol = token_symbol
+        self.amount = amount
+        self.price = price
+        self.timestamp = timestamp
+        self.seq = seq
+
+class RealizedGain:
+    """
+    Gain or loss realized by selling (part of) one lot.
+    """
+    __slots__ = ("token_symbol", "amount", "purchase_time", "sell_time", "purchase_price", "sell_price")
+
+    def __init__(self, token_symbol, amount, purchase_time, sell_time, purchase_price, sell_price):
+        self.token_symbol = token_symbol
+        self.amount = amount
+        self.purchase_time = purchase_time
+        self.sell_time = sell_time
+        self.purchase_price = purchase_price
+        self.sell_price = sell_price
+
+    @property
+    def cost_basis(self):
+        return self.purchase_price * self.amount
+
+    @property
+    def proceeds(self):
+        return self.sell_price * self.amount
+
+    @property
+    def profit(self):
+        return (self.sell_price - self.purchase_price) * self.amount
+
+    @property
+    def holding_period(self):
+        return holding_period_from_timestamps(self.purchase_time, self.sell_time)
+
+    # Naive UTC dates, so a holding period recomputed from them matches holding_period
+    @property
+    def purchase_date(self):
+        return datetime.utcfromtimestamp(self.purchase_time)
+
+    @property
+    def sell_date(self):
+        return datetime.utcfromtimestamp(self.sell_time)
+
+    def tax(self, short_term_rate, long_term_rate):
+        """
+        Applies the short- or long-term rate to this gain.
+
+        Returns:
+            float: Tax amount.
+        """
+        return apply_tax_rule(self.profit, self.holding_period, short_term_rate, long_term_rate)
+
+    def to_dict(self):
+        """
+        Returns the gain as a report row (the shape generate_tax_report and calculate_tax_data read).
+        """
+        return {
+            "token_symbol": self.token_symbol,
+            "amount": self.amount,
+            "purchase_date": self.purchase_date,
+            "sell_date": self.sell_date,
+            "purchase_price": self.purchase_price,
+            "sell_price": self.sell_price,
+            "cost_basis": self.cost_basis,
+            "proceeds": self.proceeds,
+            "profit": self.profit,
+            "holding_period": self.holding_period,
+        }
+
+class LotMatcher:
+    """
+    Matches disposals against open lots under FIFO, LIFO or HIFO.
+
+    Open lots are kept in one priority queue per token, ordered by the
+    method's key (acquisition time, reverse acquisition time or highest unit
+    price), so each acquisition and each consumed lot costs O(log n). A
+    disposal larger than the best lot consumes it and moves on to the next;
+    a smaller one leaves the remainder in place.
+    """
+    def __init__(self, method="fifo"):
+        """
+        Args:
+            method (str): "fifo", "lifo" or "hifo".
+        """
+        method = method.lower()
+        if method not in LOT_ORDERS:
+            raise ValueError(f"Unknown lot matching method '{method}'. Choose one of: {', '.join(LOT_ORDERS)}.")
+        self.method = method
+        self.order = LOT_ORDERS[method]
+        self.lots = {}
+        self.last_timestamps = {}
+        self.unmatched = {}
+        self.sequence = itertools.count()
+
+    def _check_order(self, token_symbol, timestamp):
+        last = self.last_timestamps.get(token_symbol)
+        if last is not None and timestamp < last:
+            raise ValueError(f"Fills for {token_symbol} must be in chronological order ({timestamp} after {last}).")
+        self.last_timestamps[token_symbol] = timestamp
+
+    def acquire(self, token_symbol, amount, price, timestamp):
+        """
+        Opens a lot.
+
+        Args:
+            token_symbol (str): The token symbol.
+            amount (float): Tokens acquired.
+            price (float): Unit price paid.
+            timestamp (int): Unix timestamp of the acquisition.
+        """
+        if amount <= 0:
+            raise ValueError("Acquired amount must be positive.")
+        self._check_order(token_symbol, timestamp)
+        lot = Lot(token_symbol, amount, price, timestamp, next(self.sequence))
+        heapq.heappush(self.lots.setdefault(token_symbol, []), (self.order(lot), lot))
+
+    def dispose(self, token_symbol, amount, price, timestamp):
+        """
+        Sells tokens out of the open lots.
+
+        Args:
+            token_symbol (str): The token symbol.
+            amount (float): Tokens sold.
+            price (float): Unit sale price.
+            timestamp (int): Unix timestamp of the sale.
+
+        Returns:
+            list: RealizedGain records, one per lot touched.
+        """
+        if amount <= 0:
+            raise ValueError("Disposed amount must be positive.")
+        self._check_order(token_symbol, timestamp)
+
+        heap = self.lots.get(token_symbol, [])
+        gains = []
+        remaining = amount
+        while remaining > AMOUNT_EPSILON and heap:
+            lot = heap[0][1]
+            used = min(lot.amount, remaining)
+            gains.append(RealizedGain(token_symbol, used, lot.timestamp, timestamp, lot.price, price))
+            remaining -= used
+            # The heap key does not depend on the amount, so a partly used lot stays in place
+            lot.amount -= used
+            if lot.amount <= AMOUNT_EPSILON:
+                heapq.heappop(heap)
+
+        if remaining > AMOUNT_EPSILON:
+            self.unmatched[token_symbol] = self.unmatched.get(token_symbol, 0) + remaining
+            logging.warning(f"Sold {remaining} {token_symbol} at {timestamp} without a matching lot; "
+                            f"no cost basis recorded for it.")
+        return gains
+
+    def open_lots(self, token_symbol):
+        """
+        Returns the token's open lots in matching order.
+        """
+        return [lot for _, lot in sorted(self.lots.get(token_symbol, []))]
+
+    def holdings(self, token_symbol):
+        """
+        Returns the amount of a token still held in open lots.
+        """
+        return sum(lot.amount for _, lot in self.lots.get(token_symbol, []))
+
+def match_lots(fills, method="fifo", matcher=None):
+    """
+    Streams realized gains from a chronological stream of fills.
+
+    Args:
+        fills (iterable): Dicts with 'side' ("buy" or "sell"), 'token_symbol',
+            'amount', 'price' and 'timestamp', ordered by timestamp per token.
+        method (str): "fifo", "lifo" or "hifo".
+        matcher (LotMatcher, optional): Matcher to continue from (e.g. lots carried over from earlier years).
+
+    Yields:
+        RealizedGain: One record per lot consumed by each sale.
+    """
+    matcher = matcher or LotMatcher(method)
+    for fill in fills:
+        side = fill["side"]
+        args = (fill["token_symbol"], fill["amount"], fill["price"], fill["timestamp"])
+        if side in BUY_SIDES:
+            matcher.acquire(*args)
+        elif side in SELL_SIDES:
+            yield from matcher.dispose(*args)
+        else:
+            raise ValueError(f"Unknown fill side '{side}'.")
+
+def realized_tax_totals(gains, short_term_rate, long_term_rate):
+    """
+    Sums profit and tax over realized gains.
+
+    Args:
+        gains (iterable): RealizedGain records (e.g. from match_lots).
+        short_term_rate (float): Tax rate for short-term holdings.
+        long_term_rate (float): Tax rate for long-term holdings.
+
+    Returns:
+        dict: {"total_profit": float, "total_tax": float, "matched_lots": int}
+    """
+    total_profit = 0.0
+    total_tax = 0.0
+    matched_lots = 0
+    for gain in gains:
+        total_profit += gain.profit
+        total_tax += gain.tax(short_term_rate, long_term_rate)
+        matched_lots += 1
+    return {"total_profit": total_profit, "total_tax": total_tax, "matched_lots": matched_lots}
@@ -1,44 +1,306 @@
 import requests
 import logging
 import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from src.utils.circuit_breaker import CircuitOpenError, get_breaker, is_outage
+from src.utils.http_client import get_http_client
+from src.utils.metrics import metrics
 
-def fetch_transactions(wallet_address, rpc_url):
+# Largest page the signature RPC method returns
+DEFAULT_PAGE_SIZE = 1000
+
+# getTransaction calls packed into one JSON-RPC batch, and batches kept in flight at once
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_BATCH_WORKERS = 4
+
+rpc_calls = metrics.counter("vertax_rpc_calls_total", "Solana RPC requests by method and outcome.")
+rpc_latency = metrics.histogram("vertax_rpc_latency_seconds", "Solana RPC request latency.")
+
+def _post_rpc(method, rpc_url, payload, headers, http_client=None):
+    """
+    Sends a JSON-RPC request through the endpoint's circuit breaker, recording
+    its latency and outcome.
+
+    Raises:
+        CircuitOpenError: If the endpoint's circuit is open.
+    """
+    breaker = get_breaker(f"rpc:{rpc_url}")
+    try:
+        breaker.check()
+    except CircuitOpenError:
+        rpc_calls.inc(method=method, outcome="open")
+        raise
+
+    start = time.perf_counter()
+    try:
+        response = (http_client or get_http_client()).post(rpc_url, json=payload, headers=headers)
+        response.raise_for_status()
+    except Exception as e:
+        rpc_calls.inc(method=method, outcome="error")
+        # A 4xx (e.g. a bad signature) means the node is up, so it does not count towards opening the circuit
+        if is_outage(e):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        raise
+    finally:
+        rpc_latency.observe(time.perf_counter() - start, method=method)
+    rpc_calls.inc(method=method, outcome="ok")
+    breaker.record_success()
+    return response
+
+def _fetch_signature_page(wallet_address, rpc_url, limit, before=None, until=None, http_client=None):
+    """
+    Requests a single page of signatures, newest first.
+
+    Args:
+        wallet_address (str): Solana wallet address to fetch signatures for.
+        rpc_url (str): Solana RPC endpoint URL.
+        limit (int): Maximum number of signatures in the page.
+        before (str, optional): Only return signatures older than this one.
+        until (str, optional): Stop at this signature (exclusive).
+        http_client (HttpClient, optional): Transport to use (default is the shared client).
+
+    Returns:
+        list: Signature entries in the page.
+    """
+    options = {"limit": limit}
+    if before:
+        options["before"] = before
+    if until:
+        options["until"] = until
+
+    headers = {"Content-Type": "application/json"}
+    payload = {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "getConfirmedSignaturesForAddress2",
+        "params": [wallet_address, options]
+    }
+    logging.debug(f"Sending request to {rpc_url} for wallet {wallet_address} (before={before})")
+
+    response = _post_rpc("getConfirmedSignaturesForAddress2", rpc_url, payload, headers, http_client)
+    return response.json().get("result", [])
+
+def iter_signatures(wallet_address, rpc_url, page_size=DEFAULT_PAGE_SIZE, before=None, until=None, http_client=None):
+    """
+    Streams a wallet's signatures, newest first, paging with `before`/`until`
+    cursors until the history is exhausted. The next page is requested in the
+    background while the caller consumes the current one.
+
+    Args:
+        wallet_address (str): Solana wallet address to fetch signatures for.
+        rpc_url (str): Solana RPC endpoint URL.
+        page_size (int): Signatures requested per RPC call (at most 1000).
+        before (str, optional): Start from signatures older than this one.
+        until (str, optional): Stop once this signature is reached (exclusive).
+        http_client (HttpClient, optional): Transport to use (default is the shared client).
+
+    Yields:
+        dict: Raw signature entries.
+
+    Raises:
+        requests.exceptions.RequestException: If a page cannot be fetched.
+    """
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="signature-pager") as executor:
+        pending = executor.submit(_fetch_signature_page, wallet_address, rpc_url, page_size, before, until, http_client)
+        pages = 0
+        while pending is not None:
+            page = pending.result()
+            pages += 1
+            pending = None
+            if len(page) >= page_size:
+                cursor = page[-1].get("signature")
+                pending = executor.submit(_fetch_signature_page, wallet_address, rpc_url, page_size, cursor, until,
+                                          http_client)
+            logging.debug(f"Received page {pages} with {len(page)} signatures for wallet {wallet_address}.")
+            yield from page
+
+def _normalize_transaction(signature, result):
+    """
+    Flattens a getTransaction result into the fields the transaction parser reads.
+    """
+    message = (result.get("transaction") or {}).get("message") or {}
+    meta = result.get("meta") or {}
+    return {
+        "signature": signature,
+        "slot": result.get("slot"),
+        "blockTime": result.get("blockTime"),
+        "instructions": message.get("instructions", []),
+        "status": "failed" if meta.get("err") else "success",
+    }
+
+def _get_transaction_request(request_id, signature):
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "method": "getTransaction",
+        "params": [signature, {"encoding": "jsonParsed", "maxSupportedTransactionVersion": 0}]
+    }
+
+def _reply_result(reply):
+    # Replies that are not objects, or carry an error instead of a transaction, have no usable result
+    result = reply.get("result") if isinstance(reply, dict) else None
+    return result if isinstance(result, dict) else None
+
+def _fetch_transactions_individually(signatures, rpc_url, http_client=None):
+    """
+    Fetches full transaction bodies with one getTransaction request per
+    signature, for nodes that answer batch requests with a single error.
+    """
+    headers = {"Content-Type": "application/json"}
+    transactions = []
+    for signature in signatures:
+        reply = _post_rpc("getTransaction", rpc_url, _get_transaction_request(0, signature), headers,
+                          http_client).json()
+        result = _reply_result(reply)
+        if result is None:
+            error = reply.get("error") if isinstance(reply, dict) else reply
+            logging.warning(f"No transaction details returned for {signature}: {error or 'missing result'}")
+            continue
+        transactions.append(_normalize_transaction(signature, result))
+    return transactions
+
+def _fetch_transaction_batch(signatures, rpc_url, http_client=None):
+    """
+    Fetches full transaction bodies for several signatures in one JSON-RPC batch request.
+
+    Args:
+        signatures (list): Transaction signatures.
+        rpc_url (str): Solana RPC endpoint URL.
+        http_client (HttpClient, optional): Transport to use (default is the shared client).
+
+    Returns:
+        list: Normalized transactions, in the order of the signatures. Signatures
+        the node has no transaction for are skipped. If the node rejects the
+        batch as a whole, the signatures are fetched one request at a time.
+    """
+    headers = {"Content-Type": "application/json"}
+    payload = [_get_transaction_request(request_id, signature) for request_id, signature in enumerate(signatures)]
+    logging.debug(f"Sending batch of {len(signatures)} getTransaction calls to {rpc_url}")
+
+    response = _post_rpc("getTransaction", rpc_url, payload, headers, http_client)
+    replies = response.json()
+
+    if not isinstance(replies, list):
+        # Nodes answer a rejected or unsupported batch with a single error object
+        error = replies.get("error", replies) if isinstance(replies, dict) else replies
+        logging.warning(f"RPC rejected batch request ({error}); fetching {len(signatures)} transactions one by one.")
+        return _fetch_transactions_individually(signatures, rpc_url, http_client)
+
+    replies_by_id = {reply.get("id"): reply for reply in replies if isinstance(reply, dict)}
+    transactions = []
+    for request_id, signature in enumerate(signatures):
+        reply = replies_by_id.get(request_id)
+        result = _reply_result(reply)
+        if result is None:
+            error = reply.get("error") if reply is not None else None
+            logging.warning(f"No transaction details returned for {signature}: {error or 'missing reply'}")
+            continue
+        transactions.append(_normalize_transaction(signature, result))
+    return transactions
+
+def iter_transaction_details(signatures, rpc_url, batch_size=DEFAULT_BATCH_SIZE, max_workers=DEFAULT_BATCH_WORKERS,
+                             http_client=None):
+    """
+    Streams full transaction bodies for a sequence of signatures, packing the
+    getTransaction calls into JSON-RPC batches and keeping up to max_workers
+    batches in flight. Transactions are yielded in input order.
+
+    Args:
+        signatures (iterable): Signature strings or signature entries (e.g. from iter_signatures).
+        rpc_url (str): Solana RPC endpoint URL.
+        batch_size (int): getTransaction calls per batch request.
+        max_workers (int): Maximum number of concurrent batch requests.
+        http_client (HttpClient, optional): Transport to use (default is the shared client).
+
+    Yields:
+        dict: Normalized transactions with signature, slot, blockTime, instructions and status.
+
+    Raises:
+        requests.exceptions.RequestException: If a batch cannot be fetched.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rpc-batch") as executor:
+        in_flight = deque()
+        batch = []
+        for entry in signatures:
+            batch.append(entry.get("signature") if isinstance(entry, dict) else entry)
+            if len(batch) < batch_size:
+                continue
+            in_flight.append(executor.submit(_fetch_transaction_batch, batch, rpc_url, http_client))
+            batch = []
+            if len(in_flight) >= max_workers:
+                yield from in_flight.popleft().result()
+
+        if batch:
+            in_flight.append(executor.submit(_fetch_transaction_batch, batch, rpc_url, http_client))
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+def fetch_transaction_details(signatures, rpc_url, batch_size=DEFAULT_BATCH_SIZE, max_workers=DEFAULT_BATCH_WORKERS,
+                              http_client=None):
+    """
+    Fetches full transaction bodies for many signatures using JSON-RPC batch requests.
+
+    Args:
+        signatures (iterable): Signature strings or signature entries (e.g. from fetch_transactions).
+        rpc_url (str): Solana RPC endpoint URL.
+        batch_size (int): getTransaction calls per batch request.
+        max_workers (int): Maximum number of concurrent batch requests.
+        http_client (HttpClient, optional): Transport to use (default is the shared client).
+
+    Returns:
+        list: Normalized transactions, empty list in case of error.
+    """
+    try:
+        transactions = list(iter_transaction_details(signatures, rpc_url, batch_size, max_workers, http_client))
+        logging.info(f"Fetched details for {len(transactions)} transactions.")
+        return transactions
+
+    except CircuitOpenError as e:
+        logging.warning(f"Skipping transaction details: {e}")
+        return []
+    except json.JSONDecodeError as e:
+        logging.error(f"Error decoding JSON response from RPC: {e}")
+        return []
+    except requests.exceptions.RequestException as e:
+        logging.error(f"Network error while fetching transaction details: {e}")
+        return []
+    except Exception as e:
+        logging.error(f"Unexpected error while fetching transaction details: {e}")
+        return []
+
+def fetch_transactions(wallet_address, rpc_url, http_client=None, until=None):
     """
     Fetches raw transaction data from the Solana blockchain.
 
     Args:
         wallet_address (str): Solana wallet address to fetch transactions for.
         rpc_url (str): Solana RPC endpoint URL.
+        http_client (HttpClient, optional): Transport to use (default is the shared client).
+        until (str, optional): Only fetch transactions newer than this signature.
 
     Returns:
         list: Raw transaction data, empty list if no transactions are found or in case of error.
     """
     try:
-        headers = {"Content-Type": "application/json"}
-        payload = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "getConfirmedSignaturesForAddress2",
-            "params": [wallet_address, {"limit": 1000}]
-        }
-        logging.debug(f"Sending request to {rpc_url} for wallet {wallet_address}")
-        
-        response = requests.post(rpc_url, json=payload, headers=headers)
-        response.raise_for_status()
-        
-        try:
-            transactions = response.json().get("result", [])
-        except json.JSONDecodeError as e:
-            logging.error(f"Error decoding JSON response from RPC: {e}")
-            return []
-        
+        transactions = list(iter_signatures(wallet_address, rpc_url, until=until, http_client=http_client))
+
         if not transactions:
             logging.warning(f"No transactions found for wallet {wallet_address}.")
         else:
             logging.info(f"Found {len(transactions)} transactions for wallet {wallet_address}.")
-        
+
         return transactions
-    
+
+    except CircuitOpenError as e:
+        logging.warning(f"Skipping transactions for wallet {wallet_address}: {e}")
+        return []
+    except json.JSONDecodeError as e:
+        logging.error(f"Error decoding JSON response from RPC: {e}")
+        return []
     except requests.exceptions.RequestException as e:
         logging.error(f"Network error while fetching transactions for wallet {wallet_address}: {e}")
         return []
@@ -0,0 +1,86 @@
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_CONNECTIONS = 10  # Number of hosts with a cached connection pool
+DEFAULT_POOL_MAXSIZE = 16      # Keep-alive connections kept per host
+DEFAULT_TIMEOUT = (5, 30)      # (connect, read) seconds
+
+class HttpClient:
+    """
+    Shared HTTP transport with keep-alive connection pools per host.
+
+    RPC, price and connectivity code send their requests through one client so
+    repeated calls to the same host reuse open TCP/TLS connections.
+    """
+    def __init__(self, pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 timeout=DEFAULT_TIMEOUT, max_retries=0):
+        """
+        Args:
+            pool_connections (int): Number of per-host connection pools to keep.
+            pool_maxsize (int): Maximum number of connections kept open per host.
+            timeout (float or tuple): Default timeout for every request, in seconds.
+            max_retries (int): Retries for failed connections (not for HTTP error responses).
+        """
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=max_retries)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, url, **kwargs):
+        """
+        Sends a GET request through the pooled session.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def post(self, url, **kwargs):
+        """
+        Sends a POST request through the pooled session.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.post(url, **kwargs)
+
+    def close(self):
+        """
+        Closes all pooled connections.
+        """
+        self.session.close()
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+def get_http_client():
+    """
+    Returns the process-wide HTTP client, creating it with default settings on first use.
+
+    Returns:
+        HttpClient: The shared client.
+    """
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = HttpClient()
+    return _default_client
+
+def configure_http_client(**kwargs):
+    """
+    Replaces the process-wide HTTP client with one built from the given settings.
+
+    Args:
+        **kwargs: Keyword arguments for HttpClient (pool_connections, pool_maxsize, timeout, max_retries).
+
+    Returns:
+        HttpClient: The new shared client.
+    """
+    global _default_client
+    with _default_client_lock:
+        previous = _default_client
+        _default_client = HttpClient(**kwargs)
+    if previous is not None:
+        previous.close()
+    logging.info(f"Configured shared HTTP client: {kwargs}")
+    return _default_client
@@ -0,0 +1,276 @@
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+logging.basicConfig(level=logging.INFO)
+
+# Latency buckets in seconds, from a local cache lookup up to a slow provider call
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRICS_FORMATS = ("prometheus", "json")
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+class Counter:
+    """
+    Monotonically increasing count, tracked separately per label set.
+    """
+    def __init__(self, name, description=""):
+        self.name = name
+        self.description = description
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """
+        Increments the counter.
+
+        Args:
+            amount (float): Amount to add.
+            **labels: Label values identifying the series (e.g. provider="coingecko").
+        """
+        key = _label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels):
+        """
+        Returns the current count for a label set (0 if never incremented).
+        """
+        with self.lock:
+            return self.values.get(_label_key(labels), 0)
+
+    def snapshot(self):
+        with self.lock:
+            return [{"labels": dict(key), "value": value} for key, value in self.values.items()]
+
+    def to_prometheus(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for key, value in self.values.items():
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+class _HistogramSeries:
+    __slots__ = ("bucket_counts", "count", "sum")
+
+    def __init__(self, bucket_count):
+        self.bucket_counts = [0] * bucket_count
+        self.count = 0
+        self.sum = 0.0
+
+class Histogram:
+    """
+    Distribution of observed values (typically latencies in seconds), bucketed
+    per label set.
+    """
+    def __init__(self, name, description="", buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """
+        Records one observation.
+
+        Args:
+            value (float): Observed value.
+            **labels: Label values identifying the series (e.g. stage="price").
+        """
+        key = _label_key(labels)
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                # The extra bucket holds values above the largest bound (+Inf)
+                series = self.series[key] = _HistogramSeries(len(self.buckets) + 1)
+            series.bucket_counts[index] += 1
+            series.count += 1
+            series.sum += value
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Context manager observing the wall-clock seconds spent in its block.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        """
+        Returns the number of observations for a label set.
+        """
+        with self.lock:
+            series = self.series.get(_label_key(labels))
+            return series.count if series else 0
+
+    def quantile(self, q, **labels):
+        """
+        Estimates a quantile from the bucket counts, interpolating linearly inside the bucket.
+
+        Args:
+            q (float): Quantile between 0 and 1.
+            **labels: Label values identifying the series.
+
+        Returns:
+            float or None: Estimated value, or None without observations.
+        """
+        with self.lock:
+            series = self.series.get(_label_key(labels))
+            if series is None or series.count == 0:
+                return None
+            rank = q * series.count
+            seen = 0
+            for index, bucket_count in enumerate(series.bucket_counts):
+                if bucket_count and seen + bucket_count >= rank:
+                    if index == len(self.buckets):
+                        return self.buckets[-1]
+                    lower = self.buckets[index - 1] if index > 0 else 0.0
+                    upper = self.buckets[index]
+                    return lower + (upper - lower) * (rank - seen) / bucket_count
+                seen += bucket_count
+            return self.buckets[-1]
+
+    def snapshot(self):
+        results = []
+        with self.lock:
+            items = [(key, list(series.bucket_counts), series.count, series.sum) for key, series in self.series.items()]
+        for key, bucket_counts, count, total in items:
+            labels = dict(key)
+            results.append({
+                "labels": labels,
+                "count": count,
+                "sum": total,
+                "buckets": dict(zip([str(bound) for bound in self.buckets] + ["+Inf"], bucket_counts)),
+                "p50": self.quantile(0.5, **labels),
+                "p95": self.quantile(0.95, **labels),
+                "p99": self.quantile(0.99, **labels),
+            })
+        return results
+
+    def to_prometheus(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for key, series in self.series.items():
+                cumulative = 0
+                for bound, bucket_count in zip(list(self.buckets) + ["+Inf"], series.bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, [('le', bound)])} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series.sum}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series.count}")
+        return lines
+
+class MetricsRegistry:
+    """
+    Process-wide collection of counters and histograms that can be dumped as a
+    Prometheus text exposition or a JSON snapshot.
+    """
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, *args):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, *args)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric '{name}' is already registered as a {type(metric).__name__}.")
+            return metric
+
+    def counter(self, name, description=""):
+        """
+        Returns the counter registered under name, creating it on first use.
+        """
+        return self._get_or_create(Counter, name, description)
+
+    def histogram(self, name, description="", buckets=DEFAULT_BUCKETS):
+        """
+        Returns the histogram registered under name, creating it on first use.
+        """
+        return self._get_or_create(Histogram, name, description, buckets)
+
+    def reset(self):
+        """
+        Drops every recorded value. Metrics are re-created on their next use.
+        """
+        with self.lock:
+            for metric in self.metrics.values():
+                with metric.lock:
+                    if isinstance(metric, Counter):
+                        metric.values.clear()
+                    else:
+                        metric.series.clear()
+
+    def snapshot(self):
+        """
+        Returns the current value of every metric.
+
+        Returns:
+            dict: {"counters": {name: [...]}, "histograms": {name: [...]}}.
+        """
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return {
+            "counters": {metric.name: metric.snapshot() for metric in metrics if isinstance(metric, Counter)},
+            "histograms": {metric.name: metric.snapshot() for metric in metrics if isinstance(metric, Histogram)},
+        }
+
+    def to_json(self):
+        """
+        Returns the snapshot serialized as JSON.
+        """
+        return json.dumps(self.snapshot(), indent=2, sort_keys=True)
+
+    def to_prometheus(self):
+        """
+        Returns every metric in the Prometheus text exposition format.
+        """
+        with self.lock:
+            metrics = sorted(self.metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.to_prometheus())
+        return "\n".join(lines) + "\n"
+
+    def dump(self, metrics_format="prometheus", path=None):
+        """
+        Renders the metrics and optionally writes them to a file.
+
+        Args:
+            metrics_format (str): "prometheus" or "json".
+            path (str, optional): File to write the dump to.
+
+        Returns:
+            str: The rendered metrics.
+        """
+        if metrics_format not in METRICS_FORMATS:
+            raise ValueError(f"Unknown metrics format '{metrics_format}'. Choose one of: {', '.join(METRICS_FORMATS)}.")
+
+        output = self.to_json() if metrics_format == "json" else self.to_prometheus()
+        if path:
+            try:
+                with open(path, "w") as f:
+                    f.write(output)
+                logging.info(f"Wrote {metrics_format} metrics to {path}")
+            except OSError as e:
+                logging.error(f"Error writing metrics to {path}: {e}")
+        return output
+
+# Shared registry used by the fetchers, cache and pipeline
+metrics = MetricsRegistry()
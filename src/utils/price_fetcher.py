@@ -1,47 +1,326 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
 from datetime import datetime
 import logging
-from src.utils.cache_manager import CacheManager
+import os
+import threading
+import time
+from src.utils.cache_manager import CacheManager, DEFAULT_CACHE_PATH, DEFAULT_NEGATIVE_TTL
+from src.utils.circuit_breaker import CircuitOpenError
+from src.utils.metrics import metrics
 from src.utils.price_provider import CoinGeckoProvider, CoinMarketCapProvider
+from src.utils.rate_limiter import DispatchClock, report_dispatch
 
 logging.basicConfig(level=logging.INFO)
 
-cache_manager = CacheManager()
+SECONDS_PER_DAY = 86400
+DEFAULT_PREFETCH_WORKERS = 8
 
-def fetch_historical_price(token_symbol, timestamp):
+# Set VERTAX_CACHE_BACKEND=sqlite to share historical prices between runs and workers
+cache_manager = CacheManager(
+    backend=os.getenv("VERTAX_CACHE_BACKEND", "memory"),
+    db_path=os.getenv("VERTAX_CACHE_PATH", DEFAULT_CACHE_PATH),
+    negative_ttl=float(os.getenv("VERTAX_NEGATIVE_TTL", DEFAULT_NEGATIVE_TTL)),
+)
+
+# Outstanding provider lookups keyed by (token, day), shared by concurrent callers
+_inflight_requests = {}
+_inflight_lock = threading.Lock()
+
+# Set VERTAX_HEDGE_REQUESTS=1 to race CoinMarketCap against slow CoinGecko lookups
+hedge_requests = os.getenv("VERTAX_HEDGE_REQUESTS", "0") == "1"
+HEDGE_PERCENTILE = 95        # CoinGecko latency percentile after which the hedge fires
+HEDGE_MIN_SAMPLES = 20       # Latencies needed before the percentile is trusted
+HEDGE_DEFAULT_DELAY = 1.0    # Seconds to wait for CoinGecko until then
+HEDGE_WINDOW_SIZE = 500      # Recent CoinGecko latencies the percentile is taken over
+
+_primary_latencies = deque(maxlen=HEDGE_WINDOW_SIZE)
+_hedge_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="price-hedge")
+
+# Range-downloaded price samples keyed by token symbol
+price_series = {}
+_series_lock = threading.Lock()
+
+provider_calls = metrics.counter("vertax_provider_calls_total", "Price provider requests by provider and outcome.")
+provider_fallbacks = metrics.counter("vertax_provider_fallbacks_total", "Lookups that fell back to the next provider.")
+provider_latency = metrics.histogram("vertax_provider_latency_seconds", "Price provider request latency.")
+hedges_fired = metrics.counter("vertax_hedge_requests_total", "Lookups where the secondary provider was raced.")
+hedge_wins = metrics.counter("vertax_hedge_wins_total", "Provider whose answer was used once a hedge fired.")
+
+def price_day(timestamp):
     """
-    Retrieves historical token prices with caching and fallback providers.
+    Truncates a Unix timestamp to 00:00 UTC of its day, the resolution the
+    price providers serve.
+
+    Args:
+        timestamp (int): Unix timestamp.
+
+    Returns:
+        int: Unix timestamp of the start of the UTC day.
+    """
+    timestamp = int(timestamp)
+    return timestamp - timestamp % SECONDS_PER_DAY
+
+def load_price_range(token_symbol, start_timestamp, end_timestamp):
+    """
+    Downloads all prices for a token between two timestamps in one request and
+    merges them into the token's in-memory price series. Later lookups for any
+    day inside the range are answered from the series.
 
     Args:
         token_symbol (str): The token symbol (e.g., SOL).
-        timestamp (int): Unix timestamp to get the price for.
+        start_timestamp (int): Start of the range as a Unix timestamp.
+        end_timestamp (int): End of the range as a Unix timestamp.
 
     Returns:
-        float: Historical price of the token.
+        int: Number of samples downloaded.
     """
-    cached_price = cache_manager.get_cached_price(timestamp, token_symbol)
-    if cached_price is not None:
-        logging.info(f"Cache hit for {token_symbol} at {timestamp} => {cached_price}")
-        return cached_price
+    try:
+        series = _call_provider("coingecko_range", CoinGeckoProvider.fetch_price_range,
+                                token_symbol, start_timestamp, end_timestamp)
+    except CircuitOpenError as e:
+        # Per-day lookups still run and can fall back to CoinMarketCap
+        logging.warning(f"Skipping range download for {token_symbol}: {e}")
+        return 0
+    if not series:
+        logging.warning(f"No range data for {token_symbol} between {start_timestamp} and {end_timestamp}.")
+        return 0
+
+    with _series_lock:
+        existing = price_series.get(token_symbol)
+        if existing is None:
+            price_series[token_symbol] = series
+        else:
+            existing.extend(zip(series.timestamps, series.prices))
+    return len(series)
+
+def _lookup_series(token_symbol, day):
+    series = price_series.get(token_symbol)
+    if series is None or not series.covers(day):
+        return None
+    with _series_lock:
+        return series.lookup(day)
 
-    date = datetime.utcfromtimestamp(timestamp).strftime('%Y-%m-%d')
+def _call_provider(provider, fetch, *args):
+    """
+    Calls a provider method, recording its latency and outcome.
+    """
+    start = time.perf_counter()
+    try:
+        result = fetch(*args)
+    except CircuitOpenError:
+        provider_calls.inc(provider=provider, outcome="open")
+        raise
+    except Exception:
+        provider_calls.inc(provider=provider, outcome="error")
+        raise
+    finally:
+        provider_latency.observe(time.perf_counter() - start, provider=provider)
+    provider_calls.inc(provider=provider, outcome="ok" if result is not None else "empty")
+    return result
 
+def _fetch_from_providers(token_symbol, date):
+    """
+    Queries CoinGecko, falling back to CoinMarketCap if it fails.
+    """
     try:
-        price = CoinGeckoProvider.fetch_price(token_symbol, date)
+        price = _call_provider("coingecko", CoinGeckoProvider.fetch_price, token_symbol, date)
         logging.info(f"Fetched price for {token_symbol} from CoinGecko: {price}")
     except Exception as e:
         logging.warning(f"CoinGecko failed for {token_symbol} on {date}: {e}. Trying CoinMarketCap.")
-        
+        provider_fallbacks.inc(provider="coinmarketcap")
+
         try:
-            price = CoinMarketCapProvider.fetch_price(token_symbol, date)
+            price = _call_provider("coinmarketcap", CoinMarketCapProvider.fetch_price, token_symbol, date)
             logging.info(f"Fetched price for {token_symbol} from CoinMarketCap: {price}")
         except Exception as e:
             logging.error(f"CoinMarketCap also failed for {token_symbol} on {date}: {e}")
             raise
 
+    return price
+
+def hedge_delay():
+    """
+    Returns how long a lookup waits for CoinGecko before racing CoinMarketCap:
+    the HEDGE_PERCENTILE of recent CoinGecko latencies, or HEDGE_DEFAULT_DELAY
+    until HEDGE_MIN_SAMPLES have been seen.
+    """
+    latencies = sorted(_primary_latencies)
+    if len(latencies) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY
+    return latencies[min(len(latencies) - 1, len(latencies) * HEDGE_PERCENTILE // 100)]
+
+def _record_primary_latency(clock):
+    def record(future):
+        clock.dispatched.set()
+        # Failures often return instantly and would drag the threshold towards zero
+        if future.exception() is None and future.result() is not None:
+            _primary_latencies.append(time.perf_counter() - clock.started_at)
+    return record
+
+def _valid_result(future):
+    return future.exception() is None and future.result() is not None
+
+def _call_primary(clock, token_symbol, date):
+    with report_dispatch(clock):
+        return _call_provider("coingecko", CoinGeckoProvider.fetch_price, token_symbol, date)
+
+def _wait_for_primary(primary, clock, delay):
+    """
+    Waits until the primary finishes or has been with CoinGecko for delay
+    seconds. Time spent queued in CoinGecko's rate limiter does not count, so
+    queued lookups do not spend CoinMarketCap quota on hedges.
+    """
+    while not primary.done():
+        clock.dispatched.wait()
+        remaining = clock.started_at + delay - time.perf_counter()
+        if remaining <= 0:
+            if clock.dispatched.is_set():
+                return
+            continue
+        wait([primary], timeout=remaining)
+
+def _fetch_hedged(token_symbol, date):
+    """
+    Queries CoinGecko and, if it has not answered within hedge_delay() of
+    being let through its rate limiter or fails, races CoinMarketCap against
+    it. The first valid price wins.
+    """
+    clock = DispatchClock()
+    primary = _hedge_executor.submit(_call_primary, clock, token_symbol, date)
+    # Every CoinGecko latency is recorded, including the ones the hedge beat
+    primary.add_done_callback(_record_primary_latency(clock))
+
+    _wait_for_primary(primary, clock, hedge_delay())
+    if primary.done() and _valid_result(primary):
+        return primary.result()
+
+    hedges_fired.inc()
+    logging.info(f"Hedging CoinGecko lookup for {token_symbol} on {date} with CoinMarketCap.")
+    secondary = _hedge_executor.submit(_call_provider, "coinmarketcap", CoinMarketCapProvider.fetch_price,
+                                       token_symbol, date)
+    providers = {primary: "coingecko", secondary: "coinmarketcap"}
+    pending = set(providers)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if _valid_result(future):
+                hedge_wins.inc(provider=providers[future])
+                logging.info(f"Fetched price for {token_symbol} from {providers[future]} (hedged): {future.result()}")
+                return future.result()
+
+    # Neither provider produced a price; surface the secondary's outcome as the sequential path would
+    return secondary.result()
+
+def fetch_historical_price(token_symbol, timestamp):
+    """
+    Retrieves historical token prices with caching and fallback providers.
+
+    Prices are cached per token and UTC day, and concurrent callers asking for
+    the same token and day share a single provider request. Lookups no provider
+    has data for are cached as missing for cache_manager.negative_ttl seconds. With hedge_requests
+    enabled, CoinMarketCap is raced against CoinGecko lookups that are slower
+    than usual.
+
+    Args:
+        token_symbol (str): The token symbol (e.g., SOL).
+        timestamp (int): Unix timestamp to get the price for.
+
+    Returns:
+        float: Historical price of the token.
+    """
+    day = price_day(timestamp)
+
+    cached_price = cache_manager.get_cached_price(day, token_symbol)
+    if cached_price is not None:
+        logging.info(f"Cache hit for {token_symbol} at {day} => {cached_price}")
+        return cached_price
+    if cache_manager.is_price_missing(day, token_symbol):
+        return None
+
+    key = (token_symbol, day)
+    with _inflight_lock:
+        inflight = _inflight_requests.get(key)
+        is_leader = inflight is None
+        if is_leader:
+            inflight = Future()
+            _inflight_requests[key] = inflight
+
+    date = datetime.utcfromtimestamp(day).strftime('%Y-%m-%d')
+
+    if not is_leader:
+        logging.info(f"Waiting on in-flight price request for {token_symbol} on {date}")
+        return inflight.result()
+
     try:
-        cache_manager.store_price(timestamp, token_symbol, price)
-        logging.info(f"Stored price for {token_symbol} at {timestamp} => {price}")
+        # Another leader may have finished between the cache check and registering this request
+        price = cache_manager.get_cached_price(day, token_symbol, record_metrics=False)
+        if price is None and not cache_manager.is_price_missing(day, token_symbol):
+            price = _lookup_series(token_symbol, day)
+            if price is None:
+                price = _fetch_hedged(token_symbol, date) if hedge_requests else _fetch_from_providers(token_symbol, date)
+
+            try:
+                if price is not None:
+                    cache_manager.store_price(day, token_symbol, price)
+                    logging.info(f"Stored price for {token_symbol} at {day} => {price}")
+                else:
+                    # Unknown or delisted tokens are not asked for again until the marker expires
+                    cache_manager.store_missing(day, token_symbol)
+            except Exception as e:
+                logging.error(f"Error storing price for {token_symbol} at {day}: {e}")
+
+        inflight.set_result(price)
+        return price
     except Exception as e:
-        logging.error(f"Error storing price for {token_symbol} at {timestamp}: {e}")
+        inflight.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight_requests.pop(key, None)
 
-    return price
+def prefetch_prices(price_requests, max_workers=DEFAULT_PREFETCH_WORKERS, range_mode=False):
+    """
+    Resolves many prices up front through a bounded thread pool so that later
+    lookups are served from the cache. Requests are deduplicated per token and
+    UTC day before any provider is queried.
+
+    Args:
+        price_requests (iterable): (token_symbol, timestamp) pairs.
+        max_workers (int): Maximum number of concurrent provider lookups.
+        range_mode (bool): Download each token's whole date span in one range
+            request first; days the range does not cover fall back to per-day lookups.
+
+    Returns:
+        dict: Prices keyed by (token_symbol, day start timestamp). Failed lookups are omitted.
+    """
+    token_days = {(token_symbol, price_day(timestamp)) for token_symbol, timestamp in price_requests}
+    prices = {}
+    if not token_days:
+        return prices
+
+    if range_mode:
+        spans = {}
+        for token_symbol, day in token_days:
+            first, last = spans.get(token_symbol, (day, day))
+            spans[token_symbol] = (min(first, day), max(last, day))
+        for token_symbol, (first, last) in spans.items():
+            load_price_range(token_symbol, first, last + SECONDS_PER_DAY)
+
+    logging.info(f"Prefetching {len(token_days)} token-day prices with {max_workers} workers.")
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="price-prefetch") as executor:
+        futures = {
+            executor.submit(fetch_historical_price, token_symbol, day): (token_symbol, day)
+            for token_symbol, day in token_days
+        }
+        for future in as_completed(futures):
+            token_symbol, day = futures[future]
+            try:
+                price = future.result()
+            except Exception as e:
+                logging.warning(f"Prefetch failed for {token_symbol} at {day}: {e}")
+                continue
+            if price is not None:
+                prices[(token_symbol, day)] = price
+
+    return prices
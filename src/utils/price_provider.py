@@ -1,25 +1,85 @@
 import requests
 import logging
+from src.utils.circuit_breaker import CircuitOpenError, get_breaker, is_outage
+from src.utils.http_client import get_http_client
+from src.utils.price_series import PriceSeries
+from src.utils.rate_limiter import AdaptiveRateLimiter
+
+# Published request quotas (requests per second) of the free API plans
+COINGECKO_RATE_LIMIT = 30 / 60
+COINMARKETCAP_RATE_LIMIT = 30 / 60
 
 logging.basicConfig(level=logging.INFO)
 
+def _is_not_found(error):
+    response = getattr(error, "response", None)
+    return response is not None and response.status_code == 404
+
+class ProviderUnavailableError(Exception):
+    """
+    Raised when a provider could not be asked (timeout, connection error or
+    error status), as opposed to answering that it has no price.
+    """
+
+def _send(provider, url, http_client=None, **kwargs):
+    """
+    Sends a GET request through the provider's circuit breaker and rate limiter
+    (either may be None) and raises for HTTP error statuses.
+
+    Raises:
+        CircuitOpenError: If the provider's circuit is open.
+        requests.exceptions.RequestException: If the request fails.
+    """
+    client = http_client or get_http_client()
+    breaker = provider.circuit_breaker
+    if breaker is not None:
+        breaker.check()
+
+    try:
+        if provider.rate_limiter is None:
+            response = client.get(url, **kwargs)
+        else:
+            response = provider.rate_limiter.request(lambda: client.get(url, **kwargs))
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        if breaker is not None:
+            if is_outage(e):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+        raise
+
+    if breaker is not None:
+        breaker.record_success()
+    return response
+
 class CoinGeckoProvider:
+    BASE_URL = "https://api.coingecko.com/api/v3"
+    # Replace to match a paid plan's quota, or set to None to disable scheduling
+    rate_limiter = AdaptiveRateLimiter("coingecko", COINGECKO_RATE_LIMIT)
+    # While open, lookups raise CircuitOpenError so callers go straight to the fallback provider
+    circuit_breaker = get_breaker("coingecko")
+
     @staticmethod
-    def fetch_price(token_symbol, date):
+    def fetch_price(token_symbol, date, http_client=None):
         """
         Fetches price data from CoinGecko.
 
         Args:
             token_symbol (str): The token symbol (e.g., SOL).
             date (str): Date in YYYY-MM-DD format.
+            http_client (HttpClient, optional): Transport to use (default is the shared client).
 
         Returns:
-            float: Price of the token.
+            float: Price of the token, or None if the provider has no price for it.
+
+        Raises:
+            CircuitOpenError: If the provider's circuit is open.
+            ProviderUnavailableError: If the request failed for any reason other than a 404.
         """
         try:
-            url = f"https://api.coingecko.com/api/v3/coins/{token_symbol}/history?date={date}"
-            response = requests.get(url)
-            response.raise_for_status()  
+            url = f"{CoinGeckoProvider.BASE_URL}/coins/{token_symbol}/history?date={date}"
+            response = _send(CoinGeckoProvider, url, http_client)
             data = response.json()
 
             if "market_data" not in data or "current_price" not in data["market_data"]:
@@ -30,31 +90,85 @@ class CoinGeckoProvider:
             logging.info(f"Successfully fetched price from CoinGecko for {token_symbol} on {date}: {price}")
             return price
         
+        except CircuitOpenError:
+            raise
         except requests.exceptions.RequestException as e:
+            if _is_not_found(e):
+                logging.warning(f"CoinGecko has no price for {token_symbol} on {date}: {e}")
+                return None
             logging.error(f"Error fetching price from CoinGecko for {token_symbol} on {date}: {e}")
-            return None
+            raise ProviderUnavailableError(f"CoinGecko request failed: {e}") from e
         except Exception as e:
             logging.error(f"Unexpected error while fetching price from CoinGecko for {token_symbol} on {date}: {e}")
             return None
 
+    @staticmethod
+    def fetch_price_range(token_symbol, start_timestamp, end_timestamp, http_client=None):
+        """
+        Fetches every price sample between two timestamps from CoinGecko in a
+        single market-chart-range request.
+
+        Args:
+            token_symbol (str): The token symbol (e.g., SOL).
+            start_timestamp (int): Start of the range as a Unix timestamp.
+            end_timestamp (int): End of the range as a Unix timestamp.
+            http_client (HttpClient, optional): Transport to use (default is the shared client).
+
+        Returns:
+            PriceSeries: Price samples for the range, or None on failure.
+        """
+        try:
+            url = (f"{CoinGeckoProvider.BASE_URL}/coins/{token_symbol}/market_chart/range"
+                   f"?vs_currency=usd&from={int(start_timestamp)}&to={int(end_timestamp)}")
+            response = _send(CoinGeckoProvider, url, http_client)
+            data = response.json()
+
+            if "prices" not in data:
+                logging.warning(f"CoinGecko range data missing expected fields for {token_symbol} "
+                                f"between {start_timestamp} and {end_timestamp}.")
+                return None
+
+            # CoinGecko reports sample times in milliseconds
+            series = PriceSeries(token_symbol, ((timestamp_ms // 1000, price) for timestamp_ms, price in data["prices"]))
+            logging.info(f"Successfully fetched {len(series)} prices from CoinGecko for {token_symbol} "
+                         f"between {start_timestamp} and {end_timestamp}")
+            return series
+
+        except CircuitOpenError:
+            raise
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Error fetching price range from CoinGecko for {token_symbol}: {e}")
+            return None
+        except Exception as e:
+            logging.error(f"Unexpected error while fetching price range from CoinGecko for {token_symbol}: {e}")
+            return None
+
 class CoinMarketCapProvider:
+    BASE_URL = "https://pro-api.coinmarketcap.com/v1"
+    rate_limiter = AdaptiveRateLimiter("coinmarketcap", COINMARKETCAP_RATE_LIMIT)
+    circuit_breaker = get_breaker("coinmarketcap")
+
     @staticmethod
-    def fetch_price(token_symbol, date):
+    def fetch_price(token_symbol, date, http_client=None):
         """
         Fetches price data from CoinMarketCap.
 
         Args:
             token_symbol (str): The token symbol (e.g., SOL).
             date (str): Date in YYYY-MM-DD format.
+            http_client (HttpClient, optional): Transport to use (default is the shared client).
 
         Returns:
-            float: Price of the token.
+            float: Price of the token, or None if the provider has no price for it.
+
+        Raises:
+            CircuitOpenError: If the provider's circuit is open.
+            ProviderUnavailableError: If the request failed for any reason other than a 404.
         """
         try:
-            url = f"https://pro-api.coinmarketcap.com/v1/cryptocurrency/quotes/historical?symbol={token_symbol}&date={date}"
+            url = f"{CoinMarketCapProvider.BASE_URL}/cryptocurrency/quotes/historical?symbol={token_symbol}&date={date}"
             headers = {"X-CMC_PRO_API_KEY": "your_api_key"}
-            response = requests.get(url, headers=headers)
-            response.raise_for_status() 
+            response = _send(CoinMarketCapProvider, url, http_client, headers=headers)
             data = response.json()
 
             if "data" not in data or "quotes" not in data["data"] or len(data["data"]["quotes"]) == 0:
@@ -65,9 +179,14 @@ class CoinMarketCapProvider:
             logging.info(f"Successfully fetched price from CoinMarketCap for {token_symbol} on {date}: {price}")
             return price
         
+        except CircuitOpenError:
+            raise
         except requests.exceptions.RequestException as e:
+            if _is_not_found(e):
+                logging.warning(f"CoinMarketCap has no price for {token_symbol} on {date}: {e}")
+                return None
             logging.error(f"Error fetching price from CoinMarketCap for {token_symbol} on {date}: {e}")
-            return None
+            raise ProviderUnavailableError(f"CoinMarketCap request failed: {e}") from e
         except Exception as e:
             logging.error(f"Unexpected error while fetching price from CoinMarketCap for {token_symbol} on {date}: {e}")
             return None
@@ -0,0 +1,80 @@
+from array import array
+from bisect import bisect_left
+
+# Samples further than this from the requested time are not considered a match
+DEFAULT_TOLERANCE = 12 * 60 * 60
+
+class PriceSeries:
+    """
+    Sorted price samples for a single token, stored in two parallel typed
+    arrays (timestamps and prices) and searched with binary search.
+    """
+    __slots__ = ("token_symbol", "timestamps", "prices")
+
+    def __init__(self, token_symbol, samples=()):
+        """
+        Args:
+            token_symbol (str): The token symbol the samples belong to.
+            samples (iterable): (timestamp, price) pairs in any order.
+        """
+        self.token_symbol = token_symbol
+        self.timestamps = array('q')
+        self.prices = array('d')
+        self.extend(samples)
+
+    def extend(self, samples):
+        """
+        Merges (timestamp, price) samples into the series. Newer samples replace
+        existing ones with the same timestamp.
+
+        Args:
+            samples (iterable): (timestamp, price) pairs in any order.
+        """
+        samples = sorted((int(timestamp), float(price)) for timestamp, price in samples)
+        if not samples:
+            return
+
+        if not self.timestamps or samples[0][0] > self.timestamps[-1]:
+            # Common case: a later range appended to the end of the series
+            for timestamp, price in samples:
+                if self.timestamps and self.timestamps[-1] == timestamp:
+                    self.prices[-1] = price
+                    continue
+                self.timestamps.append(timestamp)
+                self.prices.append(price)
+            return
+
+        merged = dict(zip(self.timestamps, self.prices))
+        merged.update(samples)
+        ordered = sorted(merged.items())
+        self.timestamps = array('q', (timestamp for timestamp, _ in ordered))
+        self.prices = array('d', (price for _, price in ordered))
+
+    def covers(self, timestamp):
+        """
+        Checks whether a timestamp falls inside the range spanned by the series.
+        """
+        return bool(self.timestamps) and self.timestamps[0] <= timestamp <= self.timestamps[-1]
+
+    def lookup(self, timestamp, tolerance=DEFAULT_TOLERANCE):
+        """
+        Finds the price sample closest to a timestamp.
+
+        Args:
+            timestamp (int): Unix timestamp to look up.
+            tolerance (int): Maximum distance in seconds between the timestamp and the sample.
+
+        Returns:
+            float or None: Price of the nearest sample, None if no sample is close enough.
+        """
+        index = bisect_left(self.timestamps, timestamp)
+        best = None
+        for candidate in (index - 1, index):
+            if 0 <= candidate < len(self.timestamps):
+                distance = abs(self.timestamps[candidate] - timestamp)
+                if distance <= tolerance and (best is None or distance < best[0]):
+                    best = (distance, candidate)
+        return self.prices[best[1]] if best is not None else None
+
+    def __len__(self):
+        return len(self.timestamps)
@@ -1,9 +1,58 @@
+import hashlib
+import hmac
 import logging
-from cryptography.fernet import Fernet
+import os
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
 
 # Generate a key for encryption (in production, store this securely)
 ENCRYPTION_KEY = Fernet.generate_key()
 
+# Key for pseudonymous tokens; set VERTAX_TOKENIZATION_KEY so tokens stay the same between runs and machines
+TOKENIZATION_KEY = os.getenv("VERTAX_TOKENIZATION_KEY", "").encode() or secrets.token_bytes(32)
+TOKEN_PREFIX = "tok_"
+TOKEN_HEX_LENGTH = 32  # 128-bit pseudonyms
+
+# Transactions per task when batch encryption is fanned out to worker processes
+DEFAULT_CRYPTO_CHUNK_SIZE = 10000
+
+@lru_cache(maxsize=32)
+def _cipher_for(keys):
+    if len(keys) == 1:
+        return Fernet(keys[0])
+    return MultiFernet([Fernet(key) for key in keys])
+
+@lru_cache(maxsize=32)
+def _keyed_hash(key):
+    # Keyed once per key; tokenizing copies the prepared state instead of rehashing the key
+    return hmac.new(key, digestmod=hashlib.sha256)
+
+def _crypt_chunk(transactions, keys, fields, decrypt):
+    """
+    Encrypts or decrypts the given fields of a list of transactions with one cipher.
+
+    Returns:
+        tuple: The converted transactions and the number of values that could not be converted.
+    """
+    cipher = _cipher_for(keys)
+    convert = cipher.decrypt if decrypt else cipher.encrypt
+    converted = []
+    failures = 0
+    for transaction in transactions:
+        transaction = transaction.copy()
+        for field in fields:
+            value = transaction.get(field)
+            if not isinstance(value, str):
+                continue
+            try:
+                transaction[field] = convert(value.encode()).decode()
+            except (InvalidToken, ValueError):
+                failures += 1
+        converted.append(transaction)
+    return converted, failures
+
 class TransactionSecurity:
     SENSITIVE_FIELDS = {"user_id", "wallet_address", "private_key", "api_key"}
     ENCRYPTABLE_FIELDS = {"wallet_address", "private_key"}
@@ -24,6 +73,24 @@ class TransactionSecurity:
         logging.info(f"Transaction data sanitized. Removed fields: {removed_fields}")
         return sanitized
 
+    @staticmethod
+    def get_cipher(key):
+        """
+        Returns a cached cipher for a key, or a MultiFernet for a list of keys
+        (newest first) so values encrypted under retired keys still decrypt.
+
+        Args:
+            key (bytes or list): Encryption key, or keys for rotation.
+
+        Returns:
+            Fernet or MultiFernet: The cipher.
+        """
+        return _cipher_for(TransactionSecurity._key_tuple(key))
+
+    @staticmethod
+    def _key_tuple(key):
+        return (key,) if isinstance(key, (bytes, str)) else tuple(key)
+
     @staticmethod
     def encrypt_value(value: str, key: bytes) -> str:
         """
@@ -41,7 +108,7 @@ class TransactionSecurity:
                 logging.warning(f"Skipping encryption for non-string value: {value}")
                 return value  # Only encrypt string values
 
-            cipher = Fernet(key)
+            cipher = TransactionSecurity.get_cipher(key)
             encrypted = cipher.encrypt(value.encode()).decode()
             logging.info(f"Value encrypted. Original length: {len(value)}, Encrypted length: {len(encrypted)}")
             return encrypted
@@ -62,7 +129,7 @@ class TransactionSecurity:
             str: Decrypted string.
         """
         try:
-            cipher = Fernet(key)
+            cipher = TransactionSecurity.get_cipher(key)
             decrypted = cipher.decrypt(value.encode()).decode()
             logging.info(f"Value decrypted. Decrypted length: {len(decrypted)}")
             return decrypted
@@ -111,3 +178,165 @@ class TransactionSecurity:
 
         logging.info(f"Sensitive data decrypted for fields: {TransactionSecurity.ENCRYPTABLE_FIELDS & transaction.keys()}")
         return decrypted_transaction
+
+    @staticmethod
+    def _crypt_batch(transactions, key, fields, max_workers, chunk_size, decrypt):
+        keys = TransactionSecurity._key_tuple(key)
+        fields = tuple(fields if fields is not None else TransactionSecurity.ENCRYPTABLE_FIELDS)
+        transactions = list(transactions)
+
+        if max_workers and max_workers > 1 and len(transactions) > chunk_size:
+            chunks = [transactions[i:i + chunk_size] for i in range(0, len(transactions), chunk_size)]
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(_crypt_chunk, chunks, [keys] * len(chunks), [fields] * len(chunks),
+                                            [decrypt] * len(chunks)))
+            converted = [transaction for chunk, _ in results for transaction in chunk]
+            failures = sum(chunk_failures for _, chunk_failures in results)
+        else:
+            converted, failures = _crypt_chunk(transactions, keys, fields, decrypt)
+
+        action = "decrypted" if decrypt else "encrypted"
+        logging.info(f"Sensitive data {action} for {len(converted)} transactions (fields: {set(fields)}).")
+        if failures:
+            logging.warning(f"{failures} values could not be {action} and were left unchanged.")
+        return converted
+
+    @staticmethod
+    def encrypt_batch(transactions, key=ENCRYPTION_KEY, fields=None, max_workers=None,
+                      chunk_size=DEFAULT_CRYPTO_CHUNK_SIZE) -> list:
+        """
+        Encrypts sensitive fields of many transactions with one cached cipher.
+
+        Args:
+            transactions (iterable): Transaction dicts.
+            key (bytes or list): Encryption key, or keys for rotation (the first one encrypts).
+            fields (iterable, optional): Fields to encrypt (default is ENCRYPTABLE_FIELDS).
+            max_workers (int, optional): Fan out across this many processes, in chunks of chunk_size transactions.
+            chunk_size (int): Transactions per worker task.
+
+        Returns:
+            list: Copies of the transactions with encrypted fields.
+        """
+        return TransactionSecurity._crypt_batch(transactions, key, fields, max_workers, chunk_size, decrypt=False)
+
+    @staticmethod
+    def decrypt_batch(transactions, key=ENCRYPTION_KEY, fields=None, max_workers=None,
+                      chunk_size=DEFAULT_CRYPTO_CHUNK_SIZE) -> list:
+        """
+        Decrypts sensitive fields of many transactions with one cached cipher.
+        Values that cannot be decrypted are left unchanged.
+
+        Args:
+            transactions (iterable): Transaction dicts with encrypted fields.
+            key (bytes or list): Encryption key, or all keys still in use during a rotation.
+            fields (iterable, optional): Fields to decrypt (default is ENCRYPTABLE_FIELDS).
+            max_workers (int, optional): Fan out across this many processes, in chunks of chunk_size transactions.
+            chunk_size (int): Transactions per worker task.
+
+        Returns:
+            list: Copies of the transactions with decrypted fields.
+        """
+        return TransactionSecurity._crypt_batch(transactions, key, fields, max_workers, chunk_size, decrypt=True)
+
+    @staticmethod
+    def encrypt_column(values, key=ENCRYPTION_KEY) -> list:
+        """
+        Encrypts a column of values (e.g. every wallet address in a table); non-string values are kept.
+
+        Args:
+            values (iterable): Values to encrypt.
+            key (bytes or list): Encryption key, or keys for rotation (the first one encrypts).
+
+        Returns:
+            list: Encrypted values.
+        """
+        encrypt = TransactionSecurity.get_cipher(key).encrypt
+        return [encrypt(value.encode()).decode() if isinstance(value, str) else value for value in values]
+
+    @staticmethod
+    def decrypt_column(values, key=ENCRYPTION_KEY) -> list:
+        """
+        Decrypts a column of encrypted values.
+
+        Args:
+            values (iterable): Encrypted values.
+            key (bytes or list): Encryption key, or all keys still in use during a rotation.
+
+        Returns:
+            list: Decrypted values.
+
+        Raises:
+            cryptography.fernet.InvalidToken: If a value was not encrypted with any of the keys.
+        """
+        decrypt = TransactionSecurity.get_cipher(key).decrypt
+        return [decrypt(value.encode()).decode() if isinstance(value, str) else value for value in values]
+
+    @staticmethod
+    def rotate_column(values, keys) -> list:
+        """
+        Re-encrypts a column of values under the newest key.
+
+        Args:
+            values (iterable): Values encrypted with any of the keys.
+            keys (list): Keys, newest first.
+
+        Returns:
+            list: Values encrypted with keys[0].
+        """
+        cipher = MultiFernet([TransactionSecurity.get_cipher(key) for key in keys])
+        return [cipher.rotate(value.encode()).decode() if isinstance(value, str) else value for value in values]
+
+    @staticmethod
+    def tokenize_value(value: str, key: bytes = TOKENIZATION_KEY) -> str:
+        """
+        Replaces a value with a deterministic pseudonym (a truncated HMAC-SHA256).
+
+        The same value and key always give the same token, so tokens can be
+        used as cache, checkpoint and join keys, but the value cannot be
+        recovered from the token without the key.
+
+        Args:
+            value (str): The sensitive value (e.g. a wallet address).
+            key (bytes): Tokenization key (default is TOKENIZATION_KEY).
+
+        Returns:
+            str: Token such as "tok_3f2a...", or the value unchanged if it is not a string.
+        """
+        if not isinstance(value, str):
+            return value
+        digest = _keyed_hash(key).copy()
+        digest.update(value.encode())
+        return TOKEN_PREFIX + digest.hexdigest()[:TOKEN_HEX_LENGTH]
+
+    @staticmethod
+    def tokenize_sensitive_data(transaction: dict, key: bytes = TOKENIZATION_KEY, fields=None) -> dict:
+        """
+        Replaces sensitive transaction fields with deterministic pseudonyms.
+
+        Args:
+            transaction (dict): Transaction data containing sensitive fields.
+            key (bytes): Tokenization key (default is TOKENIZATION_KEY).
+            fields (iterable, optional): Fields to tokenize (default is SENSITIVE_FIELDS).
+
+        Returns:
+            dict: Transaction data with tokenized sensitive fields.
+        """
+        tokenized = transaction.copy()
+        for field in fields if fields is not None else TransactionSecurity.SENSITIVE_FIELDS:
+            if field in tokenized:
+                tokenized[field] = TransactionSecurity.tokenize_value(tokenized[field], key)
+        return tokenized
+
+    @staticmethod
+    def tokenize_column(values, key: bytes = TOKENIZATION_KEY) -> list:
+        """
+        Tokenizes a column of values (e.g. every wallet address in a table).
+
+        Args:
+            values (iterable): Values to tokenize.
+            key (bytes): Tokenization key (default is TOKENIZATION_KEY).
+
+        Returns:
+            list: Tokens, in input order.
+        """
+        return [TransactionSecurity.tokenize_value(value, key) for value in values]
@@ -0,0 +1,267 @@
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+logging.basicConfig(level=logging.INFO)
+
+DEFAULT_SAMPLE_INTERVAL = 0.005  # Seconds between stack samples
+DEFAULT_TOP_N = 25
+
+# Worker threads started by the fetchers and the pipeline are attributed by name
+THREAD_STAGES = (
+    ("signature-pager", "fetch"),
+    ("rpc-batch", "fetch"),
+    ("price-prefetch", "price"),
+    ("price-hedge", "price"),
+)
+UNATTRIBUTED_STAGE = "other"
+
+# Leaf frames of threads that are blocked rather than running Python code
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("queue.py", "put"),
+    ("selectors.py", "select"),
+    ("socket.py", "readinto"),
+    ("socket.py", "accept"),
+    ("ssl.py", "read"),
+    ("thread.py", "_worker"),
+    ("_base.py", "result"),
+    ("connection.py", "create_connection"),
+    ("wait.py", "do_poll"),
+    ("__init__.py", "acquire"),
+}
+
+_active_profiler = None
+_active_lock = threading.Lock()
+
+class StageProfiler:
+    """
+    Sampling CPU profiler that attributes every sample to a processing stage
+    (fetch, parse, price, tax, report).
+
+    A background thread periodically captures the Python stack of every
+    thread. A thread's stage comes from the innermost profile_stage block it
+    is running, or from its name for fetcher and pipeline worker threads.
+    Samples of threads blocked on I/O or locks are dropped, so the output
+    reflects CPU time rather than waiting.
+    """
+    def __init__(self, interval=DEFAULT_SAMPLE_INTERVAL, include_idle=False):
+        """
+        Args:
+            interval (float): Seconds between stack samples.
+            include_idle (bool): Keep samples of threads blocked on I/O or locks.
+        """
+        self.interval = interval
+        self.include_idle = include_idle
+        self.samples = Counter()
+        self.thread_stages = {}
+        self.stop_event = threading.Event()
+        self.sampler = None
+        self.started_at = None
+        self.elapsed = 0.0
+
+    def start(self):
+        global _active_profiler
+        with _active_lock:
+            if _active_profiler is not None:
+                raise RuntimeError("A StageProfiler is already running.")
+            _active_profiler = self
+        self.started_at = time.perf_counter()
+        self.sampler = threading.Thread(target=self._run, name="stage-profiler", daemon=True)
+        self.sampler.start()
+        return self
+
+    def stop(self):
+        global _active_profiler
+        self.stop_event.set()
+        if self.sampler is not None:
+            self.sampler.join()
+        self.elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+        with _active_lock:
+            if _active_profiler is self:
+                _active_profiler = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Attributes samples of the calling thread to a stage while the block runs.
+        """
+        ident = threading.get_ident()
+        stack = self.thread_stages.setdefault(ident, [])
+        stack.append(name)
+        try:
+            yield
+        finally:
+            stack.pop()
+
+    def _stage_for(self, ident, thread_name):
+        stack = self.thread_stages.get(ident)
+        if stack is not None:
+            # The owning thread may pop its last stage at any moment, so read instead of checking first
+            try:
+                return stack[-1]
+            except IndexError:
+                pass
+        if thread_name.startswith("pipeline-"):
+            return thread_name[len("pipeline-"):]
+        for prefix, stage in THREAD_STAGES:
+            if thread_name.startswith(prefix):
+                return stage
+        return UNATTRIBUTED_STAGE
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                code = frame.f_code
+                if not self.include_idle and (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    continue
+
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.reverse()
+                self.samples[(self._stage_for(ident, names.get(ident, "")), tuple(stack))] += 1
+
+    def stage_totals(self):
+        """
+        Returns the number of samples per stage.
+        """
+        totals = Counter()
+        for (stage, _), count in self.samples.items():
+            totals[stage] += count
+        return totals
+
+    def collapsed_stacks(self):
+        """
+        Renders the samples in collapsed-stack format ("stage;outer;...;inner count"),
+        the input flamegraph.pl and speedscope read.
+
+        Returns:
+            str: One line per distinct stack.
+        """
+        lines = [";".join((stage,) + stack) + f" {count}" for (stage, stack), count in self.samples.items()]
+        return "\n".join(sorted(lines)) + "\n"
+
+    def top_functions(self, top_n=DEFAULT_TOP_N):
+        """
+        Ranks functions by the samples spent in them.
+
+        Args:
+            top_n (int): Number of functions to return.
+
+        Returns:
+            list: (function, self samples, total samples) tuples, hottest first.
+        """
+        own = Counter()
+        total = Counter()
+        for (_, stack), count in self.samples.items():
+            own[stack[-1]] += count
+            for function in set(stack):
+                total[function] += count
+        ranked = sorted(total, key=lambda function: (own[function], total[function]), reverse=True)
+        return [(function, own[function], total[function]) for function in ranked[:top_n]]
+
+    def summary(self, top_n=DEFAULT_TOP_N):
+        """
+        Renders the per-stage breakdown and the top-N hot functions as text.
+        """
+        sample_count = sum(self.samples.values()) or 1
+        lines = [f"CPU profile: {sum(self.samples.values())} samples over {self.elapsed:.2f}s "
+                 f"(every {self.interval * 1000:.1f}ms)", "", "Samples by stage:"]
+        for stage, count in self.stage_totals().most_common():
+            lines.append(f"  {stage:<12}{count:>8}  {count / sample_count:>6.1%}")
+        lines += ["", f"Top {top_n} functions:", f"  {'self':>8}{'self %':>8}{'total':>8}{'total %':>9}  function"]
+        for function, own, total in self.top_functions(top_n):
+            lines.append(f"  {own:>8}{own / sample_count:>8.1%}{total:>8}{total / sample_count:>9.1%}  {function}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, output_prefix, top_n=DEFAULT_TOP_N):
+        """
+        Writes <output_prefix>.collapsed and <output_prefix>.top.txt.
+
+        Args:
+            output_prefix (str): Path prefix for the output files.
+            top_n (int): Number of functions in the summary.
+
+        Returns:
+            tuple: Paths of the collapsed-stack file and the summary file.
+        """
+        directory = os.path.dirname(os.path.abspath(output_prefix))
+        os.makedirs(directory, exist_ok=True)
+        collapsed_path = f"{output_prefix}.collapsed"
+        summary_path = f"{output_prefix}.top.txt"
+        with open(collapsed_path, "w") as f:
+            f.write(self.collapsed_stacks())
+        with open(summary_path, "w") as f:
+            f.write(self.summary(top_n))
+        logging.info(f"Wrote CPU profile to {collapsed_path} and {summary_path}")
+        return collapsed_path, summary_path
+
+@contextmanager
+def profile_stage(name):
+    """
+    Attributes the calling thread's samples to a stage if a profiler is running; otherwise does nothing.
+
+    Args:
+        name (str): Stage name (e.g. "fetch", "parse", "price", "tax", "report").
+    """
+    profiler = _active_profiler
+    if profiler is None:
+        yield
+        return
+    with profiler.stage(name):
+        yield
+
+@contextmanager
+def profiling(output_prefix, interval=DEFAULT_SAMPLE_INTERVAL, top_n=DEFAULT_TOP_N):
+    """
+    Profiles the enclosed block and writes its output files when it ends. Does
+    nothing when output_prefix is None or another profile is already running
+    (its samples then include this block).
+
+    Args:
+        output_prefix (str): Path prefix for the output files, or None to disable profiling.
+        interval (float): Seconds between stack samples.
+        top_n (int): Number of functions in the summary.
+
+    Yields:
+        StageProfiler or None: The running profiler.
+    """
+    if output_prefix is None or _active_profiler is not None:
+        yield None
+        return
+
+    profiler = StageProfiler(interval=interval)
+    try:
+        profiler.start()
+    except RuntimeError:
+        # Lost a race with another profile starting
+        yield None
+        return
+
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        try:
+            profiler.write(output_prefix, top_n)
+        except OSError as e:
+            logging.error(f"Error writing CPU profile to {output_prefix}: {e}")
@@ -0,0 +1,246 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from src.utils.metrics import metrics
+
+logging.basicConfig(level=logging.INFO)
+
+# Retries of a rate-limited request before the 429 is returned to the caller
+DEFAULT_MAX_RETRIES = 5
+
+rate_limited = metrics.counter("vertax_rate_limited_total", "Responses rejected with HTTP 429, per provider.")
+rate_limit_wait = metrics.histogram("vertax_rate_limit_wait_seconds", "Seconds requests queued for a rate limit slot.")
+
+# DispatchClock the current thread's limiter waits are reported to, if any
+_dispatch = threading.local()
+
+class DispatchClock:
+    """
+    Records when a request was last let through a rate limiter, so another
+    thread can time the request without the time it spent queued.
+
+    dispatched is set while the request is with the provider (or was never
+    queued) and cleared while it waits for a slot; started_at is when it was
+    last let through.
+    """
+    def __init__(self):
+        self.dispatched = threading.Event()
+        self.dispatched.set()
+        self.started_at = time.perf_counter()
+
+    def queued(self):
+        self.dispatched.clear()
+
+    def granted(self):
+        self.started_at = time.perf_counter()
+        self.dispatched.set()
+
+@contextmanager
+def report_dispatch(clock):
+    """
+    Reports the rate limiter waits of requests made by this thread to clock
+    while the block runs.
+    """
+    previous = getattr(_dispatch, "clock", None)
+    _dispatch.clock = clock
+    try:
+        yield clock
+    finally:
+        _dispatch.clock = previous
+
+def parse_retry_after(value):
+    """
+    Parses a Retry-After header given either as seconds or as an HTTP date.
+
+    Args:
+        value (str): Header value.
+
+    Returns:
+        float or None: Seconds to wait, or None if the header is missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+class TokenBucket:
+    """
+    Token bucket that queues callers instead of rejecting them.
+
+    Every acquire takes a token, letting the balance go negative; a negative
+    balance is a queue of reservations, and each caller sleeps until its own
+    token has been refilled. Callers are therefore served in arrival order at
+    the bucket's rate.
+    """
+    def __init__(self, rate, capacity=1.0, clock=time.monotonic, sleep=time.sleep):
+        """
+        Args:
+            rate (float): Tokens added per second.
+            capacity (float): Maximum tokens saved up for bursts.
+            clock (callable): Monotonic clock (replaceable in tests).
+            sleep (callable): Sleep function (replaceable in tests).
+        """
+        if rate <= 0:
+            raise ValueError("Rate must be positive.")
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated_at = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        if now > self.updated_at:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+
+    def reserve(self):
+        """
+        Takes a token and returns how long the caller must wait before using it.
+
+        Returns:
+            float: Seconds to wait.
+        """
+        with self.lock:
+            now = self.clock()
+            self._refill(now)
+            self.tokens -= 1
+            ready_at = max(now, self.updated_at)
+            if self.tokens < 0:
+                ready_at += -self.tokens / self.rate
+            return ready_at - now
+
+    def acquire(self):
+        """
+        Blocks until a token is available.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        wait = self.reserve()
+        if wait > 0:
+            self.sleep(wait)
+        return wait
+
+    def pause(self, seconds):
+        """
+        Stops refilling for the given time and drops any saved-up burst, so no
+        token is handed out before the pause ends.
+        """
+        with self.lock:
+            now = self.clock()
+            self._refill(now)
+            self.tokens = min(self.tokens, 0.0)
+            self.updated_at = max(self.updated_at, now + seconds)
+
+class AdaptiveRateLimiter:
+    """
+    Per-provider request scheduler built on a token bucket.
+
+    The rate starts at the provider's quota. Every 429 halves it and honours
+    the Retry-After header; every answered request below 500 raises it again
+    in small steps, back up to the quota. Rate-limited requests are retried
+    after the wait instead of being reported as failures.
+    """
+    def __init__(self, name, rate, capacity=1.0, min_rate=None, recovery_step=None,
+                 max_retries=DEFAULT_MAX_RETRIES, clock=time.monotonic, sleep=time.sleep):
+        """
+        Args:
+            name (str): Provider name used in logs and metrics.
+            rate (float): Provider quota in requests per second.
+            capacity (float): Requests allowed in a burst.
+            min_rate (float, optional): Lowest rate to back off to (default is 1% of the quota).
+            recovery_step (float, optional): Rate added per successful request (default is 5% of the quota).
+            max_retries (int): Retries of a rate-limited request before giving up.
+            clock (callable): Monotonic clock (replaceable in tests).
+            sleep (callable): Sleep function (replaceable in tests).
+        """
+        self.name = name
+        self.max_rate = rate
+        self.min_rate = min_rate if min_rate is not None else rate / 100
+        self.recovery_step = recovery_step if recovery_step is not None else rate / 20
+        self.max_retries = max_retries
+        self.bucket = TokenBucket(rate, capacity, clock=clock, sleep=sleep)
+        self.decreased_at = None
+
+    @property
+    def rate(self):
+        return self.bucket.rate
+
+    def acquire(self):
+        """
+        Blocks until the provider may be called.
+        """
+        clock = getattr(_dispatch, "clock", None)
+        waited = self.bucket.reserve()
+        if waited > 0:
+            if clock is not None:
+                clock.queued()
+            self.bucket.sleep(waited)
+        if clock is not None:
+            clock.granted()
+        rate_limit_wait.observe(waited, provider=self.name)
+        return waited
+
+    def on_success(self):
+        """
+        Raises the rate one step towards the quota after an accepted request.
+        """
+        with self.bucket.lock:
+            self.bucket.rate = min(self.max_rate, self.bucket.rate + self.recovery_step)
+
+    def on_rate_limited(self, retry_after=None):
+        """
+        Halves the rate after a 429 and pauses until Retry-After has passed.
+        Concurrent requests usually hit the limit together, so the rate is
+        halved at most once per request interval.
+
+        Args:
+            retry_after (float, optional): Seconds the provider asked us to wait.
+        """
+        rate_limited.inc(provider=self.name)
+        with self.bucket.lock:
+            now = self.bucket.clock()
+            if self.decreased_at is None or now - self.decreased_at >= 1 / self.bucket.rate:
+                self.bucket.rate = max(self.min_rate, self.bucket.rate / 2)
+                self.decreased_at = now
+            rate = self.bucket.rate
+        pause = retry_after if retry_after is not None else 1 / rate
+        self.bucket.pause(pause)
+        logging.warning(f"{self.name} rate limit hit; pausing {pause:.2f}s and slowing to {rate:.3f} requests/s.")
+
+    def request(self, send):
+        """
+        Sends a request through the limiter, waiting for a slot and retrying
+        it while the provider answers 429.
+
+        Args:
+            send (callable): Sends the request and returns a requests.Response.
+
+        Returns:
+            requests.Response: The first response that is not a 429, or the last 429 once retries run out.
+        """
+        for _ in range(self.max_retries + 1):
+            self.acquire()
+            response = send()
+            if response.status_code != 429:
+                # A failing provider (5xx) must not win back its rate
+                if response.status_code < 500:
+                    self.on_success()
+                return response
+            self.on_rate_limited(parse_retry_after(response.headers.get("Retry-After")))
+        logging.error(f"{self.name} still rate limited after {self.max_retries} retries.")
+        return response
@@ -0,0 +1,209 @@
+import math
+
+LONG_TERM_DAYS = 365
+UNKNOWN_TOKEN = "unknown"
+
+class ExactSum:
+    """
+    Running float sum that is exact until it is read.
+
+    Values are kept as a short list of non-overlapping partial sums
+    (Shewchuk's algorithm, as used by math.fsum), so adding values or merging
+    two sums in any order and grouping gives the same correctly rounded
+    result. This is what lets shards be reduced in any order and still match
+    a single sequential pass bit for bit.
+    """
+    __slots__ = ("partials",)
+
+    def __init__(self, partials=None):
+        self.partials = list(partials) if partials else []
+
+    def add(self, x):
+        partials = self.partials
+        i = 0
+        for y in partials:
+            if abs(x) < abs(y):
+                x, y = y, x
+            hi = x + y
+            lo = y - (hi - x)
+            if lo:
+                partials[i] = lo
+                i += 1
+            x = hi
+        partials[i:] = [x]
+
+    def merge(self, other):
+        for x in other.partials:
+            self.add(x)
+
+    @property
+    def value(self):
+        return math.fsum(self.partials)
+
+class TaxBucket:
+    """
+    Profit, tax and trade count for one slice of an aggregate.
+    """
+    __slots__ = ("profit", "tax", "count")
+
+    def __init__(self):
+        self.profit = ExactSum()
+        self.tax = ExactSum()
+        self.count = 0
+
+    def add(self, profit, tax):
+        self.profit.add(profit)
+        self.tax.add(tax)
+        self.count += 1
+
+    def merge(self, other):
+        self.profit.merge(other.profit)
+        self.tax.merge(other.tax)
+        self.count += other.count
+
+    def to_dict(self):
+        return {"profit": self.profit.value, "tax": self.tax.value, "count": self.count}
+
+    def _state(self):
+        return {"profit": list(self.profit.partials), "tax": list(self.tax.partials), "count": self.count}
+
+    @classmethod
+    def _from_state(cls, state):
+        bucket = cls()
+        bucket.profit = ExactSum(state["profit"])
+        bucket.tax = ExactSum(state["tax"])
+        bucket.count = state["count"]
+        return bucket
+
+class TaxAggregate:
+    """
+    Mergeable tax totals with per-token, per-year and short/long-term breakdowns.
+
+    Merging is associative and commutative, so a history can be split into
+    shards, each shard aggregated by a different process or machine, and the
+    partial aggregates combined in any order into the same result as one
+    sequential pass. Aggregates survive a round trip through to_state() /
+    from_state() (plain JSON-friendly data) without losing precision.
+    """
+    def __init__(self):
+        self.total = TaxBucket()
+        self.short_term = TaxBucket()
+        self.long_term = TaxBucket()
+        self.by_token = {}
+        self.by_year = {}
+
+    def add(self, profit, tax, token_symbol=None, year=None, holding_period=None):
+        """
+        Records one trade.
+
+        Args:
+            profit (float): Profit from the trade.
+            tax (float): Tax owed on the trade.
+            token_symbol (str, optional): Token traded.
+            year (int, optional): Tax year of the sale.
+            holding_period (int, optional): Holding period in days; decides the short/long-term bucket.
+        """
+        self.total.add(profit, tax)
+        if holding_period is not None:
+            (self.long_term if holding_period >= LONG_TERM_DAYS else self.short_term).add(profit, tax)
+        token_symbol = token_symbol or UNKNOWN_TOKEN
+        bucket = self.by_token.get(token_symbol)
+        if bucket is None:
+            bucket = self.by_token[token_symbol] = TaxBucket()
+        bucket.add(profit, tax)
+        if year is not None:
+            bucket = self.by_year.get(year)
+            if bucket is None:
+                bucket = self.by_year[year] = TaxBucket()
+            bucket.add(profit, tax)
+
+    def merge(self, other):
+        """
+        Adds another aggregate into this one.
+
+        Returns:
+            TaxAggregate: self, for chaining.
+        """
+        self.total.merge(other.total)
+        self.short_term.merge(other.short_term)
+        self.long_term.merge(other.long_term)
+        for breakdown, other_breakdown in ((self.by_token, other.by_token), (self.by_year, other.by_year)):
+            for key, other_bucket in other_breakdown.items():
+                bucket = breakdown.get(key)
+                if bucket is None:
+                    bucket = breakdown[key] = TaxBucket()
+                bucket.merge(other_bucket)
+        return self
+
+    def __add__(self, other):
+        return TaxAggregate().merge(self).merge(other)
+
+    def __iadd__(self, other):
+        return self.merge(other)
+
+    @property
+    def total_profit(self):
+        return self.total.profit.value
+
+    @property
+    def total_tax(self):
+        return self.total.tax.value
+
+    @property
+    def count(self):
+        return self.total.count
+
+    def to_dict(self):
+        """
+        Returns the rounded totals and breakdowns for reports.
+        """
+        return {
+            "total_profit": self.total_profit,
+            "total_tax": self.total_tax,
+            "count": self.count,
+            "short_term": self.short_term.to_dict(),
+            "long_term": self.long_term.to_dict(),
+            "by_token": {token: bucket.to_dict() for token, bucket in sorted(self.by_token.items())},
+            "by_year": {year: bucket.to_dict() for year, bucket in sorted(self.by_year.items())},
+        }
+
+    def to_state(self):
+        """
+        Returns the exact internal state as JSON-friendly data, for shipping
+        partial aggregates between machines.
+        """
+        return {
+            "total": self.total._state(),
+            "short_term": self.short_term._state(),
+            "long_term": self.long_term._state(),
+            "by_token": {token: bucket._state() for token, bucket in self.by_token.items()},
+            "by_year": {str(year): bucket._state() for year, bucket in self.by_year.items()},
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        Rebuilds an aggregate from to_state() output.
+        """
+        aggregate = cls()
+        aggregate.total = TaxBucket._from_state(state["total"])
+        aggregate.short_term = TaxBucket._from_state(state["short_term"])
+        aggregate.long_term = TaxBucket._from_state(state["long_term"])
+        aggregate.by_token = {token: TaxBucket._from_state(bucket) for token, bucket in state["by_token"].items()}
+        aggregate.by_year = {int(year): TaxBucket._from_state(bucket) for year, bucket in state["by_year"].items()}
+        return aggregate
+
+def reduce_aggregates(aggregates):
+    """
+    Merges partial aggregates into one.
+
+    Args:
+        aggregates (iterable): TaxAggregate objects, in any order.
+
+    Returns:
+        TaxAggregate: The combined aggregate.
+    """
+    result = TaxAggregate()
+    for aggregate in aggregates:
+        result.merge(aggregate)
+    return result
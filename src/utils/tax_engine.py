@@ -0,0 +1,178 @@
+import logging
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO)
+
+SECONDS_PER_DAY = 86400
+LONG_TERM_DAYS = 365
+
+def _sequential_sum(values):
+    """
+    Sums values left to right, matching the rounding of a Python accumulation loop.
+    """
+    if len(values) == 0:
+        return 0
+    return float(np.cumsum(values)[-1])
+
+def compute_tax(profits, holding_periods, short_term_rate, long_term_rate):
+    """
+    Applies the short- or long-term rate to every profit at once.
+
+    Args:
+        profits (array-like): Profit per transaction.
+        holding_periods (array-like): Holding period per transaction in days.
+        short_term_rate (float): Tax rate for short-term holdings.
+        long_term_rate (float): Tax rate for long-term holdings.
+
+    Returns:
+        numpy.ndarray: Tax per transaction.
+    """
+    profits = np.asarray(profits, dtype=float)
+    holding_periods = np.asarray(holding_periods)
+    return np.where(holding_periods < LONG_TERM_DAYS, profits * short_term_rate, profits * long_term_rate)
+
+def _is_profit(value):
+    # apply_tax_rule only accepts int and float profits
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _is_date(value):
+    return isinstance(value, datetime)
+
+def _accepted(series, kinds, check):
+    """
+    Flags the values the scalar path would accept: typed columns by dtype kind,
+    object columns value by value, before any coercion turns strings or
+    Decimals into valid numbers or dates.
+    """
+    if series.dtype == object:
+        return np.fromiter(map(check, series), dtype=bool, count=len(series))
+    return np.full(len(series), series.dtype.kind in kinds)
+
+def tax_totals_from_dates(purchase_dates, sell_dates, profits, short_term_rate, long_term_rate):
+    """
+    Computes holding periods, short/long classification and tax for columns of
+    transactions given as dates and profits.
+
+    Rows with missing or non-datetime dates, profits that are not int or
+    float (strings, Decimals and bools included) or a sell date before the
+    purchase date are skipped, as the scalar path does.
+
+    Args:
+        purchase_dates (array-like): Purchase datetimes.
+        sell_dates (array-like): Sell datetimes.
+        profits (array-like): Profit per transaction.
+        short_term_rate (float): Tax rate for short-term holdings.
+        long_term_rate (float): Tax rate for long-term holdings.
+
+    Returns:
+        dict: total_profit, total_tax, plus the number of taxed and skipped rows.
+    """
+    purchase_dates = pd.Series(purchase_dates)
+    sell_dates = pd.Series(sell_dates)
+    profits = pd.Series(profits)
+    accepted = (_accepted(purchase_dates, "M", _is_date) & _accepted(sell_dates, "M", _is_date)
+                & _accepted(profits, "iuf", _is_profit))
+
+    purchase = pd.to_datetime(purchase_dates.where(accepted), errors='coerce')
+    sell = pd.to_datetime(sell_dates.where(accepted), errors='coerce')
+    profits = pd.to_numeric(profits.where(accepted), errors='coerce').to_numpy(dtype=float)
+
+    # Floor division by one day matches timedelta.days
+    holding_periods = ((sell - purchase) // pd.Timedelta(days=1)).to_numpy(dtype=float, na_value=np.nan)
+
+    valid = ~np.isnan(holding_periods) & ~np.isnan(profits) & (holding_periods >= 0)
+    skipped = int(len(valid) - valid.sum())
+    if skipped:
+        logging.warning(f"Skipped {skipped} transactions with invalid dates or profit.")
+
+    profits = profits[valid]
+    tax = compute_tax(profits, holding_periods[valid], short_term_rate, long_term_rate)
+    return {
+        "total_profit": _sequential_sum(profits),
+        "total_tax": _sequential_sum(tax),
+        "taxed": int(valid.sum()),
+        "skipped": skipped,
+    }
+
+def tax_totals_from_prices(purchase_times, sell_times, purchase_prices, sell_prices, amounts,
+                           short_term_rate, long_term_rate):
+    """
+    Computes profit, holding period and tax for columns of trades given as Unix
+    timestamps and prices, the form process_wallet works with.
+
+    Holding periods are whole days between the two timestamps, counted as in
+    holding_period_from_timestamps (elapsed UTC seconds). Rows with a
+    missing timestamp or price, or a sell before the purchase, are skipped.
+
+    Args:
+        purchase_times (array-like): Purchase Unix timestamps.
+        sell_times (array-like): Sell Unix timestamps.
+        purchase_prices (array-like): Token price at purchase.
+        sell_prices (array-like): Token price at sale.
+        amounts (array-like): Token amount per trade.
+        short_term_rate (float): Tax rate for short-term holdings.
+        long_term_rate (float): Tax rate for long-term holdings.
+
+    Returns:
+        dict: total_profit, total_tax, plus the number of taxed and skipped rows.
+    """
+    purchase_times = np.asarray(purchase_times, dtype=float)
+    sell_times = np.asarray(sell_times, dtype=float)
+    purchase_prices = np.asarray(purchase_prices, dtype=float)
+    sell_prices = np.asarray(sell_prices, dtype=float)
+    amounts = np.asarray(amounts, dtype=float)
+
+    holding_periods = np.floor((sell_times - purchase_times) / SECONDS_PER_DAY)
+    profits = (sell_prices - purchase_prices) * amounts
+
+    valid = ~np.isnan(holding_periods) & ~np.isnan(profits) & (holding_periods >= 0)
+    skipped = int(len(valid) - valid.sum())
+    if skipped:
+        logging.warning(f"Skipped {skipped} transactions with missing timestamps or prices.")
+
+    profits = profits[valid]
+    tax = compute_tax(profits, holding_periods[valid], short_term_rate, long_term_rate)
+    return {
+        "total_profit": _sequential_sum(profits),
+        "total_tax": _sequential_sum(tax),
+        "taxed": int(valid.sum()),
+        "skipped": skipped,
+    }
+
+def calculate_tax_data_vectorized(transactions, date_range=None, tax_year=None,
+                                  short_term_rate=0.1, long_term_rate=0.05):
+    """
+    Columnar equivalent of tax_rules.calculate_tax_data.
+
+    Args:
+        transactions (list or pandas.DataFrame): Transaction data with 'purchase_date', 'sell_date' and 'profit'.
+        date_range (tuple, optional): Tuple containing start and end date for filtering transactions (default is None).
+        tax_year (int, optional): Year to consider for tax calculation (default is None).
+        short_term_rate (float): Tax rate for short-term holdings.
+        long_term_rate (float): Tax rate for long-term holdings.
+
+    Returns:
+        dict: Summary data containing total profits and tax liabilities.
+    """
+    frame = transactions if isinstance(transactions, pd.DataFrame) else pd.DataFrame.from_records(
+        transactions, columns=['purchase_date', 'sell_date', 'profit'])
+
+    sell_dates = pd.to_datetime(frame['sell_date'], errors='coerce')
+    keep = np.ones(len(frame), dtype=bool)
+    if date_range:
+        keep &= ((sell_dates >= date_range[0]) & (sell_dates <= date_range[1])).to_numpy()
+    if tax_year:
+        keep &= (sell_dates.dt.year == tax_year).to_numpy()
+
+    totals = tax_totals_from_dates(frame['purchase_date'][keep], frame['sell_date'][keep], frame['profit'][keep],
+                                   short_term_rate, long_term_rate)
+    summary_data = {
+        'total_profits': totals['total_profit'],
+        'total_tax': totals['total_tax']
+    }
+
+    logging.info(f"Tax report generated: {summary_data}")
+
+    return summary_data
@@ -1,26 +1,58 @@
 import csv
+import logging
+from concurrent.futures import ProcessPoolExecutor
 from fpdf import FPDF
+from src.utils.profiler import profile_stage, profiling
 from src.utils.tax_rules import calculate_tax_data  # Assuming tax_rules.py has this function
 
-def generate_tax_report(transactions: list, date_range: tuple = None, tax_year: int = None) -> str:
+# One row per realized gain, in this column order
+LEDGER_COLUMNS = ("token_symbol", "amount", "purchase_date", "sell_date", "purchase_price", "sell_price",
+                  "cost_basis", "proceeds", "profit", "holding_period", "tax")
+
+# Rows buffered per columnar record batch; bounds the memory a Parquet/Arrow export uses
+DEFAULT_LEDGER_BATCH_SIZE = 65536
+
+# FPDF keeps every page in memory until output, so long ledgers are split into files of this many rows
+DEFAULT_PDF_ROWS_PER_FILE = 50000
+
+# (key, heading, width in mm, alignment) of each PDF ledger column, laid out once for every page and report
+PDF_LEDGER_COLUMNS = (
+    ("token_symbol", "Token", 25, "L"),
+    ("amount", "Amount", 28, "R"),
+    ("purchase_date", "Purchased", 30, "L"),
+    ("sell_date", "Sold", 30, "L"),
+    ("cost_basis", "Cost basis", 32, "R"),
+    ("proceeds", "Proceeds", 32, "R"),
+    ("profit", "Profit", 32, "R"),
+    ("holding_period", "Days held", 18, "R"),
+    ("tax", "Tax", 30, "R"),
+)
+PDF_ROW_HEIGHT = 6
+
+def generate_tax_report(transactions: list, date_range: tuple = None, tax_year: int = None,
+                        profile_output: str = None) -> str:
     """
     Generate a tax report based on the user's trading activity.
     Args:
         transactions (list): List of trading transaction data.
         date_range (tuple, optional): Tuple containing start and end date for filtering transactions (default is None).
         tax_year (int, optional): Year to consider for tax calculation (default is None).
+        profile_output (str, optional): Path prefix that enables CPU profiling of the tax and report stages.
     Returns:
         str: Generated report as a string (for CSV or PDF saving).
     """
-    # Get tax data using some tax calculation logic (to be defined in tax_rules.py)
-    tax_data = calculate_tax_data(transactions, date_range, tax_year)
-    
-    report_summary = f"Tax Report Summary for Year {tax_year}\n"
-    report_summary += f"Date Range: {date_range[0]} to {date_range[1]}\n\n"
-    
-    # Adding the summary of profits and tax liabilities
-    report_summary += f"Total Profits: {tax_data['total_profits']}\n"
-    report_summary += f"Total Tax Liabilities: {tax_data['total_tax']}\n"
+    with profiling(profile_output):
+        # Get tax data using some tax calculation logic (to be defined in tax_rules.py)
+        with profile_stage("tax"):
+            tax_data = calculate_tax_data(transactions, date_range, tax_year)
+
+        with profile_stage("report"):
+            report_summary = f"Tax Report Summary for Year {tax_year}\n"
+            report_summary += f"Date Range: {date_range[0]} to {date_range[1]}\n\n"
+
+            # Adding the summary of profits and tax liabilities
+            report_summary += f"Total Profits: {tax_data['total_profits']}\n"
+            report_summary += f"Total Tax Liabilities: {tax_data['total_tax']}\n"
     
     # Further transaction breakdown or detailed sections can be added as needed
     return report_summary
@@ -70,3 +102,252 @@ def save_as_pdf(report_data: str, file_name: str) -> None:
     
     pdf.output(f"{file_name}.pdf")
     print(f"Report saved as {file_name}.pdf")
+
+def ledger_rows(gains, short_term_rate=None, long_term_rate=None):
+    """
+    Turns realized gains into ledger rows lazily, adding the tax owed on each when rates are given.
+
+    Args:
+        gains (iterable): RealizedGain records (e.g. from cost_basis.match_lots) or ledger row dicts.
+        short_term_rate (float, optional): Tax rate for short-term holdings.
+        long_term_rate (float, optional): Tax rate for long-term holdings.
+
+    Yields:
+        dict: One ledger row per gain.
+    """
+    with_tax = short_term_rate is not None and long_term_rate is not None
+    for gain in gains:
+        if isinstance(gain, dict):
+            yield gain
+            continue
+        row = gain.to_dict()
+        if with_tax:
+            row["tax"] = gain.tax(short_term_rate, long_term_rate)
+        yield row
+
+def save_ledger(rows, file_type: str = 'csv', file_name: str = 'tax_ledger', columns=LEDGER_COLUMNS) -> int:
+    """
+    Export a per-transaction ledger as CSV, Parquet or Arrow, streaming rows as they arrive.
+    Args:
+        rows (iterable): Ledger rows (see ledger_rows).
+        file_type (str): The format to save the ledger ('csv', 'parquet' or 'arrow').
+        file_name (str): The name of the output file, without extension.
+        columns (tuple): Columns to write.
+    Returns:
+        int: Number of rows written.
+    """
+    if file_type == 'csv':
+        return write_ledger_csv(rows, file_name, columns)
+    if file_type in ('parquet', 'arrow'):
+        return write_ledger_columnar(rows, file_name, columns, file_type)
+    raise ValueError("Invalid file type. Choose 'csv', 'parquet' or 'arrow'.")
+
+def write_ledger_csv(rows, file_name: str, columns=LEDGER_COLUMNS) -> int:
+    """
+    Write ledger rows to a CSV file one at a time, so memory use does not grow with the ledger.
+    Args:
+        rows (iterable): Ledger rows (see ledger_rows).
+        file_name (str): The name of the CSV file, without extension.
+        columns (tuple): Columns to write; other keys are ignored.
+    Returns:
+        int: Number of rows written.
+    """
+    count = 0
+    with open(f"{file_name}.csv", mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    logging.info(f"Ledger with {count} rows saved as {file_name}.csv")
+    return count
+
+def _ledger_schema(pa, columns):
+    types = {
+        "token_symbol": pa.string(),
+        "purchase_date": pa.timestamp("s"),
+        "sell_date": pa.timestamp("s"),
+        "holding_period": pa.int64(),
+    }
+    return pa.schema([(column, types.get(column, pa.float64())) for column in columns])
+
+def write_ledger_columnar(rows, file_name: str, columns=LEDGER_COLUMNS, file_type: str = 'parquet',
+                          batch_size: int = DEFAULT_LEDGER_BATCH_SIZE) -> int:
+    """
+    Write ledger rows to a Parquet or Arrow IPC file in record batches of batch_size rows.
+    Requires the optional pyarrow package.
+    Args:
+        rows (iterable): Ledger rows (see ledger_rows).
+        file_name (str): The name of the output file, without extension.
+        columns (tuple): Columns to write; other keys are ignored.
+        file_type (str): 'parquet' or 'arrow'.
+        batch_size (int): Rows held in memory before a batch is written.
+    Returns:
+        int: Number of rows written.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet/Arrow export requires pyarrow (pip install pyarrow).") from e
+
+    schema = _ledger_schema(pa, columns)
+    path = f"{file_name}.{file_type}"
+    if file_type == 'parquet':
+        writer = pq.ParquetWriter(path, schema)
+    elif file_type == 'arrow':
+        writer = pa.ipc.new_file(path, schema)
+    else:
+        raise ValueError("Invalid file type. Choose either 'parquet' or 'arrow'.")
+
+    count = 0
+    buffer = {column: [] for column in columns}
+
+    def flush():
+        writer.write_batch(pa.record_batch([buffer[column] for column in columns], schema=schema))
+        for values in buffer.values():
+            values.clear()
+
+    with writer:
+        for row in rows:
+            for column in columns:
+                buffer[column].append(row.get(column))
+            count += 1
+            if count % batch_size == 0:
+                flush()
+        if count % batch_size:
+            flush()
+
+    logging.info(f"Ledger with {count} rows saved as {path}")
+    return count
+
+def _format_cell(value):
+    if value is None:
+        return ""
+    if hasattr(value, "strftime"):
+        return value.strftime("%Y-%m-%d")
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    return str(value)
+
+class LedgerPDF(FPDF):
+    """
+    Landscape ledger document whose header (title and column headings) and
+    page-numbered footer are drawn on every page from one shared column layout.
+    """
+    def __init__(self, title, columns=PDF_LEDGER_COLUMNS):
+        super().__init__(orientation='L', unit='mm', format='A4')
+        self.title = title
+        self.columns = columns
+        self.alias_nb_pages()
+        self.set_auto_page_break(True, margin=15)
+
+    def header(self):
+        self.set_font('Arial', 'B', 12)
+        self.cell(0, 8, txt=self.title, ln=True, align='C')
+        self.set_font('Arial', 'B', 9)
+        for _, heading, width, align in self.columns:
+            self.cell(width, PDF_ROW_HEIGHT + 1, heading, border='B', align=align)
+        self.ln()
+        self.set_font('Arial', '', 9)
+
+    def footer(self):
+        self.set_y(-12)
+        self.set_font('Arial', 'I', 8)
+        self.cell(0, 8, f"Page {self.page_no()}/{{nb}}", align='C')
+
+    def add_row(self, row, style=''):
+        """
+        Draws one ledger row; FPDF starts a new page (with its header) when the current one is full.
+        """
+        if style:
+            self.set_font('Arial', style, 9)
+        for key, _, width, align in self.columns:
+            self.cell(width, PDF_ROW_HEIGHT, _format_cell(row.get(key)), align=align)
+        self.ln()
+        if style:
+            self.set_font('Arial', '', 9)
+
+def _render_ledger_part(rows, title, columns, limit):
+    pdf = LedgerPDF(title, columns)
+    pdf.add_page()
+    count = 0
+    part_profit = 0.0
+    part_tax = 0.0
+    for row in rows:
+        pdf.add_row(row)
+        part_profit += row.get("profit") or 0.0
+        part_tax += row.get("tax") or 0.0
+        count += 1
+        if count == limit:
+            break
+    return pdf, count, part_profit, part_tax
+
+def render_ledger_pdf(rows, file_name: str, title: str = "Tax Ledger", columns=PDF_LEDGER_COLUMNS,
+                      rows_per_file: int = DEFAULT_PDF_ROWS_PER_FILE) -> list:
+    """
+    Render ledger rows as paginated PDF tables, consuming the rows lazily.
+    Ledgers longer than rows_per_file are split into <file_name>_part1.pdf,
+    <file_name>_part2.pdf, ..., so memory use is bounded by one file's pages.
+    Each part ends with its own subtotal and the running total through that
+    part; the last part's running total is the ledger total.
+    Args:
+        rows (iterable): Ledger rows (see ledger_rows).
+        file_name (str): The name of the PDF file, without extension.
+        title (str): Title printed on every page.
+        columns (tuple): Column layout, as in PDF_LEDGER_COLUMNS.
+        rows_per_file (int): Maximum rows per PDF file.
+    Returns:
+        list: Paths of the written PDF files.
+    """
+    rows = iter(rows)
+    paths = []
+    part = 1
+    total_profit = 0.0
+    total_tax = 0.0
+    while True:
+        pdf, count, part_profit, part_tax = _render_ledger_part(rows, title, columns, rows_per_file)
+        total_profit += part_profit
+        total_tax += part_tax
+        # Peek so a ledger that fits in one file keeps the plain name
+        next_row = next(rows, None) if count == rows_per_file else None
+        if next_row is None and part == 1:
+            path = f"{file_name}.pdf"
+        else:
+            path = f"{file_name}_part{part}.pdf"
+            pdf.add_row({"token_symbol": "Subtotal", "profit": part_profit, "tax": part_tax}, style='B')
+        label = "Total" if next_row is None else "Total to date"
+        pdf.add_row({"token_symbol": label, "profit": total_profit, "tax": total_tax}, style='B')
+        pdf.output(path, 'F')
+        paths.append(path)
+        if next_row is None:
+            break
+        rows = _prepend(next_row, rows)
+        part += 1
+
+    logging.info(f"Ledger saved as {', '.join(paths)}")
+    return paths
+
+def _prepend(first, rest):
+    yield first
+    yield from rest
+
+def _render_ledger_job(job):
+    rows, file_name, title = job
+    if callable(rows):
+        rows = rows()
+    return file_name, render_ledger_pdf(rows, file_name, title)
+
+def render_ledger_pdfs(jobs, max_workers: int = None) -> dict:
+    """
+    Render PDF ledgers for many wallets in parallel worker processes.
+    Args:
+        jobs (iterable): (rows, file_name, title) tuples. rows is a list, or a picklable
+            callable returning the rows (e.g. a functools.partial of a module-level
+            function), which is called in the worker so rows are produced lazily there.
+        max_workers (int, optional): Number of worker processes (default is the CPU count).
+    Returns:
+        dict: Written PDF paths keyed by file_name.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return dict(executor.map(_render_ledger_job, jobs))
@@ -1,9 +1,14 @@
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import partial
 import logging
+from src.utils.tax_aggregate import TaxAggregate, reduce_aggregates
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 
+SECONDS_PER_DAY = 86400
+
 def calculate_holding_period(purchase_date, sell_date):
     """
     Calculates the holding period in days between purchase and sell dates.
@@ -33,6 +38,27 @@ def calculate_holding_period(purchase_date, sell_date):
         logging.error(f"Error calculating holding period: {e}")
         raise
 
+def holding_period_from_timestamps(purchase_time, sell_time):
+    """
+    Calculates the holding period in whole days between two Unix timestamps.
+
+    Days are elapsed 86400-second spans, so the result does not depend on the
+    local time zone or daylight saving changes. The vectorized tax engine and
+    cost-basis matching count holding periods the same way.
+
+    Args:
+        purchase_time (int): Unix timestamp of the purchase.
+        sell_time (int): Unix timestamp of the sale.
+
+    Returns:
+        int: Holding period in days.
+    """
+    holding_period = int((sell_time - purchase_time) // SECONDS_PER_DAY)
+    if holding_period < 0:
+        logging.warning(f"Sell time {sell_time} is earlier than purchase time {purchase_time}.")
+        raise ValueError("Sell date cannot be earlier than purchase date.")
+    return holding_period
+
 def apply_tax_rule(profit, holding_period, short_term_rate, long_term_rate):
     """
     Applies the appropriate tax rate based on holding period.
@@ -47,7 +73,7 @@ def apply_tax_rule(profit, holding_period, short_term_rate, long_term_rate):
         float: Tax amount.
     """
     try:
-        if not isinstance(profit, (int, float)):
+        if not isinstance(profit, (int, float)) or isinstance(profit, bool):
             logging.error("Invalid profit type. Profit must be a number.")
             raise ValueError("Profit must be a number.")
         
@@ -68,6 +94,27 @@ def apply_tax_rule(profit, holding_period, short_term_rate, long_term_rate):
         logging.error(f"Error applying tax rule: {e}")
         raise
 
+def calculate_trade_tax(purchase_time, sell_time, purchase_price, sell_price, amount, short_term_rate, long_term_rate):
+    """
+    Calculates profit and tax for a single trade.
+
+    Args:
+        purchase_time (int): Unix timestamp of the purchase.
+        sell_time (int): Unix timestamp of the sale.
+        purchase_price (float): Token price at purchase.
+        sell_price (float): Token price at sale.
+        amount (float): Amount of tokens traded.
+        short_term_rate (float): Tax rate for short-term holdings.
+        long_term_rate (float): Tax rate for long-term holdings.
+
+    Returns:
+        tuple: Profit and tax amount.
+    """
+    profit = (sell_price - purchase_price) * amount
+    holding_period = holding_period_from_timestamps(purchase_time, sell_time)
+    tax = apply_tax_rule(profit, holding_period, short_term_rate, long_term_rate)
+    return profit, tax
+
 def calculate_tax_data(transactions, date_range=None, tax_year=None):
     """
     Calculate summarized tax data for all transactions.
@@ -118,3 +165,56 @@ def calculate_tax_data(transactions, date_range=None, tax_year=None):
     logging.info(f"Tax report generated: {summary_data}")
     
     return summary_data
+
+def aggregate_tax_data(transactions, date_range=None, tax_year=None, short_term_rate=0.1, long_term_rate=0.05):
+    """
+    Calculates tax data for some transactions as a mergeable TaxAggregate, with
+    per-token, per-year and short/long-term breakdowns.
+
+    Aggregates of disjoint shards can be merged in any order into the same
+    result as one aggregate over all transactions, so a large history can be
+    split across processes or machines.
+
+    Args:
+        transactions (iterable): Transaction data (each with 'purchase_date', 'sell_date', 'profit',
+            and optionally 'token_symbol').
+        date_range (tuple, optional): Tuple containing start and end date for filtering transactions (default is None).
+        tax_year (int, optional): Year to consider for tax calculation (default is None).
+        short_term_rate (float): Tax rate for short-term holdings.
+        long_term_rate (float): Tax rate for long-term holdings.
+
+    Returns:
+        TaxAggregate: Totals and breakdowns for the transactions.
+    """
+    aggregate = TaxAggregate()
+
+    for transaction in transactions:
+        sell_date = transaction['sell_date']
+        if date_range and not (date_range[0] <= sell_date <= date_range[1]):
+            continue
+        if tax_year and sell_date.year != tax_year:
+            continue
+
+        try:
+            holding_period = calculate_holding_period(transaction['purchase_date'], sell_date)
+            tax = apply_tax_rule(transaction['profit'], holding_period, short_term_rate, long_term_rate)
+            aggregate.add(transaction['profit'], tax, transaction.get('token_symbol'), sell_date.year, holding_period)
+        except Exception as e:
+            logging.error(f"Error processing transaction {transaction}: {e}")
+
+    return aggregate
+
+def aggregate_tax_data_sharded(shards, max_workers=None, **kwargs):
+    """
+    Aggregates shards of transactions in parallel worker processes and merges the results.
+
+    Args:
+        shards (iterable): Lists of transactions; each must be picklable.
+        max_workers (int, optional): Number of worker processes (default is the CPU count).
+        **kwargs: Filters and rates passed to aggregate_tax_data.
+
+    Returns:
+        TaxAggregate: The merged aggregate.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return reduce_aggregates(executor.map(partial(aggregate_tax_data, **kwargs), shards))
@@ -1,67 +1,53 @@
 import logging
-from datetime import datetime
 from src.utils.tax_rules import calculate_holding_period, apply_tax_rule
-from src.utils.privacy import sanitize_transaction_data
+from src.utils.transaction_record import TransactionRecord
 
 # Set up logging configuration
 logging.basicConfig(level=logging.INFO)
 
-def parse_solana_tx(raw_tx_data, purchase_date):
+def parse_solana_tx(raw_tx_data, purchase_date=None):
     """
     Parses a single Solana transaction, normalizes its data,
     then applies tax rules based on the transaction's date.
+
+    The record only has slots for non-sensitive fields, so sensitive data in
+    the raw transaction is never copied into it.
     
     Args:
         raw_tx_data (dict): Raw transaction data from Solana.
-        purchase_date (datetime): The date the asset was purchased.
+        purchase_date (datetime, optional): The date the asset was purchased. Without it
+            the holding period and tax liability are left as None.
     
     Returns:
-        dict: Normalized transaction details with tax liability.
+        TransactionRecord: Normalized transaction details with tax liability, or an
+        empty dict if the transaction cannot be parsed.
     """
     try:
-        # Sanitize transaction data before processing
-        sanitized_tx_data = sanitize_transaction_data(raw_tx_data)
-
-        # Ensure the presence of expected keys
-        signature = sanitized_tx_data.get("signature")
-        instructions = sanitized_tx_data.get("instructions", [])
-        block_time = sanitized_tx_data.get("blockTime")
-        status = sanitized_tx_data.get("status", "unknown")
+        transaction = TransactionRecord.from_raw(raw_tx_data)
+        signature = transaction.signature
 
         if not signature:
             logging.warning("Transaction missing 'signature'.")
         
-        if not instructions:
+        if not transaction.instructions:
             logging.warning(f"Transaction {signature} has no instructions.")
         
-        if not block_time:
+        if not transaction.block_time:
             logging.warning(f"Transaction {signature} missing 'blockTime'.")
             return {}
 
-        # Convert block_time to datetime for easier comparison
-        transaction_date = datetime.utcfromtimestamp(block_time)
-
-        # Calculate holding period (in days)
-        holding_period = calculate_holding_period(purchase_date, transaction_date)
-
-        # Assuming a fixed profit for now (this could be extended to fetch from transaction data)
-        profit = sanitized_tx_data.get("profit", 0.0)  # Example, you may need to extract profit differently
-
-        # Apply tax rule based on holding period
-        short_term_rate = 0.20  # Example rate for short-term tax
-        long_term_rate = 0.15   # Example rate for long-term tax
-        tax_liability = apply_tax_rule(profit, holding_period, short_term_rate, long_term_rate)
-
-        # Parse transaction data and add tax liability
-        transaction = {
-            "signature": signature,
-            "instructions": instructions,
-            "block_time": block_time,
-            "status": status,
-            "transaction_date": transaction_date,
-            "holding_period": holding_period,
-            "tax_liability": tax_liability
-        }
+        if purchase_date is not None:
+            # Calculate holding period (in days)
+            transaction.holding_period = calculate_holding_period(purchase_date, transaction.transaction_date)
+
+            # Assuming a fixed profit for now (this could be extended to fetch from transaction data)
+            profit = raw_tx_data.get("profit", 0.0)  # Example, you may need to extract profit differently
+
+            # Apply tax rule based on holding period
+            short_term_rate = 0.20  # Example rate for short-term tax
+            long_term_rate = 0.15   # Example rate for long-term tax
+            transaction.tax_liability = apply_tax_rule(profit, transaction.holding_period,
+                                                       short_term_rate, long_term_rate)
 
         return transaction
 
@@ -0,0 +1,103 @@
+from datetime import datetime
+
+class TransactionRecord:
+    """
+    Compact, slotted record for a single normalized transaction.
+
+    Only non-sensitive fields have slots, so building a record from raw RPC
+    data also drops wallet addresses, keys and user ids without copying the
+    raw dict first. Dates are derived from the stored timestamps on access
+    (as naive UTC, like the tax engine) instead of being kept as datetime objects.
+
+    Records also support read-only mapping access (record["signature"],
+    record.get("amount"), "signature" in record) for code written against
+    the dict-based transactions.
+    """
+    __slots__ = (
+        "signature", "slot", "instructions", "block_time", "status",
+        "token_symbol", "amount", "purchase_time", "sell_time",
+        "purchase_price", "sell_price", "profit", "tax",
+        "holding_period", "tax_liability",
+    )
+
+    DERIVED_FIELDS = ("transaction_date", "purchase_date", "sell_date")
+
+    def __init__(self, signature=None, slot=None, instructions=None, block_time=None, status="unknown",
+                 token_symbol="SOL", amount=1.0, purchase_time=None, sell_time=None):
+        self.signature = signature
+        self.slot = slot
+        self.instructions = instructions if instructions is not None else []
+        self.block_time = block_time
+        self.status = status
+        self.token_symbol = token_symbol
+        self.amount = amount
+        self.purchase_time = purchase_time
+        self.sell_time = sell_time
+        self.purchase_price = None
+        self.sell_price = None
+        self.profit = None
+        self.tax = None
+        self.holding_period = None
+        self.tax_liability = None
+
+    @classmethod
+    def from_raw(cls, raw_tx_data):
+        """
+        Builds a record from raw transaction data (RPC signature entries or
+        normalized getTransaction results), reading only non-sensitive fields.
+
+        Args:
+            raw_tx_data (dict): Raw transaction data from Solana.
+
+        Returns:
+            TransactionRecord: The normalized record.
+        """
+        get = raw_tx_data.get
+        return cls(
+            signature=get("signature"),
+            slot=get("slot"),
+            instructions=get("instructions"),
+            block_time=get("blockTime", get("block_time")),
+            status=get("status", "unknown"),
+            token_symbol=get("token_symbol", "SOL"),
+            amount=get("amount", 1.0),
+            purchase_time=get("purchase_time"),
+            sell_time=get("sell_time"),
+        )
+
+    @property
+    def transaction_date(self):
+        return datetime.utcfromtimestamp(self.block_time) if self.block_time else None
+
+    @property
+    def purchase_date(self):
+        return datetime.utcfromtimestamp(self.purchase_time) if self.purchase_time else None
+
+    @property
+    def sell_date(self):
+        return datetime.utcfromtimestamp(self.sell_time) if self.sell_time else None
+
+    def keys(self):
+        return self.__slots__ + self.DERIVED_FIELDS
+
+    def __contains__(self, key):
+        return key in self.__slots__ or key in self.DERIVED_FIELDS
+
+    def __getitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        if key not in self:
+            return default
+        return getattr(self, key)
+
+    def to_dict(self):
+        """
+        Returns the stored fields as a plain dict.
+        """
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self):
+        return f"TransactionRecord(signature={self.signature!r}, block_time={self.block_time!r})"
@@ -0,0 +1,56 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+from benchmarks.run_benchmarks import find_regressions, main, percentile
+from benchmarks.synthetic import generate_wallet
+
+class TestBenchmarks(unittest.TestCase):
+    """
+    Smoke tests keeping the synthetic-load benchmark suite runnable.
+    """
+
+    def test_synthetic_wallet_is_newest_first(self):
+        """
+        Test that generated wallets are reproducible and ordered the way the RPC returns them.
+        """
+        wallet = generate_wallet(100, tokens=("SOL", "BONK"), seed=3)
+        self.assertEqual(wallet, generate_wallet(100, tokens=("SOL", "BONK"), seed=3))
+        block_times = [tx["blockTime"] for tx in wallet]
+        self.assertEqual(block_times, sorted(block_times, reverse=True))
+        self.assertTrue(all(tx["purchase_time"] <= tx["sell_time"] for tx in wallet))
+        self.assertEqual({tx["token_symbol"] for tx in wallet}, {"SOL", "BONK"})
+
+    def test_small_run_against_stub_servers(self):
+        """
+        Test a full benchmark run on a tiny wallet, including the results file.
+        """
+        output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir)
+        output = os.path.join(output_dir, "results.json")
+        self.addCleanup(logging.getLogger().setLevel, logging.getLogger().level)
+
+        self.assertEqual(main(["--sizes", "120", "--repeat", "1", "--days", "30", "--output", output]), 0)
+
+        with open(output) as f:
+            results = json.load(f)["results"]
+        self.assertEqual([result["workload"] for result in results],
+                         ["process_wallet", "calculate_tax_data", "generate_tax_report"])
+        self.assertGreater(results[0]["throughput_tps"], 0)
+        self.assertGreater(results[0]["provider_latency"]["coingecko"]["count"], 0)
+
+    def test_regression_detection(self):
+        """
+        Test that throughput drops beyond the tolerance are reported.
+        """
+        baseline = [{"workload": "process_wallet", "transactions": 1000, "throughput_tps": 1000.0}]
+        self.assertEqual(find_regressions([{"workload": "process_wallet", "transactions": 1000,
+                                            "throughput_tps": 900.0}], baseline, 0.2), [])
+        self.assertEqual(len(find_regressions([{"workload": "process_wallet", "transactions": 1000,
+                                                "throughput_tps": 700.0}], baseline, 0.2)), 1)
+        self.assertEqual(percentile([3, 1, 2, 4], 50), 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from src.utils.cache_manager import CacheManager
+
+class TestCacheManager(unittest.TestCase):
+    """
+    Unit tests for the memory and persistent SQLite price caches.
+    """
+
+    def setUp(self):
+        """
+        Create a temporary directory for the SQLite cache file.
+        """
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, "prices.sqlite3")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_memory_cache_round_trip(self):
+        """
+        Test storing and retrieving a price from the default memory backend.
+        """
+        cache = CacheManager()
+        cache.store_price(1672531200, "SOL", 100.0)
+        self.assertEqual(cache.get_cached_price(1672531200, "SOL"), 100.0)
+        self.assertIsNone(cache.get_cached_price(1672531200, "BTC"))
+
+    def test_sqlite_cache_persists_between_instances(self):
+        """
+        Test that a price stored by one CacheManager is visible to a new one using the same file.
+        """
+        CacheManager(backend="sqlite", db_path=self.db_path).store_price(1672531200, "SOL", 100.0)
+
+        cache = CacheManager(backend="sqlite", db_path=self.db_path)
+        self.assertEqual(cache.get_cached_price(1672531200, "SOL"), 100.0)
+
+    def test_warm_start_loads_persisted_prices(self):
+        """
+        Test that warm start preloads the memory layer from disk.
+        """
+        writer = CacheManager(backend="sqlite", db_path=self.db_path)
+        writer.store_price(1672531200, "SOL", 100.0)
+        writer.store_price(1672617600, "SOL", 101.0)
+
+        cache = CacheManager(backend="sqlite", db_path=self.db_path, warm_start=True)
+        self.assertEqual(len(cache.memory), 2)
+
+    def test_warm_start_with_markers_that_never_expire(self):
+        """
+        Test that warm start works with max_age set and negative_ttl=None.
+        """
+        writer = CacheManager(backend="sqlite", db_path=self.db_path)
+        writer.store_price(1672531200, "SOL", 100.0)
+        writer.store_missing(1672531200, "DEAD")
+
+        cache = CacheManager(backend="sqlite", db_path=self.db_path, max_age=3600, negative_ttl=None,
+                             warm_start=True)
+        self.assertEqual(len(cache.memory), 2)
+        self.assertTrue(cache.is_price_missing(1672531200, "DEAD"))
+
+    def test_size_eviction(self):
+        """
+        Test that the oldest entries are evicted once max_entries is exceeded.
+        """
+        cache = CacheManager(backend="sqlite", db_path=self.db_path, max_entries=2)
+        for day in range(3):
+            cache.store_price(1672531200 + day * 86400, "SOL", 100.0 + day)
+        cache.evict()
+
+        self.assertEqual(len(cache.memory), 2)
+        self.assertEqual(len(cache.store), 2)
+        self.assertIsNone(cache.get_cached_price(1672531200, "SOL"))
+
+    def test_age_eviction(self):
+        """
+        Test that prices older than max_age are treated as misses.
+        """
+        cache = CacheManager(max_age=60)
+        cache.memory.set("SOL", 1672531200, 100.0, time.time() - 120)
+        self.assertIsNone(cache.get_cached_price(1672531200, "SOL"))
+
+    def test_missing_price_marker(self):
+        """
+        Test that a missing-price marker is not returned as a price and expires after negative_ttl.
+        """
+        cache = CacheManager(max_age=86400, negative_ttl=60)
+        cache.store_missing(1672531200, "DEAD")
+        self.assertIsNone(cache.get_cached_price(1672531200, "DEAD"))
+        self.assertTrue(cache.is_price_missing(1672531200, "DEAD"))
+        self.assertFalse(cache.is_price_missing(1672531200, "SOL"))
+
+        cache.memory.set("DEAD", 1672531200, None, time.time() - 120)
+        self.assertFalse(cache.is_price_missing(1672531200, "DEAD"))
+
+    def test_missing_price_marker_persists(self):
+        """
+        Test that markers are shared through the SQLite store and evicted on their own TTL.
+        """
+        writer = CacheManager(backend="sqlite", db_path=self.db_path, negative_ttl=60)
+        writer.store_missing(1672531200, "DEAD")
+        writer.store_price(1672531200, "SOL", 100.0)
+        self.assertTrue(CacheManager(backend="sqlite", db_path=self.db_path).is_price_missing(1672531200, "DEAD"))
+
+        writer.store.set("DEAD", 1672531200, None, time.time() - 120)
+        writer.memory.set("DEAD", 1672531200, None, time.time() - 120)
+        writer.evict()
+        self.assertEqual(len(writer.store), 1)
+        self.assertEqual(writer.get_cached_price(1672531200, "SOL"), 100.0)
+
+    def test_unknown_backend(self):
+        """
+        Test that an unknown backend name is rejected.
+        """
+        with self.assertRaises(ValueError):
+            CacheManager(backend="redis")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+import unittest
+from unittest import mock
+import requests
+from src.utils import price_fetcher
+from src.utils.cache_manager import CacheManager
+from src.utils.circuit_breaker import (CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, get_breaker,
+                                      reset_breakers)
+from src.utils.data_fetcher import fetch_transactions
+from src.utils.price_provider import CoinGeckoProvider, CoinMarketCapProvider, ProviderUnavailableError
+
+class FakeClock:
+    """
+    Manually advanced monotonic clock.
+    """
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def _response(status_code, payload=None):
+    response = mock.Mock(status_code=status_code, headers={})
+    response.json.return_value = payload or {}
+    if status_code >= 400:
+        response.raise_for_status.side_effect = requests.exceptions.HTTPError(response=response)
+    return response
+
+class TestCircuitBreaker(unittest.TestCase):
+    """
+    Unit tests for the circuit breaker and its use by the price providers and RPC fetcher.
+    """
+
+    def setUp(self):
+        """
+        Start every test with closed shared breakers and no rate limiting.
+        """
+        self.clock = FakeClock()
+        reset_breakers()
+        self.addCleanup(reset_breakers)
+        for provider in (CoinGeckoProvider, CoinMarketCapProvider):
+            patcher = mock.patch.object(provider, "rate_limiter", None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_opens_after_threshold(self):
+        """
+        Test that the circuit opens after consecutive failures and that a success resets the count.
+        """
+        breaker = CircuitBreaker("test", failure_threshold=3, clock=self.clock)
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CLOSED)
+
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.check()
+
+    def test_half_open_probe(self):
+        """
+        Test that one probe is let through after the reset timeout and decides the next state.
+        """
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10, clock=self.clock)
+        breaker.record_failure()
+        self.clock.now += 10
+
+        self.assertTrue(breaker.allow_request())
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertFalse(breaker.allow_request())
+
+        # A failed probe reopens the circuit for another full timeout
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+        self.clock.now += 5
+        self.assertFalse(breaker.allow_request())
+
+        self.clock.now += 5
+        self.assertTrue(breaker.allow_request())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertTrue(breaker.allow_request())
+
+    def test_unanswered_probe_is_retried(self):
+        """
+        Test that a half-open circuit allows a new probe if the previous one never reported back.
+        """
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=10, clock=self.clock)
+        breaker.record_failure()
+        self.clock.now += 10
+        self.assertTrue(breaker.allow_request())
+        self.clock.now += 10
+        self.assertTrue(breaker.allow_request())
+
+    def test_client_errors_do_not_open_provider_circuit(self):
+        """
+        Test that 4xx responses (e.g. an unknown token) are not counted as provider outages.
+        """
+        client = mock.Mock()
+        client.get.return_value = _response(404)
+        for _ in range(CoinGeckoProvider.circuit_breaker.failure_threshold + 1):
+            self.assertIsNone(CoinGeckoProvider.fetch_price("nope", "2023-01-01", http_client=client))
+        self.assertEqual(CoinGeckoProvider.circuit_breaker.state, CLOSED)
+
+    def test_open_provider_routes_to_fallback(self):
+        """
+        Test that once CoinGecko's circuit opens, lookups go straight to CoinMarketCap without calling CoinGecko.
+        """
+        client = mock.Mock()
+        client.get.return_value = _response(503)
+        for _ in range(CoinGeckoProvider.circuit_breaker.failure_threshold):
+            with self.assertRaises(ProviderUnavailableError):
+                CoinGeckoProvider.fetch_price("solana", "2023-01-01", http_client=client)
+        self.assertEqual(CoinGeckoProvider.circuit_breaker.state, OPEN)
+
+        client.get.reset_mock()
+        with mock.patch.object(price_fetcher, "cache_manager", CacheManager()), \
+                mock.patch.object(CoinMarketCapProvider, "fetch_price", return_value=42.0) as fallback, \
+                mock.patch("src.utils.price_provider.get_http_client", return_value=client):
+            price = price_fetcher.fetch_historical_price("SOL", 1672531200)
+
+        self.assertEqual(price, 42.0)
+        fallback.assert_called_once()
+        client.get.assert_not_called()
+
+    def test_open_rpc_circuit_short_circuits_fetch(self):
+        """
+        Test that fetch_transactions stops calling an RPC endpoint whose circuit is open.
+        """
+        client = mock.Mock()
+        client.post.side_effect = requests.exceptions.ConnectionError("down")
+        rpc_url = "https://failing_rpc.solana.com"
+        for _ in range(5):
+            self.assertEqual(fetch_transactions("wallet", rpc_url, http_client=client), [])
+        self.assertEqual(client.post.call_count, 5)
+
+        self.assertEqual(fetch_transactions("wallet", rpc_url, http_client=client), [])
+        self.assertEqual(client.post.call_count, 5)
+
+    def test_client_errors_do_not_open_rpc_circuit(self):
+        """
+        Test that 4xx responses from an RPC node do not open its circuit.
+        """
+        client = mock.Mock()
+        client.post.return_value = _response(400)
+        rpc_url = "https://strict_rpc.solana.com"
+        for _ in range(6):
+            self.assertEqual(fetch_transactions("wallet", rpc_url, http_client=client), [])
+        self.assertEqual(client.post.call_count, 6)
+        self.assertEqual(get_breaker(f"rpc:{rpc_url}").state, CLOSED)
+
+if __name__ == "__main__":
+    unittest.main()
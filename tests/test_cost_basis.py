@@ -0,0 +1,103 @@
+import unittest
+from src.utils.cost_basis import LotMatcher, match_lots, realized_tax_totals
+
+DAY = 86400
+START = 1672531200  # 2023-01-01
+
+def _fill(side, amount, price, day, token_symbol="SOL"):
+    return {"side": side, "token_symbol": token_symbol, "amount": amount, "price": price, "timestamp": START + day * DAY}
+
+FILLS = [
+    _fill("buy", 10, 10.0, 0),
+    _fill("buy", 10, 30.0, 10),
+    _fill("buy", 10, 20.0, 20),
+    _fill("sell", 15, 40.0, 400),
+]
+
+class TestCostBasis(unittest.TestCase):
+    """
+    Unit tests for FIFO/LIFO/HIFO lot matching.
+    """
+
+    def _matched(self, method):
+        return [(gain.amount, gain.purchase_price) for gain in match_lots(FILLS, method)]
+
+    def test_fifo(self):
+        """
+        Test that FIFO sells the oldest lots first and splits the last one.
+        """
+        self.assertEqual(self._matched("fifo"), [(10, 10.0), (5, 30.0)])
+
+    def test_lifo(self):
+        """
+        Test that LIFO sells the newest lots first.
+        """
+        self.assertEqual(self._matched("lifo"), [(10, 20.0), (5, 30.0)])
+
+    def test_hifo(self):
+        """
+        Test that HIFO sells the most expensive lots first.
+        """
+        self.assertEqual(self._matched("hifo"), [(10, 30.0), (5, 20.0)])
+
+    def test_partial_lot_remains_open(self):
+        """
+        Test that the unsold part of a lot keeps its price and date for later sales.
+        """
+        matcher = LotMatcher("fifo")
+        list(match_lots(FILLS, matcher=matcher))
+        self.assertEqual([(lot.amount, lot.price) for lot in matcher.open_lots("SOL")], [(5, 30.0), (10, 20.0)])
+        self.assertEqual(matcher.holdings("SOL"), 15)
+
+        gains = matcher.dispose("SOL", 5, 50.0, START + 500 * DAY)
+        self.assertEqual(gains[0].purchase_time, START + 10 * DAY)
+        self.assertEqual(gains[0].profit, 100.0)
+
+    def test_gains_feed_tax_rule(self):
+        """
+        Test that realized gains carry their holding period into the short/long-term rates.
+        """
+        fills = [
+            _fill("buy", 1, 100.0, 0),
+            _fill("buy", 1, 100.0, 300),
+            _fill("sell", 2, 200.0, 400),
+        ]
+        gains = list(match_lots(fills, "fifo"))
+        self.assertEqual([gain.holding_period for gain in gains], [400, 100])
+
+        totals = realized_tax_totals(gains, short_term_rate=0.3, long_term_rate=0.1)
+        self.assertEqual(totals["total_profit"], 200.0)
+        self.assertAlmostEqual(totals["total_tax"], 100.0 * 0.1 + 100.0 * 0.3)
+        self.assertEqual(totals["matched_lots"], 2)
+
+    def test_tokens_are_matched_separately(self):
+        """
+        Test that a sale only consumes lots of its own token.
+        """
+        fills = [_fill("buy", 1, 5.0, 0, "BTC"), _fill("buy", 1, 1.0, 1), _fill("sell", 1, 2.0, 2)]
+        gains = list(match_lots(fills, "hifo"))
+        self.assertEqual([(gain.token_symbol, gain.purchase_price) for gain in gains], [("SOL", 1.0)])
+
+    def test_oversold_amount_is_unmatched(self):
+        """
+        Test that selling more than is held records the excess instead of failing.
+        """
+        matcher = LotMatcher()
+        matcher.acquire("SOL", 1, 10.0, START)
+        gains = matcher.dispose("SOL", 3, 12.0, START + DAY)
+        self.assertEqual(sum(gain.amount for gain in gains), 1)
+        self.assertEqual(matcher.unmatched["SOL"], 2)
+
+    def test_rejects_invalid_input(self):
+        """
+        Test that unknown methods, unknown sides and out-of-order fills are rejected.
+        """
+        with self.assertRaises(ValueError):
+            LotMatcher("average")
+        with self.assertRaises(ValueError):
+            list(match_lots([_fill("transfer", 1, 1.0, 0)]))
+        with self.assertRaises(ValueError):
+            list(match_lots([_fill("buy", 1, 1.0, 5), _fill("sell", 1, 1.0, 4)]))
+
+if __name__ == "__main__":
+    unittest.main()
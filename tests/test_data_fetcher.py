@@ -0,0 +1,140 @@
+import unittest
+from unittest import mock
+from src.utils.data_fetcher import fetch_transaction_details, fetch_transactions, iter_signatures
+
+class FakeRpcClient:
+    """
+    Serves getConfirmedSignaturesForAddress2 pages from an in-memory signature list.
+    """
+    def __init__(self, total):
+        self.signatures = [{"signature": f"sig{i}", "slot": total - i} for i in range(total)]
+        self.calls = []
+
+    def post(self, url, json=None, headers=None):
+        options = json["params"][1]
+        self.calls.append(options)
+        start = 0
+        if "before" in options:
+            start = [entry["signature"] for entry in self.signatures].index(options["before"]) + 1
+        page = []
+        for entry in self.signatures[start:start + options["limit"]]:
+            if entry["signature"] == options.get("until"):
+                break
+            page.append(entry)
+        response = mock.Mock()
+        response.json.return_value = {"jsonrpc": "2.0", "id": 1, "result": page}
+        return response
+
+class FakeBatchRpcClient:
+    """
+    Answers JSON-RPC batches of getTransaction calls, in reverse order to exercise id matching.
+    """
+    def __init__(self, missing=(), batch_reply=None, extra_replies=()):
+        self.batches = []
+        self.single_calls = 0
+        self.missing = set(missing)
+        self.batch_reply = batch_reply
+        self.extra_replies = list(extra_replies)
+
+    def _reply(self, request):
+        signature = request["params"][0]
+        result = None
+        if signature not in self.missing:
+            result = {
+                "slot": 1,
+                "blockTime": 1650000000,
+                "meta": {"err": None},
+                "transaction": {"message": {"instructions": [{"program": "system"}]}},
+            }
+        return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+
+    def post(self, url, json=None, headers=None):
+        response = mock.Mock()
+        if isinstance(json, dict):
+            self.single_calls += 1
+            response.json.return_value = self._reply(json)
+            return response
+        self.batches.append(len(json))
+        if self.batch_reply is not None:
+            response.json.return_value = self.batch_reply
+        else:
+            response.json.return_value = self.extra_replies + [self._reply(request) for request in reversed(json)]
+        return response
+
+class TestDataFetcher(unittest.TestCase):
+    """
+    Unit tests for paginated signature fetching.
+    """
+
+    def test_fetch_transactions_pages_past_limit(self):
+        """
+        Test that wallets with more signatures than one page are fetched completely.
+        """
+        client = FakeRpcClient(2500)
+        transactions = fetch_transactions("wallet", "https://dummy_rpc.solana.com", http_client=client)
+
+        self.assertEqual(len(transactions), 2500)
+        self.assertEqual(len(client.calls), 3)
+        self.assertEqual(client.calls[1]["before"], "sig999")
+
+    def test_iter_signatures_stops_at_until(self):
+        """
+        Test that streaming stops at the `until` cursor.
+        """
+        client = FakeRpcClient(50)
+        signatures = list(iter_signatures("wallet", "https://dummy_rpc.solana.com", page_size=10,
+                                          until="sig25", http_client=client))
+
+        self.assertEqual([entry["signature"] for entry in signatures], [f"sig{i}" for i in range(25)])
+
+    def test_iter_signatures_is_lazy(self):
+        """
+        Test that the first page is available before the whole history is fetched.
+        """
+        client = FakeRpcClient(5000)
+        stream = iter_signatures("wallet", "https://dummy_rpc.solana.com", page_size=100, http_client=client)
+        first = next(stream)
+        stream.close()
+
+        self.assertEqual(first["signature"], "sig0")
+        self.assertLessEqual(len(client.calls), 2)
+
+    def test_fetch_transaction_details_batches_requests(self):
+        """
+        Test that getTransaction calls are packed into batches and returned in input order.
+        """
+        client = FakeBatchRpcClient(missing={"sig7"})
+        signatures = [f"sig{i}" for i in range(25)]
+        transactions = fetch_transaction_details(signatures, "https://dummy_rpc.solana.com", batch_size=10,
+                                                 max_workers=2, http_client=client)
+
+        self.assertEqual(sorted(client.batches), [5, 10, 10])
+        self.assertEqual([tx["signature"] for tx in transactions], [s for s in signatures if s != "sig7"])
+        self.assertEqual(transactions[0]["blockTime"], 1650000000)
+        self.assertEqual(transactions[0]["status"], "success")
+
+    def test_rejected_batch_falls_back_to_single_requests(self):
+        """
+        Test that a batch answered with a single error object is fetched one signature at a time.
+        """
+        for batch_reply in ({"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "batch disabled"}},
+                            "batch disabled"):
+            client = FakeBatchRpcClient(missing={"sig2"}, batch_reply=batch_reply)
+            signatures = [f"sig{i}" for i in range(5)]
+            transactions = fetch_transaction_details(signatures, "https://dummy_rpc.solana.com", batch_size=10,
+                                                     http_client=client)
+
+            self.assertEqual([tx["signature"] for tx in transactions], ["sig0", "sig1", "sig3", "sig4"])
+            self.assertEqual(client.single_calls, 5)
+
+    def test_non_object_batch_entries_are_skipped(self):
+        """
+        Test that entries in a batch reply that are not objects are ignored instead of failing the batch.
+        """
+        client = FakeBatchRpcClient(extra_replies=[None, "oops", 3, {"id": 0, "result": "not a transaction"}])
+        signatures = [f"sig{i}" for i in range(3)]
+        transactions = fetch_transaction_details(signatures, "https://dummy_rpc.solana.com", http_client=client)
+        self.assertEqual([tx["signature"] for tx in transactions], signatures)
+
+if __name__ == "__main__":
+    unittest.main()
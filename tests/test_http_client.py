@@ -0,0 +1,66 @@
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.utils import http_client
+from src.utils.http_client import HttpClient, configure_http_client, get_http_client
+
+class _CountingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        _CountingHandler.connections += 1
+
+    def do_GET(self):
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class TestHttpClient(unittest.TestCase):
+    """
+    Unit tests for the shared pooled HTTP client.
+    """
+
+    def setUp(self):
+        """
+        Start a local keep-alive HTTP server.
+        """
+        _CountingHandler.connections = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _CountingHandler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connections_are_reused(self):
+        """
+        Test that repeated requests to one host reuse a single keep-alive connection.
+        """
+        client = HttpClient(timeout=5)
+        for _ in range(10):
+            self.assertEqual(client.get(self.url).text, "ok")
+        client.close()
+        self.assertEqual(_CountingHandler.connections, 1)
+
+    def test_configure_replaces_shared_client(self):
+        """
+        Test that configure_http_client swaps the process-wide client.
+        """
+        previous = http_client._default_client
+        try:
+            client = configure_http_client(pool_maxsize=4, timeout=1)
+            self.assertIs(get_http_client(), client)
+            self.assertEqual(client.timeout, 1)
+        finally:
+            http_client._default_client = previous
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import json
+import threading
+import unittest
+from src.utils.metrics import MetricsRegistry
+
+class TestMetrics(unittest.TestCase):
+    """
+    Unit tests for the metrics registry.
+    """
+
+    def setUp(self):
+        """
+        Give each test its own registry.
+        """
+        self.registry = MetricsRegistry()
+
+    def test_counter_labels(self):
+        """
+        Test that counters are tracked separately per label set.
+        """
+        calls = self.registry.counter("calls_total", "Calls.")
+        calls.inc(provider="coingecko")
+        calls.inc(2, provider="coingecko")
+        calls.inc(provider="coinmarketcap")
+        self.assertEqual(calls.value(provider="coingecko"), 3)
+        self.assertEqual(calls.value(provider="coinmarketcap"), 1)
+        self.assertEqual(calls.value(provider="other"), 0)
+        self.assertIs(self.registry.counter("calls_total"), calls)
+
+    def test_counter_is_thread_safe(self):
+        """
+        Test that concurrent increments are not lost.
+        """
+        calls = self.registry.counter("calls_total")
+        threads = [threading.Thread(target=lambda: [calls.inc() for _ in range(1000)]) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(calls.value(), 8000)
+
+    def test_histogram_quantiles(self):
+        """
+        Test bucket counts and quantile estimates.
+        """
+        latency = self.registry.histogram("latency_seconds", buckets=(0.1, 0.5, 1.0))
+        for value in (0.05, 0.05, 0.3, 0.7, 5.0):
+            latency.observe(value, stage="price")
+        self.assertEqual(latency.count(stage="price"), 5)
+        self.assertAlmostEqual(latency.quantile(0.4, stage="price"), 0.1)
+        self.assertEqual(latency.quantile(0.99, stage="price"), 1.0)
+        self.assertIsNone(latency.quantile(0.5, stage="tax"))
+
+    def test_prometheus_output(self):
+        """
+        Test the Prometheus text exposition of counters and cumulative histogram buckets.
+        """
+        self.registry.counter("calls_total", "Calls.").inc(provider="coingecko")
+        latency = self.registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+        latency.observe(0.05)
+        latency.observe(0.5)
+        output = self.registry.to_prometheus()
+        self.assertIn("# TYPE calls_total counter", output)
+        self.assertIn('calls_total{provider="coingecko"} 1', output)
+        self.assertIn('latency_seconds_bucket{le="0.1"} 1', output)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 2', output)
+        self.assertIn("latency_seconds_count 2", output)
+
+    def test_json_output_and_reset(self):
+        """
+        Test the JSON snapshot and that reset clears recorded values.
+        """
+        self.registry.counter("calls_total").inc(3)
+        snapshot = json.loads(self.registry.dump("json"))
+        self.assertEqual(snapshot["counters"]["calls_total"], [{"labels": {}, "value": 3}])
+
+        self.registry.reset()
+        self.assertEqual(self.registry.counter("calls_total").value(), 0)
+
+    def test_rejects_unknown_format_and_type_clash(self):
+        """
+        Test that invalid dump formats and conflicting metric types are rejected.
+        """
+        self.registry.counter("calls_total")
+        with self.assertRaises(ValueError):
+            self.registry.histogram("calls_total")
+        with self.assertRaises(ValueError):
+            self.registry.dump("xml")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import time
+import unittest
+from unittest import mock
+from src import pipeline
+from src.pipeline import Pipeline, Stage, build_wallet_pipeline, stream_wallet
+from src.utils import price_fetcher
+from src.utils.cache_manager import CacheManager
+from src.utils.price_provider import CoinGeckoProvider
+
+def double(items):
+    for item in items:
+        yield item * 2
+
+def slow_increment(items):
+    for item in items:
+        time.sleep(0.001)
+        yield item + 1
+
+class TestPipeline(unittest.TestCase):
+    """
+    Unit tests for the generator pipeline and the streaming wallet pipeline.
+    """
+
+    def test_stages_run_in_order(self):
+        """
+        Test that items flow through every stage in order and timings are recorded per stage.
+        """
+        chain = Pipeline([Stage("double", double), Stage("increment", slow_increment)], buffer_size=4)
+        self.assertEqual(list(chain.run(range(50))), [i * 2 + 1 for i in range(50)])
+        self.assertEqual(set(chain.timings), {"double", "increment"})
+        self.assertGreater(chain.timings["increment"], chain.timings["double"])
+
+    def test_replace_stage(self):
+        """
+        Test that a stage can be swapped without changing the rest of the pipeline.
+        """
+        chain = Pipeline([Stage("double", double), Stage("increment", slow_increment)])
+        swapped = chain.replace("double", lambda items: (item * 10 for item in items))
+        self.assertEqual(list(swapped.run([1, 2])), [11, 21])
+        with self.assertRaises(ValueError):
+            chain.replace("missing", double)
+
+    def test_stage_errors_propagate(self):
+        """
+        Test that an exception in a stage is raised to the consumer.
+        """
+        def failing(items):
+            for item in items:
+                if item == 3:
+                    raise RuntimeError("boom")
+                yield item
+
+        chain = Pipeline([Stage("failing", failing), Stage("double", double)])
+        with self.assertRaises(RuntimeError):
+            list(chain.run(range(10)))
+
+    def test_buffers_are_bounded(self):
+        """
+        Test that an unconsumed pipeline does not read its whole input.
+        """
+        pulled = []
+
+        def source():
+            for i in range(10000):
+                pulled.append(i)
+                yield i
+
+        chain = Pipeline([Stage("double", double)], buffer_size=8)
+        stream = chain.run(source())
+        next(stream)
+        time.sleep(0.2)
+        stream.close()
+        self.assertLess(len(pulled), 100)
+
+    def test_stream_wallet(self):
+        """
+        Test the default wallet pipeline end to end against mocked RPC and price data.
+        """
+        entries = [
+            {"signature": f"sig{i}", "blockTime": 1672531200 + i, "token_symbol": "SOL", "amount": 2.0,
+             "purchase_time": 1640995200, "sell_time": 1672531200}
+            for i in range(30)
+        ]
+        prices = {"2022-01-01": 100.0, "2023-01-01": 150.0}
+
+        with mock.patch.object(pipeline, "iter_signatures", return_value=iter(entries)), \
+                mock.patch.object(price_fetcher, "cache_manager", CacheManager()), \
+                mock.patch.object(CoinGeckoProvider, "fetch_price", side_effect=lambda token, date: prices[date]):
+            wallet_pipeline = build_wallet_pipeline(0.25, 0.15, buffer_size=4, price_batch_size=7)
+            summary = stream_wallet("dummy_wallet", "https://dummy_rpc.solana.com", 0.25, 0.15,
+                                    pipeline=wallet_pipeline)
+
+        self.assertAlmostEqual(summary["total_profit"], 30 * 100.0)
+        self.assertAlmostEqual(summary["total_tax"], 30 * 100.0 * 0.15)
+        self.assertEqual(set(wallet_pipeline.timings), {"fetch", "parse", "price", "tax"})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,18 @@
 import unittest
 import logging
+import threading
+import time
+from collections import deque
+from unittest import mock
+import requests
+from src.utils import price_fetcher
 from src.utils.price_fetcher import fetch_historical_price
 from src.utils.cache_manager import CacheManager
+from src.utils.circuit_breaker import reset_breakers
+from src.utils.metrics import metrics
+from src.utils.price_provider import ProviderUnavailableError
+from src.utils.rate_limiter import AdaptiveRateLimiter
+from src.utils.price_series import PriceSeries
 
 logging.basicConfig(level=logging.INFO)
 
@@ -68,5 +79,256 @@ class TestPriceFetcher(unittest.TestCase):
             logging.error(f"Invalid timestamp test failed: {e}")
             self.fail(f"Invalid timestamp test encountered an exception: {e}")
 
+class TestPriceFetcherCoalescing(unittest.TestCase):
+    """
+    Unit tests for day-granular cache keys and in-flight request coalescing.
+    Providers are mocked so no network access is needed.
+    """
+
+    def setUp(self):
+        """
+        Give each test a fresh module-level cache.
+        """
+        patcher = mock.patch.object(price_fetcher, "cache_manager", CacheManager())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_same_day_timestamps_share_cache_entry(self):
+        """
+        Test that two trades on the same UTC day trigger a single provider call.
+        """
+        with mock.patch.object(price_fetcher.CoinGeckoProvider, "fetch_price", return_value=100.0) as provider:
+            first = fetch_historical_price("SOL", 1672531200 + 3600)
+            second = fetch_historical_price("SOL", 1672531200 + 7200)
+
+        self.assertEqual(first, 100.0)
+        self.assertEqual(second, 100.0)
+        provider.assert_called_once_with("SOL", "2023-01-01")
+
+    def test_missing_price_is_negatively_cached(self):
+        """
+        Test that a token-day no provider has data for is only requested once per negative TTL.
+        """
+        with mock.patch.object(price_fetcher.CoinGeckoProvider, "fetch_price", return_value=None) as provider:
+            for offset in range(3):
+                self.assertIsNone(fetch_historical_price("DEAD", 1672531200 + offset))
+
+        provider.assert_called_once_with("DEAD", "2023-01-01")
+        self.assertTrue(price_fetcher.cache_manager.is_price_missing(1672531200, "DEAD"))
+
+    def test_cache_requests_counted_once_per_lookup(self):
+        """
+        Test that each lookup counts exactly one cache hit, miss or negative hit.
+        """
+        metrics.reset()
+        cache_requests = metrics.counter("vertax_cache_requests_total")
+        prices = {"SOL": 100.0, "DEAD": None}
+        with mock.patch.object(price_fetcher.CoinGeckoProvider, "fetch_price",
+                               side_effect=lambda token_symbol, date: prices[token_symbol]):
+            for token_symbol in ("SOL", "SOL", "DEAD", "DEAD"):
+                fetch_historical_price(token_symbol, 1672531200)
+
+        self.assertEqual(cache_requests.value(result="miss"), 2)
+        self.assertEqual(cache_requests.value(result="hit"), 1)
+        self.assertEqual(cache_requests.value(result="negative_hit"), 1)
+
+    def test_provider_errors_are_not_negatively_cached(self):
+        """
+        Test that a lookup that failed with an exception is retried rather than remembered as missing.
+        """
+        with mock.patch.object(price_fetcher.CoinGeckoProvider, "fetch_price", side_effect=RuntimeError("down")), \
+                mock.patch.object(price_fetcher.CoinMarketCapProvider, "fetch_price", side_effect=RuntimeError("down")):
+            with self.assertRaises(RuntimeError):
+                fetch_historical_price("SOL", 1672531200)
+
+        self.assertFalse(price_fetcher.cache_manager.is_price_missing(1672531200, "SOL"))
+
+    def test_provider_outages_are_not_negatively_cached(self):
+        """
+        Test that a 503 or a timeout from both providers leaves no missing marker behind.
+        """
+        unavailable = mock.Mock(status_code=503, headers={})
+        unavailable.raise_for_status.side_effect = requests.exceptions.HTTPError(response=unavailable)
+        timed_out = mock.Mock()
+        timed_out.get.side_effect = requests.exceptions.Timeout("timed out")
+        for client in (mock.Mock(**{"get.return_value": unavailable}), timed_out):
+            reset_breakers()
+            with mock.patch("src.utils.price_provider.get_http_client", return_value=client), \
+                    mock.patch.object(price_fetcher.CoinGeckoProvider, "rate_limiter", None), \
+                    mock.patch.object(price_fetcher.CoinMarketCapProvider, "rate_limiter", None):
+                with self.assertRaises(ProviderUnavailableError):
+                    fetch_historical_price("SOL", 1672531200)
+
+            self.assertEqual(client.get.call_count, 2)
+            self.assertFalse(price_fetcher.cache_manager.is_price_missing(1672531200, "SOL"))
+        reset_breakers()
+
+    def test_concurrent_requests_are_coalesced(self):
+        """
+        Test that concurrent callers for the same token and day share one provider request.
+        """
+        def slow_price(token_symbol, date):
+            time.sleep(0.2)
+            return 100.0
+
+        results = []
+        with mock.patch.object(price_fetcher.CoinGeckoProvider, "fetch_price", side_effect=slow_price) as provider:
+            threads = [
+                threading.Thread(target=lambda: results.append(fetch_historical_price("SOL", 1672531200 + i)))
+                for i in range(5)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(results, [100.0] * 5)
+        self.assertEqual(provider.call_count, 1)
+
+    def test_prefetch_deduplicates_token_days(self):
+        """
+        Test that prefetching resolves each distinct token-day exactly once.
+        """
+        price_requests = [("SOL", 1672531200 + i * 600) for i in range(10)] + [("SOL", 1672617600), ("BTC", 1672531200)]
+        with mock.patch.object(price_fetcher.CoinGeckoProvider, "fetch_price", return_value=100.0) as provider:
+            prices = price_fetcher.prefetch_prices(price_requests, max_workers=4)
+
+        self.assertEqual(provider.call_count, 3)
+        self.assertEqual(prices[("SOL", 1672531200)], 100.0)
+        self.assertEqual(len(prices), 3)
+
+    def test_prefetch_range_mode_uses_one_request_per_token(self):
+        """
+        Test that range mode answers every day of the span from a single range download.
+        """
+        days = [1672531200 + i * 86400 for i in range(30)]
+        series = PriceSeries("SOL", [(day, 100.0 + i) for i, day in enumerate(days)])
+
+        with mock.patch.object(price_fetcher, "price_series", {}), \
+                mock.patch.object(price_fetcher.CoinGeckoProvider, "fetch_price_range", return_value=series) as range_provider, \
+                mock.patch.object(price_fetcher.CoinGeckoProvider, "fetch_price") as day_provider:
+            prices = price_fetcher.prefetch_prices([("SOL", day + 3600) for day in days], range_mode=True)
+
+        range_provider.assert_called_once_with("SOL", days[0], days[-1] + 86400)
+        day_provider.assert_not_called()
+        self.assertEqual(prices[("SOL", days[10])], 110.0)
+
+class TestHedgedRequests(unittest.TestCase):
+    """
+    Unit tests for racing CoinMarketCap against slow CoinGecko lookups.
+    """
+
+    def setUp(self):
+        """
+        Enable hedging with a fresh cache, latency window and metrics.
+        """
+        for name, value in (("cache_manager", CacheManager()), ("hedge_requests", True),
+                            ("_primary_latencies", deque(maxlen=price_fetcher.HEDGE_WINDOW_SIZE)),
+                            ("HEDGE_DEFAULT_DELAY", 0.05)):
+            patcher = mock.patch.object(price_fetcher, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        metrics.reset()
+
+    def _slow_price(self, price, delay):
+        def fetch(token_symbol, date):
+            time.sleep(delay)
+            return price
+        return fetch
+
+    def test_fast_primary_does_not_hedge(self):
+        """
+        Test that a primary answering within the threshold never triggers the secondary.
+        """
+        with mock.patch.object(price_fetcher.CoinGeckoProvider, "fetch_price", return_value=100.0), \
+                mock.patch.object(price_fetcher.CoinMarketCapProvider, "fetch_price") as secondary:
+            self.assertEqual(fetch_historical_price("SOL", 1672531200), 100.0)
+
+        secondary.assert_not_called()
+        self.assertEqual(price_fetcher.hedges_fired.value(), 0)
+
+    def test_slow_primary_loses_to_hedge(self):
+        """
+        Test that the secondary's answer is used when the primary exceeds the threshold.
+        """
+        with mock.patch.object(price_fetcher.CoinGeckoProvider, "fetch_price", side_effect=self._slow_price(100.0, 1.0)), \
+                mock.patch.object(price_fetcher.CoinMarketCapProvider, "fetch_price", return_value=101.0):
+            start = time.perf_counter()
+            price = fetch_historical_price("SOL", 1672531200)
+            elapsed = time.perf_counter() - start
+
+        self.assertEqual(price, 101.0)
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(price_fetcher.hedges_fired.value(), 1)
+        self.assertEqual(price_fetcher.hedge_wins.value(provider="coinmarketcap"), 1)
+
+    def test_primary_can_still_win_after_hedge(self):
+        """
+        Test that a late primary answer wins if it arrives before the hedge.
+        """
+        with mock.patch.object(price_fetcher.CoinGeckoProvider, "fetch_price", side_effect=self._slow_price(100.0, 0.1)), \
+                mock.patch.object(price_fetcher.CoinMarketCapProvider, "fetch_price", side_effect=self._slow_price(101.0, 1.0)):
+            price = fetch_historical_price("SOL", 1672531200)
+
+        self.assertEqual(price, 100.0)
+        self.assertEqual(price_fetcher.hedge_wins.value(provider="coingecko"), 1)
+
+    def test_failed_primary_hedges_immediately(self):
+        """
+        Test that a primary error fires the secondary without waiting for the threshold.
+        """
+        with mock.patch.object(price_fetcher.CoinGeckoProvider, "fetch_price", side_effect=RuntimeError("down")), \
+                mock.patch.object(price_fetcher.CoinMarketCapProvider, "fetch_price", return_value=99.0):
+            self.assertEqual(fetch_historical_price("SOL", 1672531200), 99.0)
+
+    def test_primary_queued_in_rate_limiter_does_not_hedge(self):
+        """
+        Test that time a lookup spends waiting for a CoinGecko rate limit slot does not trigger the hedge.
+        """
+        limiter = AdaptiveRateLimiter("coingecko", rate=5.0)
+        limiter.acquire()
+        response = mock.Mock(status_code=200)
+        response.json.return_value = {"market_data": {"current_price": {"usd": 100.0}}}
+        client = mock.Mock(**{"get.return_value": response})
+
+        reset_breakers()
+        self.addCleanup(reset_breakers)
+        with mock.patch.object(price_fetcher.CoinGeckoProvider, "rate_limiter", limiter), \
+                mock.patch("src.utils.price_provider.get_http_client", return_value=client), \
+                mock.patch.object(price_fetcher.CoinMarketCapProvider, "fetch_price") as secondary:
+            start = time.perf_counter()
+            price = fetch_historical_price("SOL", 1672531200)
+            elapsed = time.perf_counter() - start
+
+        self.assertEqual(price, 100.0)
+        self.assertGreater(elapsed, 0.1)
+        secondary.assert_not_called()
+        self.assertEqual(price_fetcher.hedges_fired.value(), 0)
+        self.assertLess(price_fetcher._primary_latencies[-1], 0.1)
+
+    def test_failures_do_not_lower_threshold(self):
+        """
+        Test that failed or empty CoinGecko lookups are not recorded as latencies.
+        """
+        price_fetcher._primary_latencies.extend(i / 100 for i in range(1, 101))
+        threshold = price_fetcher.hedge_delay()
+
+        failures = [RuntimeError("down"), ProviderUnavailableError("503"), None] * 10
+        with mock.patch.object(price_fetcher.CoinGeckoProvider, "fetch_price", side_effect=failures), \
+                mock.patch.object(price_fetcher.CoinMarketCapProvider, "fetch_price", return_value=99.0):
+            for day in range(len(failures)):
+                fetch_historical_price("SOL", 1672531200 + day * 86400)
+
+        self.assertEqual(len(price_fetcher._primary_latencies), 100)
+        self.assertEqual(price_fetcher.hedge_delay(), threshold)
+
+    def test_threshold_follows_observed_latency(self):
+        """
+        Test that the hedge delay is the configured percentile of recent primary latencies.
+        """
+        self.assertEqual(price_fetcher.hedge_delay(), 0.05)
+        price_fetcher._primary_latencies.extend(i / 100 for i in range(1, 101))
+        self.assertEqual(price_fetcher.hedge_delay(), 0.96)
+
 if __name__ == "__main__":
     unittest.main()
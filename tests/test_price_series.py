@@ -0,0 +1,41 @@
+import unittest
+from src.utils.price_series import PriceSeries
+
+class TestPriceSeries(unittest.TestCase):
+    """
+    Unit tests for the array-backed per-token price series.
+    """
+
+    def setUp(self):
+        """
+        Build a daily series for the first week of 2023.
+        """
+        self.start = 1672531200
+        self.series = PriceSeries("SOL", [(self.start + day * 86400, 10.0 + day) for day in range(7)])
+
+    def test_lookup_exact_and_nearest(self):
+        """
+        Test that lookups return the exact sample or the nearest one within tolerance.
+        """
+        self.assertEqual(self.series.lookup(self.start + 2 * 86400), 12.0)
+        self.assertEqual(self.series.lookup(self.start + 2 * 86400 + 3600), 12.0)
+        self.assertEqual(self.series.lookup(self.start + 3 * 86400 - 3600), 13.0)
+
+    def test_lookup_outside_tolerance(self):
+        """
+        Test that timestamps far from any sample return None.
+        """
+        self.assertIsNone(self.series.lookup(self.start - 5 * 86400))
+        self.assertFalse(self.series.covers(self.start + 30 * 86400))
+
+    def test_extend_merges_out_of_order_samples(self):
+        """
+        Test that merging earlier and overlapping samples keeps the series sorted.
+        """
+        self.series.extend([(self.start - 86400, 9.0), (self.start, 99.0)])
+        self.assertEqual(list(self.series.timestamps), sorted(self.series.timestamps))
+        self.assertEqual(len(self.series), 8)
+        self.assertEqual(self.series.lookup(self.start), 99.0)
+
+if __name__ == "__main__":
+    unittest.main()
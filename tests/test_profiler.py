@@ -0,0 +1,128 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from src import taxbot
+from src.utils.cache_manager import CacheManager
+from src.utils.price_provider import CoinGeckoProvider
+from src.utils.profiler import StageProfiler, profile_stage, profiling
+
+def _spin(seconds):
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += sum(range(100))
+    return total
+
+class TestProfiler(unittest.TestCase):
+    """
+    Unit tests for the stage-attributed sampling profiler.
+    """
+
+    def setUp(self):
+        """
+        Create a scratch directory for profile output.
+        """
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir)
+
+    def test_samples_are_attributed_to_stages(self):
+        """
+        Test that samples land in the stage marked on the calling thread.
+        """
+        with StageProfiler(interval=0.001) as profiler:
+            with profile_stage("tax"):
+                _spin(0.2)
+            with profile_stage("report"):
+                _spin(0.1)
+
+        totals = profiler.stage_totals()
+        self.assertGreater(totals["tax"], totals["report"])
+        self.assertGreater(totals["report"], 0)
+        self.assertTrue(any(line.startswith("tax;") and "_spin" in line
+                            for line in profiler.collapsed_stacks().splitlines()))
+
+    def test_worker_threads_are_attributed_by_name(self):
+        """
+        Test that fetcher and pipeline worker threads are attributed by thread name.
+        """
+        with StageProfiler(interval=0.001) as profiler:
+            workers = [threading.Thread(target=_spin, args=(0.1,), name=name)
+                       for name in ("price-prefetch_0", "pipeline-parse")]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+
+        totals = profiler.stage_totals()
+        self.assertGreater(totals["price"], 0)
+        self.assertGreater(totals["parse"], 0)
+
+    def test_finished_stage_falls_back_to_thread_name(self):
+        """
+        Test that a thread whose stage stack has emptied is attributed by name
+        (including the hedge workers) instead of breaking the sampler.
+        """
+        profiler = StageProfiler()
+        ident = threading.get_ident()
+        with profiler.stage("tax"):
+            self.assertEqual(profiler._stage_for(ident, "price-hedge_0"), "tax")
+        self.assertEqual(profiler.thread_stages[ident], [])
+        self.assertEqual(profiler._stage_for(ident, "price-hedge_0"), "price")
+        self.assertEqual(profiler._stage_for(ident, "MainThread"), "other")
+
+    def test_idle_threads_are_skipped(self):
+        """
+        Test that threads blocked on a lock contribute no samples.
+        """
+        event = threading.Event()
+        # A stage of its own, so busy worker threads left over from other tests cannot add samples to it
+        waiter = threading.Thread(target=event.wait, name="pipeline-idle")
+        with StageProfiler(interval=0.001) as profiler:
+            waiter.start()
+            time.sleep(0.1)
+            event.set()
+            waiter.join()
+        self.assertEqual(profiler.stage_totals()["idle"], 0)
+
+    def test_profiling_writes_output_files(self):
+        """
+        Test that profiling writes collapsed stacks and a top-N summary, and that nesting is a no-op.
+        """
+        prefix = os.path.join(self.output_dir, "run")
+        with profiling(prefix, interval=0.001) as profiler:
+            self.assertIsNotNone(profiler)
+            with profiling(os.path.join(self.output_dir, "nested")) as nested:
+                self.assertIsNone(nested)
+            with profile_stage("tax"):
+                _spin(0.05)
+
+        self.assertTrue(os.path.exists(f"{prefix}.collapsed"))
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, "nested.collapsed")))
+        with open(f"{prefix}.top.txt") as f:
+            summary = f.read()
+        self.assertIn("Samples by stage:", summary)
+        self.assertIn("_spin", summary)
+
+    def test_process_wallet_profile(self):
+        """
+        Test that process_wallet writes a profile when profile_output is set.
+        """
+        prefix = os.path.join(self.output_dir, "wallet")
+        transactions = [{"signature": "sig1", "token_symbol": "SOL", "amount": 1.0,
+                         "purchase_time": 1640995200, "sell_time": 1672531200}]
+        with mock.patch.object(taxbot.price_fetcher, "cache_manager", CacheManager()), \
+                mock.patch.object(taxbot, "fetch_transactions", return_value=transactions), \
+                mock.patch.object(CoinGeckoProvider, "fetch_price", return_value=100.0):
+            summary = taxbot.process_wallet("dummy_wallet", "https://dummy_rpc.solana.com", None, 0.25, 0.15,
+                                            profile_output=prefix)
+
+        self.assertEqual(summary["total_profit"], 0.0)
+        self.assertTrue(os.path.exists(f"{prefix}.collapsed"))
+        self.assertTrue(os.path.exists(f"{prefix}.top.txt"))
+
+if __name__ == "__main__":
+    unittest.main()
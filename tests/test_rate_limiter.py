@@ -0,0 +1,129 @@
+import unittest
+from unittest import mock
+from src.utils.price_provider import CoinGeckoProvider
+from src.utils.rate_limiter import AdaptiveRateLimiter, TokenBucket, parse_retry_after
+
+class FakeClock:
+    """
+    Manually advanced clock whose sleep just moves time forward.
+    """
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def _response(status_code, headers=None, payload=None):
+    response = mock.Mock(status_code=status_code, headers=headers or {})
+    response.json.return_value = payload or {}
+    return response
+
+class TestRateLimiter(unittest.TestCase):
+    """
+    Unit tests for the token bucket and the adaptive provider rate limiter.
+    """
+
+    def setUp(self):
+        """
+        Give each test a fresh fake clock.
+        """
+        self.clock = FakeClock()
+
+    def test_bucket_queues_at_rate(self):
+        """
+        Test that callers beyond the burst are spaced at the bucket rate instead of rejected.
+        """
+        bucket = TokenBucket(rate=2.0, capacity=2.0, clock=self.clock, sleep=self.clock.sleep)
+        waits = [bucket.reserve() for _ in range(5)]
+        self.assertEqual(waits, [0.0, 0.0, 0.5, 1.0, 1.5])
+
+    def test_bucket_pause(self):
+        """
+        Test that a pause drops the saved burst and delays the next token.
+        """
+        bucket = TokenBucket(rate=1.0, capacity=5.0, clock=self.clock, sleep=self.clock.sleep)
+        bucket.pause(10)
+        self.assertEqual(bucket.reserve(), 11.0)
+
+    def test_rate_adapts_to_429(self):
+        """
+        Test multiplicative decrease on 429 and gradual recovery up to the quota.
+        """
+        limiter = AdaptiveRateLimiter("test", rate=4.0, clock=self.clock, sleep=self.clock.sleep)
+        limiter.on_rate_limited()
+        self.assertEqual(limiter.rate, 2.0)
+
+        # A second 429 from a request already in flight does not halve again
+        limiter.on_rate_limited()
+        self.assertEqual(limiter.rate, 2.0)
+
+        for _ in range(100):
+            limiter.on_success()
+        self.assertEqual(limiter.rate, 4.0)
+
+    def test_request_honors_retry_after(self):
+        """
+        Test that a 429 is retried after the Retry-After delay rather than returned.
+        """
+        limiter = AdaptiveRateLimiter("test", rate=10.0, clock=self.clock, sleep=self.clock.sleep)
+        send = mock.Mock(side_effect=[_response(429, {"Retry-After": "30"}), _response(200)])
+
+        response = limiter.request(send)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(send.call_count, 2)
+        self.assertGreaterEqual(sum(self.clock.sleeps), 30)
+
+    def test_request_gives_up_after_max_retries(self):
+        """
+        Test that the last 429 is returned once retries run out.
+        """
+        limiter = AdaptiveRateLimiter("test", rate=10.0, max_retries=2, clock=self.clock, sleep=self.clock.sleep)
+        send = mock.Mock(return_value=_response(429))
+        self.assertEqual(limiter.request(send).status_code, 429)
+        self.assertEqual(send.call_count, 3)
+
+    def test_server_errors_do_not_recover_rate(self):
+        """
+        Test that 5xx responses are returned without raising the backed-off rate.
+        """
+        limiter = AdaptiveRateLimiter("test", rate=4.0, clock=self.clock, sleep=self.clock.sleep)
+        limiter.on_rate_limited()
+        for status_code in (500, 503, 504):
+            self.assertEqual(limiter.request(mock.Mock(return_value=_response(status_code))).status_code, status_code)
+        self.assertEqual(limiter.rate, 2.0)
+
+        limiter.request(mock.Mock(return_value=_response(404)))
+        self.assertGreater(limiter.rate, 2.0)
+
+    def test_parse_retry_after(self):
+        """
+        Test Retry-After parsing for seconds, HTTP dates and invalid values.
+        """
+        self.assertEqual(parse_retry_after("12"), 12.0)
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)
+        self.assertIsNone(parse_retry_after("soon"))
+        self.assertIsNone(parse_retry_after(None))
+
+    def test_provider_retries_rate_limited_request(self):
+        """
+        Test that CoinGecko lookups are queued through the limiter instead of failing on a 429.
+        """
+        limiter = AdaptiveRateLimiter("coingecko", rate=10.0, clock=self.clock, sleep=self.clock.sleep)
+        client = mock.Mock()
+        client.get.side_effect = [
+            _response(429, {"Retry-After": "1"}),
+            _response(200, payload={"market_data": {"current_price": {"usd": 101.5}}}),
+        ]
+        with mock.patch.object(CoinGeckoProvider, "rate_limiter", limiter):
+            price = CoinGeckoProvider.fetch_price("solana", "2023-01-01", http_client=client)
+        self.assertEqual(price, 101.5)
+        self.assertEqual(client.get.call_count, 2)
+
+if __name__ == "__main__":
+    unittest.main()
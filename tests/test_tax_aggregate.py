@@ -0,0 +1,83 @@
+import json
+import random
+import unittest
+from datetime import datetime, timedelta
+from src.utils.tax_aggregate import TaxAggregate, reduce_aggregates
+from src.utils.tax_rules import aggregate_tax_data, aggregate_tax_data_sharded
+
+def _transactions(count, seed=0):
+    rng = random.Random(seed)
+    start = datetime(2021, 1, 1)
+    transactions = []
+    for _ in range(count):
+        purchase_date = start + timedelta(days=rng.randrange(700))
+        transactions.append({
+            "token_symbol": rng.choice(["SOL", "BTC", "ETH"]),
+            "purchase_date": purchase_date,
+            "sell_date": purchase_date + timedelta(days=rng.randrange(800)),
+            "profit": rng.uniform(-1000, 1000),
+        })
+    return transactions
+
+class TestTaxAggregate(unittest.TestCase):
+    """
+    Unit tests for mergeable tax aggregates.
+    """
+
+    def setUp(self):
+        """
+        Build a random history and its aggregate from one sequential pass.
+        """
+        self.transactions = _transactions(600)
+        self.sequential = aggregate_tax_data(self.transactions)
+
+    def test_breakdowns_add_up(self):
+        """
+        Test that the per-token, per-year and short/long breakdowns each cover every trade.
+        """
+        summary = self.sequential.to_dict()
+        self.assertEqual(summary["count"], 600)
+        for breakdown in (summary["by_token"].values(), summary["by_year"].values(),
+                          (summary["short_term"], summary["long_term"])):
+            self.assertEqual(sum(bucket["count"] for bucket in breakdown), 600)
+            self.assertAlmostEqual(sum(bucket["tax"] for bucket in breakdown), summary["total_tax"], places=6)
+
+    def test_sharded_merge_matches_sequential(self):
+        """
+        Test that merging shard aggregates in any order and grouping gives exactly the sequential result.
+        """
+        shards = [self.transactions[i:i + 70] for i in range(0, len(self.transactions), 70)]
+        partials = [aggregate_tax_data(shard) for shard in shards]
+        random.Random(1).shuffle(partials)
+
+        merged = reduce_aggregates(partials)
+        nested = reduce_aggregates(partials[:3]) + reduce_aggregates(partials[3:])
+        self.assertEqual(merged.to_dict(), self.sequential.to_dict())
+        self.assertEqual(nested.to_dict(), self.sequential.to_dict())
+
+    def test_state_round_trip(self):
+        """
+        Test that an aggregate shipped as JSON state merges without losing precision.
+        """
+        first = aggregate_tax_data(self.transactions[:300])
+        second = aggregate_tax_data(self.transactions[300:])
+        restored = TaxAggregate.from_state(json.loads(json.dumps(first.to_state())))
+        self.assertEqual((restored + second).to_dict(), self.sequential.to_dict())
+
+    def test_sharded_processes(self):
+        """
+        Test that aggregating shards in worker processes gives the sequential result.
+        """
+        shards = [self.transactions[i::4] for i in range(4)]
+        merged = aggregate_tax_data_sharded(shards, max_workers=2)
+        self.assertEqual(merged.to_dict(), self.sequential.to_dict())
+
+    def test_filters_apply_per_shard(self):
+        """
+        Test that tax-year filtering is applied before aggregation.
+        """
+        aggregate = aggregate_tax_data(self.transactions, tax_year=2022)
+        self.assertEqual(set(aggregate.by_year), {2022})
+
+if __name__ == "__main__":
+    unittest.main()
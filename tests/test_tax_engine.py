@@ -0,0 +1,105 @@
+import os
+import random
+import time
+import unittest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from src.utils.tax_engine import calculate_tax_data_vectorized, tax_totals_from_prices
+from src.utils.cost_basis import RealizedGain
+from src.utils.tax_rules import calculate_tax_data, calculate_trade_tax
+
+class TestTaxEngine(unittest.TestCase):
+    """
+    Unit tests checking the columnar tax engine against the scalar path.
+    """
+
+    def setUp(self):
+        """
+        Generate a reproducible set of transactions spanning two years.
+        """
+        rng = random.Random(42)
+        start = datetime(2022, 1, 1)
+        self.transactions = []
+        for _ in range(500):
+            purchase_date = start + timedelta(seconds=rng.randrange(0, 400 * 86400))
+            sell_date = purchase_date + timedelta(seconds=rng.randrange(0, 500 * 86400))
+            self.transactions.append({
+                'purchase_date': purchase_date,
+                'sell_date': sell_date,
+                'profit': rng.uniform(-1000, 5000),
+            })
+
+    def test_matches_scalar_totals(self):
+        """
+        Test that vectorized totals are identical to calculate_tax_data.
+        """
+        self.assertEqual(calculate_tax_data_vectorized(self.transactions), calculate_tax_data(self.transactions))
+
+    def test_matches_scalar_totals_with_filters(self):
+        """
+        Test that date range and tax year filters select the same rows as the scalar path.
+        """
+        date_range = (datetime(2023, 1, 1), datetime(2023, 12, 31))
+        self.assertEqual(calculate_tax_data_vectorized(self.transactions, date_range, 2023),
+                         calculate_tax_data(self.transactions, date_range, 2023))
+
+    def test_invalid_rows_are_skipped(self):
+        """
+        Test that non-numeric profits and negative holding periods are skipped like in the scalar path.
+        """
+        transactions = self.transactions[:10] + [
+            {'purchase_date': datetime(2023, 1, 10), 'sell_date': datetime(2023, 8, 10), 'profit': None},
+            {'purchase_date': datetime(2023, 8, 10), 'sell_date': datetime(2023, 1, 10), 'profit': 100.0},
+            {'purchase_date': datetime(2023, 1, 10), 'sell_date': datetime(2023, 8, 10), 'profit': "5000"},
+            {'purchase_date': datetime(2023, 1, 10), 'sell_date': datetime(2023, 8, 10), 'profit': Decimal("5000")},
+            {'purchase_date': datetime(2023, 1, 10), 'sell_date': datetime(2023, 8, 10), 'profit': True},
+            {'purchase_date': "2023-01-10", 'sell_date': datetime(2023, 8, 10), 'profit': 5000.0},
+        ]
+        self.assertEqual(calculate_tax_data_vectorized(transactions), calculate_tax_data(transactions))
+        self.assertEqual(calculate_tax_data_vectorized(transactions[10:]), calculate_tax_data(transactions[10:]))
+        self.assertEqual(calculate_tax_data_vectorized(transactions[-4:-3]), {'total_profits': 0, 'total_tax': 0})
+
+    def test_tax_totals_from_prices(self):
+        """
+        Test profit and short/long classification for trades given as timestamps and prices.
+        """
+        day = 86400
+        totals = tax_totals_from_prices(
+            purchase_times=[0, 0, 10 * day, float('nan')],
+            sell_times=[364 * day, 365 * day, 0, day],
+            purchase_prices=[10.0, 10.0, 10.0, 10.0],
+            sell_prices=[20.0, 20.0, 20.0, 20.0],
+            amounts=[1.0, 2.0, 1.0, 1.0],
+            short_term_rate=0.3,
+            long_term_rate=0.1,
+        )
+        self.assertAlmostEqual(totals["total_profit"], 30.0)
+        self.assertAlmostEqual(totals["total_tax"], 10.0 * 0.3 + 20.0 * 0.1)
+        self.assertEqual(totals["skipped"], 2)
+
+    def test_holding_period_ignores_daylight_saving(self):
+        """
+        Test that the scalar, vectorized and cost-basis paths agree on a year that ends after a DST change.
+        """
+        original_tz = os.environ.get("TZ")
+        os.environ["TZ"] = "America/New_York"
+        time.tzset()
+        self.addCleanup(time.tzset)
+        if original_tz is None:
+            self.addCleanup(os.environ.pop, "TZ", None)
+        else:
+            self.addCleanup(os.environ.__setitem__, "TZ", original_tz)
+
+        # 2022-11-05 12:00 UTC (EDT) to 2023-11-05 12:00 UTC (EST): exactly 365 days
+        purchase_time, sell_time = 1667649600, 1667649600 + 365 * 86400
+        _, tax = calculate_trade_tax(purchase_time, sell_time, 100.0, 200.0, 1.0, 0.3, 0.1)
+        totals = tax_totals_from_prices([purchase_time], [sell_time], [100.0], [200.0], [1.0], 0.3, 0.1)
+        gain = RealizedGain("SOL", 1.0, purchase_time, sell_time, 100.0, 200.0)
+
+        self.assertAlmostEqual(tax, 10.0)
+        self.assertEqual(totals["total_tax"], tax)
+        self.assertEqual(gain.tax(0.3, 0.1), tax)
+        self.assertEqual((gain.sell_date - gain.purchase_date).days, gain.holding_period)
+
+if __name__ == "__main__":
+    unittest.main()
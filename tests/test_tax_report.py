@@ -1,8 +1,21 @@
+import csv
+import os
+import shutil
+import tempfile
 import unittest
 from datetime import datetime
-from src.utils.tax_report import generate_tax_report, save_report
+from functools import partial
+from unittest import mock
+from src.utils.cost_basis import match_lots
+from src.utils.tax_report import (LedgerPDF, generate_tax_report, ledger_rows, render_ledger_pdf,
+                                  render_ledger_pdfs, save_ledger, save_report)
 from src.utils.tax_rules import calculate_tax_data
 
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
 class TestTaxReport(unittest.TestCase):
     
     def setUp(self):
@@ -109,5 +122,145 @@ class TestTaxReport(unittest.TestCase):
         self.assertGreaterEqual(tax_data['total_profits'], 0)
         self.assertGreaterEqual(tax_data['total_tax'], 0)
 
+def _wallet_rows(count):
+    start = 1640995200
+    fills = []
+    for day in range(count):
+        fills.append({"side": "buy", "token_symbol": "SOL", "amount": 1.0, "price": 10.0,
+                      "timestamp": start + day * 86400})
+        fills.append({"side": "sell", "token_symbol": "SOL", "amount": 1.0, "price": 12.0,
+                      "timestamp": start + day * 86400})
+    return ledger_rows(match_lots(fills, "fifo"), short_term_rate=0.3, long_term_rate=0.1)
+
+class TestLedgerExport(unittest.TestCase):
+    """
+    Unit tests for the streaming per-transaction ledger export.
+    """
+
+    def setUp(self):
+        """
+        Build a lazy stream of realized gains and a temporary output directory.
+        """
+        self.tmp_dir = tempfile.mkdtemp()
+        self.file_name = os.path.join(self.tmp_dir, "ledger")
+        self.addCleanup(shutil.rmtree, self.tmp_dir, True)
+        start = 1640995200
+        self.fills = [{"side": "buy", "token_symbol": "SOL", "amount": 1.0, "price": 10.0, "timestamp": start}]
+        for day in range(1, 1001):
+            self.fills.append({"side": "buy", "token_symbol": "SOL", "amount": 1.0, "price": 10.0 + day,
+                               "timestamp": start + day * 86400})
+            self.fills.append({"side": "sell", "token_symbol": "SOL", "amount": 1.0, "price": 20.0 + day,
+                               "timestamp": start + day * 86400})
+
+    def _rows(self):
+        return ledger_rows(match_lots(iter(self.fills), "fifo"), short_term_rate=0.3, long_term_rate=0.1)
+
+    def test_csv_ledger_has_one_row_per_gain(self):
+        """
+        Test that the CSV ledger is written row by row from a generator, with a tax column.
+        """
+        self.assertEqual(save_ledger(self._rows(), 'csv', self.file_name), 1000)
+
+        with open(f"{self.file_name}.csv", newline='', encoding='utf-8') as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual(len(rows), 1000)
+        self.assertEqual(rows[0]["token_symbol"], "SOL")
+        self.assertAlmostEqual(float(rows[0]["profit"]), 11.0)
+        self.assertAlmostEqual(float(rows[0]["tax"]), 3.3)
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_parquet_ledger(self):
+        """
+        Test that the Parquet ledger is written in several record batches and reads back completely.
+        """
+        from src.utils.tax_report import write_ledger_columnar
+        import pyarrow.parquet as pq
+
+        self.assertEqual(write_ledger_columnar(self._rows(), self.file_name, batch_size=256), 1000)
+        table = pq.read_table(f"{self.file_name}.parquet")
+        self.assertEqual(table.num_rows, 1000)
+        self.assertEqual(table.column("holding_period").to_pylist()[:2], [1, 1])
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_arrow_ledger(self):
+        """
+        Test that the Arrow IPC ledger reads back with the ledger schema.
+        """
+        import pyarrow.ipc
+
+        save_ledger(self._rows(), 'arrow', self.file_name)
+        with pyarrow.ipc.open_file(f"{self.file_name}.arrow") as reader:
+            table = reader.read_all()
+        self.assertEqual(table.num_rows, 1000)
+        self.assertEqual(str(table.schema.field("sell_date").type), "timestamp[s]")
+
+    def test_pdf_ledger_is_split_into_parts(self):
+        """
+        Test that a ledger longer than rows_per_file is rendered into several PDF files.
+        """
+        paths = render_ledger_pdf(self._rows(), self.file_name, rows_per_file=400)
+        self.assertEqual(paths, [f"{self.file_name}_part{part}.pdf" for part in (1, 2, 3)])
+        for path in paths:
+            with open(path, 'rb') as file:
+                self.assertTrue(file.read().startswith(b'%PDF'))
+
+    def test_pdf_ledger_parts_carry_running_total(self):
+        """
+        Test that each part ends with its own subtotal and the total carried through it.
+        """
+        summary_rows = []
+        add_row = LedgerPDF.add_row
+
+        def record(pdf, row, style=''):
+            if style:
+                summary_rows.append((row["token_symbol"], row["profit"]))
+            add_row(pdf, row, style)
+
+        with mock.patch.object(LedgerPDF, "add_row", autospec=True, side_effect=record):
+            render_ledger_pdf(self._rows(), self.file_name, rows_per_file=400)
+
+        profits = [row["profit"] for row in self._rows()]
+        part_profits = [sum(profits[first:first + 400]) for first in (0, 400, 800)]
+        self.assertEqual([label for label, _ in summary_rows],
+                         ["Subtotal", "Total to date", "Subtotal", "Total to date", "Subtotal", "Total"])
+        self.assertEqual([profit for label, profit in summary_rows if label == "Subtotal"], part_profits)
+        self.assertEqual(summary_rows[-1][1], sum(part_profits))
+
+    def test_pdf_ledger_single_file(self):
+        """
+        Test that a ledger that fits in one file keeps the plain file name.
+        """
+        self.assertEqual(render_ledger_pdf(self._rows(), self.file_name, rows_per_file=1000),
+                         [f"{self.file_name}.pdf"])
+
+    def test_render_ledger_pdfs_in_parallel(self):
+        """
+        Test that ledgers for several wallets are rendered by worker processes.
+        """
+        rows = list(self._rows())[:50]
+        jobs = [(rows, os.path.join(self.tmp_dir, f"wallet{i}"), f"Wallet {i}") for i in range(3)]
+        paths = render_ledger_pdfs(jobs, max_workers=2)
+        self.assertEqual(sorted(paths), sorted(name for _, name, _ in jobs))
+        for file_paths in paths.values():
+            self.assertTrue(os.path.exists(file_paths[0]))
+
+    def test_render_ledger_pdfs_from_row_factories(self):
+        """
+        Test that jobs can pass a callable so each worker produces its rows lazily.
+        """
+        jobs = [(partial(_wallet_rows, 30 + i), os.path.join(self.tmp_dir, f"lazy{i}"), f"Wallet {i}")
+                for i in range(2)]
+        paths = render_ledger_pdfs(jobs, max_workers=2)
+        for _, name, _ in jobs:
+            self.assertEqual(paths[name], [f"{name}.pdf"])
+            self.assertTrue(os.path.exists(paths[name][0]))
+
+    def test_invalid_ledger_type(self):
+        """
+        Test that an unknown ledger format is rejected.
+        """
+        with self.assertRaises(ValueError):
+            save_ledger([], 'xlsx', self.file_name)
+
 if __name__ == "__main__":
     unittest.main()
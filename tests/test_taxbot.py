@@ -1,6 +1,15 @@
+import os
+import shutil
+import tempfile
 import unittest
 import logging
-from src.taxbot import process_wallet
+from unittest import mock
+from src import taxbot
+from src.taxbot import process_wallet, process_wallets
+from src.utils import price_fetcher
+from src.utils.cache_manager import CacheManager
+from src.utils.checkpoint import CheckpointStore
+from src.utils.price_provider import CoinGeckoProvider
 
 logging.basicConfig(level=logging.INFO)
 
@@ -9,6 +18,14 @@ class TestTaxBot(unittest.TestCase):
     Unit tests for the process_wallet function in taxbot module.
     """
 
+    def setUp(self):
+        """
+        Give each test a fresh module-level price cache.
+        """
+        patcher = mock.patch.object(taxbot.price_fetcher, "cache_manager", CacheManager())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
     def test_process_wallet_valid_data(self):
         """
         Test processing a wallet with valid data.
@@ -86,5 +103,191 @@ class TestTaxBot(unittest.TestCase):
             logging.error(f"Unreachable RPC test failed: {e}")
             self.fail(f"Unreachable RPC test encountered an exception: {e}")
 
+    def test_process_wallet_prefetches_unique_token_days(self):
+        """
+        Test that prices are fetched once per distinct token-day, not once per transaction.
+        """
+        transactions = [
+            {"signature": f"sig{i}", "token_symbol": "SOL", "amount": 1.0,
+             "purchase_time": 1640995200 + i * 60, "sell_time": 1672531200 + i * 60}
+            for i in range(20)
+        ]
+        prices = {"2022-01-01": 100.0, "2023-01-01": 150.0}
+
+        with mock.patch.object(taxbot, "fetch_transactions", return_value=transactions), \
+                mock.patch.object(CoinGeckoProvider, "fetch_price", side_effect=lambda token, date: prices[date]) as provider:
+            result = process_wallet("dummy_wallet", "https://dummy_rpc.solana.com", None, 0.25, 0.15)
+
+        self.assertEqual(provider.call_count, 2)
+        self.assertAlmostEqual(result["total_profit"], 20 * 50.0)
+        self.assertAlmostEqual(result["total_tax"], 20 * 50.0 * 0.15)
+
+    def test_process_wallets_shares_price_cache(self):
+        """
+        Test that wallets processed in parallel reuse prices fetched for each other.
+        """
+        def wallet_transactions(wallet_address, rpc_url, **kwargs):
+            return [{"signature": f"{wallet_address}-sig", "token_symbol": "BONK", "amount": 2.0,
+                     "purchase_time": 1640995200, "sell_time": 1672531200}]
+        prices = {"2022-01-01": 1.0, "2023-01-01": 3.0}
+
+        with mock.patch.object(taxbot, "fetch_transactions", side_effect=wallet_transactions), \
+                mock.patch.object(CoinGeckoProvider, "fetch_price", side_effect=lambda token, date: prices[date]) as provider:
+            result = process_wallets([f"wallet{i}" for i in range(6)], "https://dummy_rpc.solana.com", None,
+                                     0.25, 0.15, max_workers=3)
+
+        self.assertEqual(provider.call_count, 2)
+        self.assertEqual(len(result["wallets"]), 6)
+        self.assertAlmostEqual(result["wallets"]["wallet0"]["total_profit"], 4.0)
+        self.assertAlmostEqual(result["stats"]["total_profit"], 24.0)
+        self.assertEqual(result["stats"]["wallets"], 6)
+
+    def test_process_wallet_incremental_from_checkpoint(self):
+        """
+        Test that a second run only fetches transactions newer than the checkpoint and keeps running totals.
+        """
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir, ignore_errors=True)
+        store = CheckpointStore(os.path.join(tmp_dir, "checkpoints.sqlite3"))
+
+        def transaction(signature, slot):
+            return {"signature": signature, "slot": slot, "token_symbol": "SOL", "amount": 1.0,
+                    "purchase_time": 1640995200, "sell_time": 1672531200}
+        prices = {"2022-01-01": 100.0, "2023-01-01": 150.0}
+        first_run = [transaction("sig2", 2), transaction("sig1", 1)]
+        second_run = [transaction("sig3", 3)]
+
+        with mock.patch.object(CoinGeckoProvider, "fetch_price", side_effect=lambda token, date: prices[date]):
+            with mock.patch.object(taxbot, "fetch_transactions", return_value=first_run):
+                process_wallet("checkpoint_wallet", "https://dummy_rpc.solana.com", None, 0.25, 0.15,
+                               checkpoint_store=store)
+            with mock.patch.object(taxbot, "fetch_transactions", return_value=second_run) as fetch:
+                result = process_wallet("checkpoint_wallet", "https://dummy_rpc.solana.com", None, 0.25, 0.15,
+                                        checkpoint_store=store)
+
+        fetch.assert_called_once_with("checkpoint_wallet", "https://dummy_rpc.solana.com", until="sig2")
+        self.assertAlmostEqual(result["total_profit"], 150.0)
+        self.assertEqual(store.load("checkpoint_wallet")["last_signature"], "sig3")
+
+    def test_process_wallets_resumes_from_checkpoints_in_processes(self):
+        """
+        Test that process workers share the checkpoint store and a second run only adds new transactions.
+        """
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir, ignore_errors=True)
+        store = CheckpointStore(os.path.join(tmp_dir, "checkpoints.sqlite3"))
+        history = {}
+
+        def wallet_transactions(wallet_address, rpc_url, until=None):
+            transactions = []
+            for signature in history[wallet_address]:
+                if signature == until:
+                    break
+                transactions.append({"signature": signature, "slot": int(signature[-1]), "token_symbol": "SOL",
+                                     "amount": 1.0, "purchase_time": 1640995200, "sell_time": 1672531200})
+            return transactions
+        prices = {"2022-01-01": 100.0, "2023-01-01": 150.0}
+        wallets = ["a", "b"]
+
+        with mock.patch.object(taxbot, "fetch_transactions", side_effect=wallet_transactions), \
+                mock.patch.object(CoinGeckoProvider, "fetch_price", side_effect=lambda token, date: prices[date]):
+            history.update({wallet: ["sig2", "sig1"] for wallet in wallets})
+            process_wallets(wallets, "https://dummy_rpc.solana.com", None, 0.25, 0.15, max_workers=2,
+                            use_processes=True, cache_path=os.path.join(tmp_dir, "prices.sqlite3"),
+                            checkpoint_store=store)
+            history["a"] = ["sig3", "sig2", "sig1"]
+            result = process_wallets(wallets, "https://dummy_rpc.solana.com", None, 0.25, 0.15, max_workers=2,
+                                     use_processes=True, cache_path=os.path.join(tmp_dir, "prices.sqlite3"),
+                                     checkpoint_store=store)
+
+        self.assertAlmostEqual(result["wallets"]["a"]["total_profit"], 150.0)
+        self.assertAlmostEqual(result["wallets"]["b"]["total_profit"], 100.0)
+        self.assertEqual(store.load("a")["last_signature"], "sig3")
+        self.assertEqual(store.load("b")["last_signature"], "sig2")
+
+    def test_checkpoint_stops_before_unpriced_transactions(self):
+        """
+        Test that the checkpoint does not advance past a transaction skipped for missing prices.
+        """
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir, ignore_errors=True)
+        store = CheckpointStore(os.path.join(tmp_dir, "checkpoints.sqlite3"))
+
+        def transaction(signature, slot, token_symbol="SOL"):
+            return {"signature": signature, "slot": slot, "token_symbol": token_symbol, "amount": 1.0,
+                    "purchase_time": 1640995200, "sell_time": 1672531200}
+        sol_prices = {("SOL", 1640995200): 100.0, ("SOL", 1672531200): 150.0}
+        transactions = [transaction("s3", 3), transaction("s2", 2, "DEAD"), transaction("s1", 1)]
+
+        with mock.patch.object(taxbot, "fetch_transactions", return_value=transactions), \
+                mock.patch.object(taxbot, "prefetch_prices", return_value={}):
+            result = process_wallet("gap_wallet", "https://dummy_rpc.solana.com", None, 0.25, 0.15,
+                                    checkpoint_store=store)
+        self.assertEqual(result["total_profit"], 0)
+        self.assertIsNone(store.load("gap_wallet"))
+
+        for vectorized in (False, True):
+            with mock.patch.object(taxbot, "fetch_transactions", return_value=transactions), \
+                    mock.patch.object(taxbot, "prefetch_prices", return_value=sol_prices):
+                result = process_wallet("gap_wallet", "https://dummy_rpc.solana.com", None, 0.25, 0.15,
+                                        checkpoint_store=store, vectorized=vectorized)
+            self.assertAlmostEqual(result["total_profit"], 100.0)
+            checkpoint = store.load("gap_wallet")
+            self.assertEqual(checkpoint["last_signature"], "s1")
+            self.assertAlmostEqual(checkpoint["total_profit"], 50.0)
+            store.delete("gap_wallet")
+
+    def test_worker_process_cache_is_the_shared_one(self):
+        """
+        Test that a process worker's on-disk cache replaces the cache every price lookup uses.
+        """
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir, ignore_errors=True)
+        taxbot._init_wallet_process(os.path.join(tmp_dir, "prices.sqlite3"))
+
+        self.assertIs(taxbot.price_fetcher, price_fetcher)
+        self.assertEqual(price_fetcher.cache_manager.backend, "sqlite")
+
+    def test_process_wallet_vectorized_matches_scalar(self):
+        """
+        Test that the vectorized engine produces the same totals as the row-by-row loop.
+        """
+        transactions = [
+            {"signature": f"sig{i}", "token_symbol": "SOL", "amount": 0.5 + i,
+             "purchase_time": 1640995200 + i * 86400, "sell_time": 1640995200 + (i * 7 + 200) * 86400}
+            for i in range(60)
+        ] + [{"signature": "no_times", "token_symbol": "SOL"}]
+
+        with mock.patch.object(taxbot, "fetch_transactions", return_value=transactions), \
+                mock.patch.object(CoinGeckoProvider, "fetch_price", side_effect=lambda token, date: float(date[-2:]) + 1):
+            scalar = process_wallet("dummy_wallet", "https://dummy_rpc.solana.com", None, 0.25, 0.15)
+            vectorized = process_wallet("dummy_wallet", "https://dummy_rpc.solana.com", None, 0.25, 0.15,
+                                        vectorized=True)
+
+        self.assertEqual(scalar, vectorized)
+
+    def test_process_wallet_dumps_metrics(self):
+        """
+        Test that process_wallet writes a metrics snapshot covering the cache, providers and stages.
+        """
+        transactions = [{"signature": "sig1", "token_symbol": "SOL", "amount": 1.0,
+                         "purchase_time": 1640995200, "sell_time": 1672531200}]
+        metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, metrics_dir)
+        metrics_path = os.path.join(metrics_dir, "metrics.prom")
+        taxbot.metrics.reset()
+
+        with mock.patch.object(taxbot, "fetch_transactions", return_value=transactions), \
+                mock.patch.object(CoinGeckoProvider, "fetch_price", return_value=100.0):
+            process_wallet("dummy_wallet", "https://dummy_rpc.solana.com", None, 0.25, 0.15,
+                           metrics_format="prometheus", metrics_path=metrics_path)
+
+        with open(metrics_path) as f:
+            output = f.read()
+        self.assertIn('vertax_provider_calls_total{outcome="ok",provider="coingecko"} 2', output)
+        self.assertIn('vertax_cache_requests_total{result="miss"}', output)
+        self.assertIn('vertax_stage_seconds_count{stage="tax"} 1', output)
+        self.assertIn("vertax_wallet_seconds_count 1", output)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,98 @@
+import os
+import time
+import unittest
+from datetime import datetime
+from src.utils.transaction_parser import parse_solana_tx
+from src.utils.transaction_record import TransactionRecord
+
+class TestTransactionRecord(unittest.TestCase):
+    """
+    Unit tests for the slotted transaction record.
+    """
+
+    def setUp(self):
+        """
+        Raw transaction containing both normal and sensitive fields.
+        """
+        self.raw_tx = {
+            "signature": "abc123",
+            "slot": 42,
+            "blockTime": 1672531200,
+            "instructions": [{"programId": "11111111111111111111111111111111"}],
+            "wallet_address": "So1anaWa11et",
+            "private_key": "secret",
+            "user_id": "user-1",
+            "purchase_time": 1640995200,
+            "sell_time": 1672531200,
+        }
+
+    def test_from_raw_drops_sensitive_fields(self):
+        """
+        Test that sensitive fields never make it into the record.
+        """
+        record = TransactionRecord.from_raw(self.raw_tx)
+        self.assertEqual(record.signature, "abc123")
+        self.assertEqual(record.slot, 42)
+        for field in ("wallet_address", "private_key", "user_id"):
+            self.assertNotIn(field, record)
+            self.assertNotIn(field, record.to_dict())
+
+    def test_has_no_instance_dict(self):
+        """
+        Test that records are slotted and reject unknown attributes.
+        """
+        record = TransactionRecord.from_raw(self.raw_tx)
+        self.assertFalse(hasattr(record, "__dict__"))
+        with self.assertRaises(AttributeError):
+            record.wallet_address = "So1anaWa11et"
+
+    def test_mapping_access(self):
+        """
+        Test that dict-style reads keep working for existing callers.
+        """
+        record = TransactionRecord.from_raw(self.raw_tx)
+        self.assertEqual(record["signature"], "abc123")
+        self.assertEqual(record.get("token_symbol"), "SOL")
+        self.assertEqual(record.get("amount"), 1.0)
+        self.assertIsNone(record.get("private_key"))
+        with self.assertRaises(KeyError):
+            record["private_key"]
+
+    def test_derived_dates(self):
+        """
+        Test that dates are derived from the stored timestamps.
+        """
+        record = TransactionRecord.from_raw(self.raw_tx)
+        self.assertEqual(record.transaction_date, datetime(2023, 1, 1))
+        self.assertEqual(record["purchase_date"], datetime(2022, 1, 1))
+        self.assertIsNone(TransactionRecord(signature="def456").sell_date)
+
+    def test_dates_are_utc(self):
+        """
+        Test that dates do not depend on the local time zone, so a holding period that
+        ends after a DST change is still a whole number of days.
+        """
+        original_tz = os.environ.get("TZ")
+        os.environ["TZ"] = "America/New_York"
+        time.tzset()
+        self.addCleanup(time.tzset)
+        if original_tz is None:
+            self.addCleanup(os.environ.pop, "TZ", None)
+        else:
+            self.addCleanup(os.environ.__setitem__, "TZ", original_tz)
+
+        record = TransactionRecord(purchase_time=1667649600, sell_time=1667649600 + 365 * 86400)
+        self.assertEqual(record.purchase_date, datetime(2022, 11, 5, 12))
+        self.assertEqual((record.sell_date - record.purchase_date).days, 365)
+
+    def test_parser_returns_record(self):
+        """
+        Test that the parser returns a record with the tax fields filled in.
+        """
+        record = parse_solana_tx(self.raw_tx, purchase_date=datetime(2022, 1, 1))
+        self.assertIsInstance(record, TransactionRecord)
+        self.assertEqual(record.holding_period, 365)
+        self.assertIsNotNone(record.tax_liability)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from cryptography.fernet import Fernet
+from src.utils.checkpoint import CheckpointStore
+from src.utils.privacy import TransactionSecurity
+
+class TestTransactionSecurityBatch(unittest.TestCase):
+    """
+    Unit tests for batch encryption, cached ciphers and key rotation.
+    """
+
+    def setUp(self):
+        """
+        Create keys and a batch of transactions with sensitive fields.
+        """
+        self.old_key = Fernet.generate_key()
+        self.new_key = Fernet.generate_key()
+        self.transactions = [
+            {"signature": f"sig{i}", "wallet_address": f"wallet{i}", "private_key": f"secret{i}", "amount": i}
+            for i in range(50)
+        ]
+
+    def test_batch_round_trip(self):
+        """
+        Test that a batch decrypts back to the original transactions and the inputs are not modified.
+        """
+        encrypted = TransactionSecurity.encrypt_batch(self.transactions, self.old_key)
+        self.assertNotEqual(encrypted[0]["wallet_address"], "wallet0")
+        self.assertEqual(encrypted[0]["signature"], "sig0")
+        self.assertEqual(self.transactions[0]["wallet_address"], "wallet0")
+        self.assertEqual(TransactionSecurity.decrypt_batch(encrypted, self.old_key), self.transactions)
+
+    def test_cipher_is_cached(self):
+        """
+        Test that the same key returns the same cipher instance.
+        """
+        self.assertIs(TransactionSecurity.get_cipher(self.old_key), TransactionSecurity.get_cipher(self.old_key))
+        self.assertIs(TransactionSecurity.get_cipher([self.new_key, self.old_key]),
+                      TransactionSecurity.get_cipher((self.new_key, self.old_key)))
+
+    def test_key_rotation(self):
+        """
+        Test that data under a retired key still decrypts with the key list and can be rotated to the new key.
+        """
+        encrypted = TransactionSecurity.encrypt_batch(self.transactions, self.old_key)
+        keys = [self.new_key, self.old_key]
+        self.assertEqual(TransactionSecurity.decrypt_batch(encrypted, keys), self.transactions)
+
+        addresses = [tx["wallet_address"] for tx in encrypted]
+        rotated = TransactionSecurity.rotate_column(addresses, keys)
+        self.assertEqual(TransactionSecurity.decrypt_column(rotated, self.new_key),
+                         [tx["wallet_address"] for tx in self.transactions])
+
+    def test_undecryptable_values_are_kept(self):
+        """
+        Test that values encrypted with an unknown key are left unchanged instead of failing the batch.
+        """
+        encrypted = TransactionSecurity.encrypt_batch(self.transactions[:2], self.old_key)
+        decrypted = TransactionSecurity.decrypt_batch(encrypted, self.new_key)
+        self.assertEqual(decrypted[0]["wallet_address"], encrypted[0]["wallet_address"])
+
+    def test_process_fan_out(self):
+        """
+        Test that fanning out across processes gives the same result as a single process.
+        """
+        encrypted = TransactionSecurity.encrypt_batch(self.transactions, self.old_key, max_workers=2, chunk_size=10)
+        self.assertEqual(len(encrypted), 50)
+        self.assertEqual(TransactionSecurity.decrypt_batch(encrypted, self.old_key, max_workers=2, chunk_size=10),
+                         self.transactions)
+
+class TestTokenization(unittest.TestCase):
+    """
+    Unit tests for deterministic keyed pseudonyms.
+    """
+
+    def setUp(self):
+        """
+        Use a fixed tokenization key.
+        """
+        self.key = b"test-tokenization-key"
+
+    def test_tokens_are_stable_and_keyed(self):
+        """
+        Test that a value always maps to the same token for a key, and to a different one for another key.
+        """
+        token = TransactionSecurity.tokenize_value("wallet1", self.key)
+        self.assertTrue(token.startswith("tok_"))
+        self.assertEqual(token, TransactionSecurity.tokenize_value("wallet1", self.key))
+        self.assertNotEqual(token, TransactionSecurity.tokenize_value("wallet2", self.key))
+        self.assertNotEqual(token, TransactionSecurity.tokenize_value("wallet1", b"other-key"))
+        self.assertNotIn("wallet1", token)
+
+    def test_tokenize_sensitive_data(self):
+        """
+        Test that every sensitive field is replaced and other fields are kept.
+        """
+        transaction = {"signature": "sig", "wallet_address": "wallet1", "user_id": "user", "api_key": None}
+        tokenized = TransactionSecurity.tokenize_sensitive_data(transaction, self.key)
+        self.assertEqual(tokenized["signature"], "sig")
+        self.assertEqual(tokenized["wallet_address"], TransactionSecurity.tokenize_value("wallet1", self.key))
+        self.assertTrue(tokenized["user_id"].startswith("tok_"))
+        self.assertIsNone(tokenized["api_key"])
+        self.assertEqual(TransactionSecurity.tokenize_column(["wallet1"], self.key), [tokenized["wallet_address"]])
+
+    def test_checkpoint_store_keys_by_pseudonym(self):
+        """
+        Test that a tokenizing checkpoint store finds checkpoints by address without storing the address.
+        """
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir, ignore_errors=True)
+        db_path = os.path.join(tmp_dir, "checkpoints.sqlite3")
+
+        CheckpointStore(db_path, tokenization_key=self.key).save("wallet1", "sig9", 9, 10.0, 2.5)
+        store = CheckpointStore(db_path, tokenization_key=self.key)
+        self.assertEqual(store.load("wallet1")["last_signature"], "sig9")
+
+        with sqlite3.connect(db_path) as conn:
+            stored = [row[0] for row in conn.execute("SELECT wallet_address FROM checkpoints")]
+        self.assertEqual(stored, [TransactionSecurity.tokenize_value("wallet1", self.key)])
+
+        store.delete("wallet1")
+        self.assertIsNone(store.load("wallet1"))
+
+if __name__ == "__main__":
+    unittest.main()